@@ -0,0 +1,107 @@
+import random
+
+class Injection:
+    """A pattern placed into a generated stream, expected to trigger a Nelson Rule
+
+    Arguments:
+    - rule_id: Nelson Rule the pattern is supposed to trigger
+    - start: Index of the first sample of the pattern
+    - end: Index after the last sample of the pattern
+    """
+
+    def __init__(
+            self,
+            rule_id:int,
+            start:int,
+            end:int) -> None:
+        self.rule_id=rule_id
+        self.start=start
+        self.end=end
+
+# Shift: points on one side of the mean
+def shift(r:random.Random,mean:float,sd:float) -> list:
+    return [mean+sd+abs(r.gauss(0,0.3*sd)) for _ in range(15)]
+
+# Trend: continually increasing points
+def trend(r:random.Random,mean:float,sd:float) -> list:
+    start=mean-2*sd
+    return [start+i*0.4*sd for i in range(10)]
+
+# Oscillation: points alternating in direction
+def oscillation(r:random.Random,mean:float,sd:float) -> list:
+    return [mean+(0.5*sd if i%2==0 else -0.5*sd)+r.uniform(-0.05,0.05)*sd for i in range(20)]
+
+# Stratification: points hugging the mean
+def stratification(r:random.Random,mean:float,sd:float) -> list:
+    return [mean+r.uniform(-0.3,0.3)*sd for _ in range(22)]
+
+# Mixture: points avoiding the center on both sides
+def mixture(r:random.Random,mean:float,sd:float) -> list:
+    return [mean+(1 if r.random()<0.5 else -1)*(1.8+r.random()*0.4)*sd for _ in range(12)]
+
+def outlier(r:random.Random,mean:float,sd:float) -> list:
+    return [mean+5*sd]
+
+def two_of_three(r:random.Random,mean:float,sd:float) -> list:
+    return [mean+(2.5+r.random()*0.3)*sd for _ in range(4)]
+
+def four_of_five(r:random.Random,mean:float,sd:float) -> list:
+    return [mean+(1.5+r.random()*0.3)*sd for _ in range(7)]
+
+PATTERNS = {
+    1:outlier,
+    2:shift,
+    3:trend,
+    4:oscillation,
+    5:two_of_three,
+    6:four_of_five,
+    7:stratification,
+    8:mixture}
+
+def sample_times(
+        length:int,
+        sample_rate:float,
+        start:float=0.0) -> list:
+    """Sampling times of a stream of length samples taken at sample_rate samples per second, the first one at start
+
+    Arguments:
+    - length: Number of samples
+    - sample_rate: Samples per second
+    - start: Time of the first sample in seconds since the epoch, defaults to 0
+    """
+    return [start+index/sample_rate for index in range(length)]
+
+def generate(
+        seed:int,
+        length:int,
+        mean:float=100.0,
+        sd:float=5.0,
+        burn_in:int=500,
+        gap:int=150) -> tuple:
+    """Generate a deterministic stream of normally distributed values with injected patterns
+
+    After burn_in in-control samples the patterns of rules 1 to 8 are injected in turn, separated by gap in-control samples.
+    Returns a tuple of the list of values and the list of Injection objects.
+
+    Arguments:
+    - seed: Seed of the random generator, equal seeds produce equal streams
+    - length: Number of samples
+    - mean: Mean of the in-control process, defaults to 100
+    - sd: Standard deviation of the in-control process, defaults to 5
+    - burn_in: Number of in-control samples before the first pattern, defaults to 500
+    - gap: Number of in-control samples between patterns, defaults to 150
+    """
+    r=random.Random(seed)
+    values=[r.gauss(mean,sd) for _ in range(min(burn_in,length))]
+    injections=[]
+    rule_id=1
+    while len(values)<length:
+        pattern=PATTERNS[rule_id](r,mean,sd)
+        if len(values)+len(pattern)>length:
+            break
+        injections.append(Injection(rule_id,len(values),len(values)+len(pattern)))
+        values.extend(pattern)
+        values.extend(r.gauss(mean,sd) for _ in range(min(gap,length-len(values))))
+        rule_id=rule_id%8+1
+    values.extend(r.gauss(mean,sd) for _ in range(length-len(values)))
+    return values,injections
@@ -0,0 +1,275 @@
+from threading import Event
+from queue import Queue
+import os
+import time
+import tracemalloc
+import numpy as np
+import pynelson
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.multi_stream import MultiStreamEngine
+from pynelson.sharding import ShardedRuntime
+from pynelson.types import Data,DataBatch
+from benchmark.generators import generate,sample_times
+
+# Samples after the end of an injected pattern in which its rule may still trigger
+DETECTION_SLACK = 16
+
+class BenchmarkResult:
+    """Measurements of a single engine
+
+    Arguments:
+    - name: Name of the engine
+    - samples: Number of samples processed
+    - seconds: Wall clock time spent processing
+    - latencies: Seconds from Data.timestamp of the last trigger point to event emission, empty if not measured
+    - events: Number of events emitted
+    """
+
+    def __init__(
+            self,
+            name:str,
+            samples:int,
+            seconds:float,
+            latencies:list,
+            events:int) -> None:
+        self.name=name
+        self.samples=samples
+        self.seconds=seconds
+        self.latencies=latencies
+        self.events=events
+
+    @property
+    def samples_per_second(self) -> float:
+        return self.samples/self.seconds if self.seconds>0 else float("inf")
+
+    def latency_percentile(
+            self,
+            percentile:float) -> float:
+        if len(self.latencies)==0:
+            return float("nan")
+        return float(np.percentile(self.latencies,percentile))
+
+class EmitTimingQueue(Queue):
+    """Event queue recording, when an event is put, the seconds since the timestamp of its last trigger point"""
+
+    def __init__(self) -> None:
+        Queue.__init__(self)
+        self.latencies=[]
+
+    def put(
+            self,
+            event,
+            block:bool=True,
+            timeout:float=None):
+        self.latencies.append(time.time()-event.trigger_data[len(event.trigger_data)-1].timestamp)
+        Queue.put(self,event,block,timeout)
+
+def run_handler(
+        values:list,
+        timestamps:list,
+        paced:bool=False,
+        frame_size:int=256,
+        max_pending_frames:int=4) -> tuple:
+    """Push values with their sampling times through a NelsonRuleHandler thread, in frames of frame_size via submit_many
+
+    Unpaced, frames are submitted at full speed to measure throughput, the producer waits while more than max_pending_frames
+    frames are queued. Paced, a frame is submitted once the wall clock reaches the sampling time of its last point, as a live
+    process would deliver it, and the latency from the sampling time of the last trigger point to event emission is
+    measured when the handler emits an event. Returns the result and the emitted events.
+    """
+    exception_queue=Queue()
+    data_queue=Queue()
+    event_queue=EmitTimingQueue()
+    stop_event=Event()
+    handler=NelsonRuleHandler(exception_queue,stop_event,data_queue,event_queue,0)
+    handler.daemon=True
+    handler.start()
+
+    start=time.perf_counter()
+    for i in range(0,len(values),frame_size):
+        frame_timestamps=timestamps[i:i+frame_size]
+        if paced:
+            delay=frame_timestamps[len(frame_timestamps)-1]-time.time()
+            if delay>0:
+                time.sleep(delay)
+        while data_queue.qsize()>max_pending_frames:
+            time.sleep(0.0001)
+        handler.submit_many(values[i:i+frame_size],frame_timestamps)
+    while handler.processed_count<len(values) and handler.is_alive():
+        time.sleep(0.0005)
+    seconds=time.perf_counter()-start
+    stop_event.set()
+    handler.join()
+    if not exception_queue.empty():
+        raise exception_queue.get().exception
+    events=list(event_queue.queue)
+    if paced:
+        name="NelsonRuleHandler @ %.0f/s"%((len(values)-1)/(timestamps[len(timestamps)-1]-timestamps[0]))
+        return BenchmarkResult(name,len(values),seconds,event_queue.latencies,len(events)),events
+    return BenchmarkResult("NelsonRuleHandler",len(values),seconds,[],len(events)),events
+
+def run_batch(values:list) -> tuple:
+    """Evaluate values with pynelson.evaluate, timestamps are the sample indices"""
+    start=time.perf_counter()
+    events=pynelson.evaluate(values,np.arange(len(values),dtype=np.float64))
+    seconds=time.perf_counter()-start
+    return BenchmarkResult("pynelson.evaluate",len(values),seconds,[],len(events)),events
+
+def run_multi_stream(
+        values:list,
+        stream_count:int,
+        batch_size:int=4096) -> BenchmarkResult:
+    """Feed stream_count copies of values, interleaved, through a MultiStreamEngine"""
+    engine=MultiStreamEngine()
+    stream_ids=np.tile(np.arange(stream_count),len(values))
+    all_values=np.repeat(np.asarray(values,dtype=np.float64),stream_count)
+    timestamps=np.zeros(len(all_values))
+    event_count=0
+    start=time.perf_counter()
+    for i in range(0,len(all_values),batch_size):
+        event_count+=len(engine.process_arrays(stream_ids[i:i+batch_size],all_values[i:i+batch_size],timestamps[i:i+batch_size]))
+    seconds=time.perf_counter()-start
+    return BenchmarkResult("MultiStreamEngine x"+str(stream_count),len(all_values),seconds,[],event_count)
+
+def run_sharded(
+        values:list,
+        stream_count:int,
+        shard_count:int,
+        batch_size:int=4096) -> BenchmarkResult:
+    """Feed stream_count copies of values, interleaved, as DataBatch items through a ShardedRuntime of shard_count workers
+
+    Measured from the first item placed into the data queue until the runtime has joined its workers, every event collected.
+    """
+    exception_queue=Queue()
+    data_queue=Queue()
+    event_queue=Queue()
+    stop_event=Event()
+    runtime=ShardedRuntime(exception_queue,stop_event,data_queue,event_queue,shard_count,batch_size)
+    stream_ids=np.tile(np.arange(stream_count),len(values))
+    all_values=np.repeat(np.asarray(values,dtype=np.float64),stream_count)
+    timestamps=np.zeros(len(all_values))
+    runtime.start()
+    start=time.perf_counter()
+    for i in range(0,len(all_values),batch_size):
+        data_queue.put(DataBatch(all_values[i:i+batch_size],timestamps[i:i+batch_size],stream_ids[i:i+batch_size]))
+    while not data_queue.empty() and runtime.is_alive():
+        time.sleep(0.001)
+    stop_event.set()
+    runtime.join()
+    seconds=time.perf_counter()-start
+    if not exception_queue.empty():
+        raise exception_queue.get().exception
+    return BenchmarkResult("ShardedRuntime x"+str(shard_count),len(all_values),seconds,[],event_queue.qsize())
+
+def shard_counts(max_shards:int=None) -> list:
+    """Powers of two up to max_shards, which defaults to the number of CPU cores, and max_shards itself"""
+    if max_shards is None:
+        max_shards=os.cpu_count()
+    counts=[]
+    count=1
+    while count<max_shards:
+        counts.append(count)
+        count*=2
+    return counts+[max_shards]
+
+def memory_per_stream(stream_count:int=200) -> dict:
+    """Bytes allocated per stream by NelsonRuleHandler objects and by a MultiStreamEngine, after 100 samples each"""
+    results={}
+    tracemalloc.start()
+    before=tracemalloc.get_traced_memory()[0]
+    handlers=[NelsonRuleHandler(None,None,None,Queue(),0) for _ in range(stream_count)]
+    for handler in handlers:
+        for i in range(100):
+            handler.process_data(Data(float(i%7),None,0.0))
+    results["NelsonRuleHandler"]=(tracemalloc.get_traced_memory()[0]-before)/stream_count
+    del handlers
+
+    before=tracemalloc.get_traced_memory()[0]
+    engine=MultiStreamEngine(capacity=stream_count)
+    for i in range(100):
+        engine.process_arrays(list(range(stream_count)),[float(i%7)]*stream_count,[0.0]*stream_count)
+    results["MultiStreamEngine"]=(tracemalloc.get_traced_memory()[0]-before)/stream_count
+    tracemalloc.stop()
+    return results
+
+def first_mismatch(
+        events:list,
+        expected_events:list) -> int:
+    """Index of the first event differing in rule id, trigger/clear or sample index, None if both lists agree"""
+    keys=[(event.rule_id,event.clear_event,event.sample_index) for event in events]
+    expected_keys=[(event.rule_id,event.clear_event,event.sample_index) for event in expected_events]
+    for index,(key,expected_key) in enumerate(zip(keys,expected_keys)):
+        if key!=expected_key:
+            return index
+    if len(keys)!=len(expected_keys):
+        return min(len(keys),len(expected_keys))
+    return None
+
+def check_detection(
+        events:list,
+        injections:list) -> dict:
+    """Match triggered events (timestamps being sample indices) against the injected patterns
+
+    Returns rule_id -> (detected injections, injected patterns, triggers outside of any injection of the rule).
+    """
+    results={}
+    for rule_id in range(1,9):
+        windows=[(injection.start,injection.end+DETECTION_SLACK) for injection in injections if injection.rule_id==rule_id]
+        triggers=[
+            event.trigger_data[len(event.trigger_data)-1].timestamp
+            for event in events if event.rule_id==rule_id and not event.clear_event]
+        detected=sum(1 for start,end in windows if any(start<=t<end for t in triggers))
+        unexpected=sum(1 for t in triggers if not any(start<=t<end for start,end in windows))
+        results[rule_id]=(detected,len(windows),unexpected)
+    return results
+
+def run(
+        seed:int=0,
+        samples:int=200000,
+        stream_count:int=1000,
+        max_shards:int=None,
+        sample_rate:float=50000):
+    """Run every benchmark on a generated stream and print the report, latency is measured with the stream sampled at sample_rate"""
+    values,injections=generate(seed,samples)
+    print("Benchmark: seed "+str(seed)+", "+str(samples)+" samples, "+str(len(injections))+" injected patterns")
+
+    handler_result,handler_events=run_handler(values,sample_times(samples,sample_rate))
+    # Sampling starts shortly after the handler thread has been started
+    paced_result,_=run_handler(values,sample_times(samples,sample_rate,time.time()+0.1),True)
+    batch_result,batch_events=run_batch(values)
+    multi_samples=max(1000,samples//stream_count)
+    multi_result=run_multi_stream(values[:multi_samples],stream_count)
+
+    print("")
+    print("%-28s %14s %10s %12s %12s %12s"%("Engine","samples/s","events","p50 [ms]","p99 [ms]","max [ms]"))
+    for result in (handler_result,paced_result,batch_result,multi_result):
+        print("%-28s %14.0f %10d %12.3f %12.3f %12.3f"%(
+            result.name,
+            result.samples_per_second,
+            result.events,
+            result.latency_percentile(50)*1000,
+            result.latency_percentile(99)*1000,
+            result.latency_percentile(100)*1000))
+    mismatch=first_mismatch(handler_events,batch_events)
+    if mismatch is not None:
+        differing=handler_events[mismatch] if mismatch<len(handler_events) else batch_events[mismatch]
+        print("WARNING: NelsonRuleHandler and pynelson.evaluate differ from event "+str(mismatch)+" on sample "+str(differing.sample_index))
+
+    print("")
+    print("%-28s %14s %10s"%("Workers","samples/s","speedup"))
+    single=None
+    for count in shard_counts(max_shards):
+        result=run_sharded(values[:multi_samples],stream_count,count)
+        if single is None:
+            single=result.samples_per_second
+        print("%-28s %14.0f %10.2f"%(result.name,result.samples_per_second,result.samples_per_second/single))
+
+    print("")
+    print("Memory per stream")
+    for name,size in memory_per_stream().items():
+        print("%-28s %10.0f bytes"%(name,size))
+
+    print("")
+    print("%-6s %10s %10s %12s"%("Rule","detected","injected","unexpected"))
+    for rule_id,(detected,injected,unexpected) in check_detection(batch_events,injections).items():
+        print("%-6d %10d %10d %12d"%(rule_id,detected,injected,unexpected))
@@ -0,0 +1,13 @@
+from benchmark.runner import run
+import argparse
+
+# Run the benchmark suite with a single command
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pynelson engines on deterministic generated streams")
+    parser.add_argument("--seed",type=int,default=0,help="Seed of the generated stream")
+    parser.add_argument("--samples",type=int,default=200000,help="Number of generated samples")
+    parser.add_argument("--streams",type=int,default=1000,help="Number of streams fed to the MultiStreamEngine")
+    parser.add_argument("--shards",type=int,default=None,help="Maximum number of ShardedRuntime workers, defaults to the number of CPU cores")
+    parser.add_argument("--rate",type=float,default=50000,help="Samples per second of the stream the handler latency is measured on")
+    arguments = parser.parse_args()
+    run(arguments.seed,arguments.samples,arguments.streams,arguments.shards,arguments.rate)
@@ -1,2 +1,4 @@
 MAX_SIZE_OF_INT=64
-IGNORE_FIRST_ELEMENTS_COUNT=20
\ No newline at end of file
+IGNORE_FIRST_ELEMENTS_COUNT=20
+
+from pynelson.batch import evaluate
\ No newline at end of file
@@ -0,0 +1,93 @@
+import asyncio
+from collections import deque
+from pynelson.types import NelsonRuleEvent
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.baseline import Baseline
+from pynelson.bounded_queue import item_size,item_slice
+
+class EventBuffer(deque):
+    """Queue-like collector for the events of a NelsonRuleHandler that is driven without its thread"""
+
+    def put(
+            self,
+            event:NelsonRuleEvent):
+        self.append(event)
+
+class AsyncNelsonRuleHandler:
+    """Apply Nelson Rules to a continuous process inside an asyncio event loop
+
+    Consumes Data objects, DataBatch objects or lists of Data objects from an asyncio.Queue or any async iterator and yields every triggered/cleared
+    NelsonRuleEvent from an async generator. The rules themselves are checked by NelsonRuleHandler.process_item, no thread is started.
+    Items already waiting in a queue are drained up to batch_size per wakeup. A None item placed in a queue ends the generator.
+    Control returns to the event loop every yield_interval data points, large DataBatch objects are checked in slices of that size.
+    task_done is called on a source asyncio.Queue for every item once it has been checked, so source.join() can be awaited.
+
+    Arguments:
+    - source -- asyncio.Queue or async iterator providing the manufacturing data
+    - window_size -- Number of most recent data points kept for the rules, at least 15, defaults to 15
+    - batch_size -- Maximum number of queue items processed per wakeup, defaults to 1024
+    - baseline -- Baseline strategy providing mean and standard deviation, defaults to None aggregating the whole history
+    - yield_interval -- Maximum number of data points checked without returning to the event loop, defaults to 1024
+    """
+
+    def __init__(
+            self,
+            source,
+            window_size:int=15,
+            batch_size:int=1024,
+            baseline:Baseline=None,
+            yield_interval:int=1024) -> None:
+        if yield_interval<1:
+            raise ValueError("Invalid yield interval")
+        self.source=source
+        self.batch_size=batch_size
+        self.yield_interval=yield_interval
+        self.event_buffer=EventBuffer()
+        self.rule_handler=NelsonRuleHandler(
+            None,
+            None,
+            None,
+            self.event_buffer,
+            0,
+            window_size,
+            baseline=baseline)
+
+    def __aiter__(self):
+        return self.events()
+
+    async def events(self):
+        """Async generator yielding the NelsonRuleEvents of the consumed data"""
+        is_queue=isinstance(self.source,asyncio.Queue)
+        unyielded=0 # Data points checked since control last returned to the event loop
+        async for batch in self.batches():
+            for item in batch:
+                size=item_size(item)
+                for start in range(0,max(size,1),self.yield_interval):
+                    part=item if size<=self.yield_interval else item_slice(item,start,start+self.yield_interval)
+                    self.rule_handler.process_item(part)
+                    while self.event_buffer:
+                        yield self.event_buffer.popleft()
+                    unyielded+=min(self.yield_interval,size-start)
+                    if unyielded>=self.yield_interval:
+                        unyielded=0
+                        await asyncio.sleep(0)
+                if is_queue:
+                    self.source.task_done()
+
+    async def batches(self):
+        if not isinstance(self.source,asyncio.Queue):
+            async for item in self.source:
+                yield [item]
+            return
+        while True:
+            batch=[await self.source.get()]
+            while len(batch)<self.batch_size and not self.source.empty():
+                batch.append(self.source.get_nowait())
+            if None in batch:
+                end=batch.index(None)
+                # The end marker and the items taken after it are never checked
+                for _ in range(len(batch)-end):
+                    self.source.task_done()
+                yield batch[:end]
+                return
+            yield batch
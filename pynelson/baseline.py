@@ -0,0 +1,240 @@
+from abc import ABC,abstractmethod
+from array import array
+from collections import deque
+import math
+from pynelson.skiplist import IndexableSkiplist
+
+class Baseline(ABC):
+    """Strategy providing the mean and standard deviation the Nelson Rules are checked against
+
+    Subclasses implement add, updating mean and standard_deviation for every added value, in constant time and memory unless stated otherwise.
+    """
+
+    def __init__(self) -> None:
+        self.count=0
+        self.mean=0.0
+        self.standard_deviation=0.0
+
+    @abstractmethod
+    def add(
+            self,
+            value:float):
+        """Aggregate a new value into the baseline"""
+
+class WelfordBaseline(Baseline):
+    """Mean and standard deviation over the whole history, accumulated with Welford's algorithm"""
+
+    def __init__(self) -> None:
+        Baseline.__init__(self)
+        self.m2=0.0 # Sum of squared differences from the current mean
+
+    def add(
+            self,
+            value:float):
+        self.count+=1
+        delta=value-self.mean
+        self.mean+=delta/self.count
+        self.m2+=delta*(value-self.mean)
+        self.standard_deviation=math.sqrt(self.m2/self.count)
+
+class RollingBaseline(Baseline):
+    """Mean and standard deviation over the last window_size values
+
+    Values are kept in a preallocated array('d') ring, the oldest value is evicted with an inverse Welford update when a new one arrives.
+
+    Arguments:
+    - window_size -- Number of most recent values the baseline is computed from
+    """
+
+    def __init__(
+            self,
+            window_size:int) -> None:
+        if window_size<1:
+            raise ValueError("Invalid window size")
+        Baseline.__init__(self)
+        self.window_size=window_size
+        self.values=array('d',bytes(8*window_size))
+        self.head=0
+        self.m2=0.0
+
+    def add(
+            self,
+            value:float):
+        if self.count<self.window_size:
+            self.count+=1
+            delta=value-self.mean
+            self.mean+=delta/self.count
+            self.m2+=delta*(value-self.mean)
+        else:
+            evicted=self.values[self.head]
+            previous_mean=self.mean
+            self.mean+=(value-evicted)/self.count
+            self.m2+=(value-evicted)*(value-self.mean+evicted-previous_mean)
+            if self.m2<0:
+                self.m2=0.0
+        self.values[self.head]=value
+        self.head+=1
+        if self.head==self.window_size:
+            self.head=0
+        self.standard_deviation=math.sqrt(self.m2/self.count)
+
+class RobustBaseline(Baseline):
+    """Rolling median and median absolute deviation (MAD) over the last window_size values
+
+    mean is the median and standard_deviation the MAD scaled by scale, 1.4826 making it consistent with the standard
+    deviation of normally distributed values, so single outliers barely move the zones of the rules.
+    Values are kept sorted in an IndexableSkiplist: a new value costs O(log n), the median two O(log n) lookups and the MAD,
+    the k-th smallest distance of the values below and above the median, O(log n) lookups of O(log n) each.
+    Values that are not finite, e.g. NaN from a failed sensor read, are skipped and counted in skipped_count.
+
+    Arguments:
+    - window_size -- Number of most recent values the baseline is computed from
+    - scale -- Factor from MAD to standard deviation, defaults to 1.4826
+    """
+
+    def __init__(
+            self,
+            window_size:int,
+            scale:float=1.4826) -> None:
+        if window_size<1:
+            raise ValueError("Invalid window size")
+        Baseline.__init__(self)
+        self.window_size=window_size
+        self.scale=scale
+        self.window=deque()
+        self.sorted_values=IndexableSkiplist(window_size)
+        self.skipped_count=0
+
+    # The linked skiplist is rebuilt from the window instead of being pickled node by node
+    def __getstate__(self):
+        state=dict(self.__dict__)
+        state["window"]=list(self.window)
+        del state["sorted_values"]
+        return state
+
+    def __setstate__(self,state):
+        self.__dict__.update(state)
+        self.skipped_count=state.get("skipped_count",0)
+        self.window=deque(state["window"])
+        self.sorted_values=IndexableSkiplist(self.window_size)
+        for value in self.window:
+            self.sorted_values.insert(value)
+
+    def add(
+            self,
+            value:float):
+        # NaN cannot be ordered, it would corrupt the skiplist and could never be removed again
+        if not math.isfinite(value):
+            self.skipped_count+=1
+            return
+        if len(self.window)==self.window_size:
+            self.sorted_values.remove(self.window.popleft())
+        self.window.append(value)
+        self.sorted_values.insert(value)
+        self.count=len(self.window)
+        sorted_values=self.sorted_values
+        k=(self.count-1)//2
+        median=(sorted_values[k]+sorted_values[self.count//2])/2
+        self.mean=median
+        distance,next_distance=self.kth_distances(k,median,sorted_values.rank(median))
+        if self.count%2==0:
+            distance=(distance+next_distance)/2
+        self.standard_deviation=self.scale*distance
+
+    # k-th and (k+1)-th smallest |value-median|, merging the distances of the values below the split, growing to the left,
+    # with those of the values above it by a binary search on the number taken from below
+    def kth_distances(
+            self,
+            k:int,
+            median:float,
+            split:int) -> tuple:
+        sorted_values=self.sorted_values
+        below=split
+        above=self.count-split
+        low=max(0,k+1-above)
+        high=min(k+1,below)
+        while low<high:
+            taken=(low+high)//2
+            if median-sorted_values[split-1-taken]<sorted_values[split+k-taken]-median:
+                low=taken+1
+            else:
+                high=taken
+        distance=0.0
+        if low>0:
+            distance=median-sorted_values[split-low]
+        if low<k+1:
+            distance=max(distance,sorted_values[split+k-low]-median)
+        next_distance=math.inf
+        if low<below:
+            next_distance=median-sorted_values[split-1-low]
+        if k+1-low<above:
+            next_distance=min(next_distance,sorted_values[split+k+1-low]-median)
+        return distance,next_distance
+
+class EwmaBaseline(Baseline):
+    """Exponentially weighted moving mean and standard deviation
+
+    Arguments:
+    - alpha -- Weight of the newest value, between 0 and 1
+    """
+
+    def __init__(
+            self,
+            alpha:float) -> None:
+        if not 0<alpha<=1:
+            raise ValueError("Alpha must be between 0 and 1")
+        Baseline.__init__(self)
+        self.alpha=alpha
+        self.variance=0.0
+
+    def add(
+            self,
+            value:float):
+        self.count+=1
+        if self.count==1:
+            self.mean=value
+            return
+        delta=value-self.mean
+        self.mean+=self.alpha*delta
+        self.variance=(1-self.alpha)*(self.variance+self.alpha*delta*delta)
+        self.standard_deviation=math.sqrt(self.variance)
+
+class FrozenBaseline(Baseline):
+    """Phase-I baseline, learned from the first sample_count values and frozen afterwards
+
+    Either sample_count or both mean and standard_deviation have to be given, the latter freezes the baseline from the start.
+
+    Arguments:
+    - sample_count -- Number of values the baseline is learned from, defaults to None
+    - mean -- Precomputed mean, defaults to None
+    - standard_deviation -- Precomputed standard deviation, defaults to None
+    """
+
+    def __init__(
+            self,
+            sample_count:int=None,
+            mean:float=None,
+            standard_deviation:float=None) -> None:
+        Baseline.__init__(self)
+        self.learning=WelfordBaseline()
+        if mean is not None and standard_deviation is not None:
+            self.sample_count=0
+            self.mean=mean
+            self.standard_deviation=standard_deviation
+        elif sample_count is not None and sample_count>0:
+            self.sample_count=sample_count
+        else:
+            raise ValueError("Either sample_count or mean and standard_deviation are required")
+
+    @property
+    def frozen(self) -> bool:
+        return self.count>=self.sample_count
+
+    def add(
+            self,
+            value:float):
+        if self.count<self.sample_count:
+            self.learning.add(value)
+            self.mean=self.learning.mean
+            self.standard_deviation=self.learning.standard_deviation
+        self.count+=1
@@ -0,0 +1,193 @@
+from array import array
+import datetime
+import numpy as np
+import pynelson
+from pynelson.types import Data,NelsonRuleEvent,TriggerData
+
+# Slice of the series (relative to the sample being evaluated) that the
+# streaming handler attaches as trigger_data for each rule
+TRIGGER_DATA_OFFSETS = {
+    1:(0,1),
+    2:(-9,-1),
+    3:(-6,-1),
+    4:(-14,-1),
+    5:(-3,-1),
+    6:(-5,-1),
+    7:(-15,-1),
+    8:(-8,-1)}
+
+def evaluate(
+        values,
+        timestamps=None,
+        mean:float=None,
+        standard_deviation:float=None) -> list:
+    """Apply Nelson Rules to a complete series at once
+
+    Offline counterpart of NelsonRuleHandler, every rule is evaluated as array operations over the whole series.
+    Returns the same NelsonRuleEvent objects, in the same order, as the streaming handler would put on its event queue
+    including the IGNORE_FIRST_ELEMENTS_COUNT warm-up and the running mean/standard deviation semantics.
+
+    Arguments:
+    - values -- Sequence or NumPy array of the recorded values
+    - timestamps -- Sequence or NumPy array of the timestamps belonging to values, defaults to the current system time
+    - mean -- Fixed mean to check against instead of the running mean, as a FrozenBaseline would, defaults to None
+    - standard_deviation -- Fixed standard deviation, required together with mean, defaults to None
+    """
+    values = np.asarray(values,dtype=np.float64)
+    if timestamps is not None and len(timestamps)!=len(values):
+        raise ValueError("Length of timestamps does not match length of values")
+
+    states = evaluate_states(values,mean,standard_deviation)
+    if len(states)==0:
+        return []
+    first = len(values)-len(states[1])
+
+    # Collect every flip of a rule state, ordered the way the streaming handler emits them
+    sample_indices = []
+    rule_ids = []
+    clear_events = []
+    for rule_id in range(1,9):
+        state = states[rule_id]
+        previous_state = np.concatenate(([False],state[:-1]))
+        changed = np.flatnonzero(state!=previous_state)
+        sample_indices.append(changed+first)
+        rule_ids.append(np.full(len(changed),rule_id))
+        clear_events.append(~state[changed])
+    sample_indices = np.concatenate(sample_indices)
+    rule_ids = np.concatenate(rule_ids)
+    clear_events = np.concatenate(clear_events)
+    order = np.lexsort((rule_ids,sample_indices))
+
+    if timestamps is None:
+        timestamps = np.full(len(values),datetime.datetime.now().timestamp())
+    else:
+        timestamps = np.asarray(timestamps,dtype=np.float64)
+    events = []
+    for i,rule_id,clear_event in zip(sample_indices[order].tolist(),rule_ids[order].tolist(),clear_events[order].tolist()):
+        start,end = TRIGGER_DATA_OFFSETS[rule_id]
+        if rule_id==1:
+            trigger_data = [Data(values[i].item(),None,timestamps[i].item())]
+        else:
+            trigger_data = TriggerData(
+                array('d',values[i+start:i+end].tobytes()),
+                array('d',timestamps[i+start:i+end].tobytes()))
+        events.append(NelsonRuleEvent(rule_id,clear_event,trigger_data,sample_index=i))
+    return events
+
+def evaluate_states(
+        values,
+        mean:float=None,
+        standard_deviation:float=None) -> dict:
+    """Compute the state of every Nelson Rule for every evaluated sample
+
+    Returns a dictionary of rule_id -> boolean array, True where the rule is triggered.
+    Index 0 of the arrays belongs to the first sample evaluated after the warm-up period,
+    an empty dictionary is returned if the series is not longer than the warm-up period.
+
+    Arguments:
+    - values -- Sequence or NumPy array of the recorded values
+    - mean -- Fixed mean to check against instead of the running mean, defaults to None
+    - standard_deviation -- Fixed standard deviation, required together with mean, defaults to None
+    """
+    if (mean is None)!=(standard_deviation is None):
+        raise ValueError("mean and standard_deviation have to be given together")
+    x = np.asarray(values,dtype=np.float64)
+    n = len(x)
+    first = pynelson.IGNORE_FIRST_ELEMENTS_COUNT+1
+    if n<=first:
+        return {}
+
+    if mean is None:
+        # Running statistics after k samples are stored at index k-1
+        counts = np.arange(1,n+1,dtype=np.float64)
+        running_mean = np.cumsum(x)/counts
+        deviation = running_mean-x
+        running_sd = np.sqrt(np.cumsum(deviation*deviation)/counts)
+
+        # Sample i is evaluated against the statistics of the i samples before it
+        mean = running_mean[first-1:n-1]
+        sd = running_sd[first-1:n-1]
+    else:
+        sd = standard_deviation
+    current = x[first:]
+    previous = x[first-1:n-1]
+    up = previous<current
+    down = previous>current
+    evaluated = n-first
+
+    def lagged(lag):
+        return x[first-lag:n-lag]
+
+    states = {}
+
+    # NR 1
+    states[1] = (current>mean+3*sd)|(current<mean-3*sd)
+
+    # NR 2
+    same_side = ((previous>=mean)&(current>=mean))|((previous<mean)&(current<mean))
+    states[2] = _counter_before(_run_lengths(same_side))>=9
+
+    # NR 3, equal neighbours leave the counter untouched, the handler starts out expecting a decrease
+    direction = up.astype(np.int8)-down.astype(np.int8)
+    moves = np.flatnonzero(direction)
+    move_directions = np.concatenate(([-1],direction[moves]))
+    move_counts = _run_lengths(move_directions[1:]==move_directions[:-1])
+    last_move = np.full(evaluated,-1)
+    last_move[moves] = np.arange(len(moves))
+    np.maximum.accumulate(last_move,out=last_move)
+    slope_count = np.where(last_move>=0,move_counts[last_move],0)
+    states[3] = _counter_before(slope_count)>=6
+
+    # NR 4
+    alternating = np.zeros(evaluated,dtype=bool)
+    alternating[1:] = (up[1:]&down[:-1])|(down[1:]&up[:-1])
+    alt_count = np.where(up|down,_run_lengths(alternating)+1,0)
+    states[4] = _counter_before(alt_count)>=14
+
+    # NR 5
+    pos_count = np.zeros(evaluated,dtype=np.int8)
+    neg_count = np.zeros(evaluated,dtype=np.int8)
+    for lag in range(1,4):
+        pos_count += lagged(lag)>(mean+2*sd)
+        neg_count += lagged(lag)<(mean-2*sd)
+    states[5] = (pos_count>=2)|(neg_count>=2)
+
+    # NR 6
+    pos_count[:] = 0
+    neg_count[:] = 0
+    for lag in range(1,6):
+        pos_count += lagged(lag)>(mean+sd)
+        neg_count += lagged(lag)<(mean-sd)
+    states[6] = (pos_count>=4)|(neg_count>=4)
+
+    # NR 7
+    within = (current>=mean-sd)&(current<=mean+sd)
+    states[7] = _counter_before(_run_lengths(within))>=15
+
+    # NR 8, the sides are collected over the whole run of points outside 1 standard deviation
+    above = current>mean+sd
+    below = current<mean-sd
+    outside_count = _run_lengths(above|below)
+    run_start = np.arange(evaluated)-outside_count+1
+    both_sides = (_last_index(above)>=run_start)&(_last_index(below)>=run_start)
+    states[8] = (_counter_before(outside_count)>=8)&_counter_before(both_sides)
+
+    return states
+
+# Length of the run of True values ending at every index, along the last axis
+def _run_lengths(flags:np.ndarray) -> np.ndarray:
+    indices = np.arange(flags.shape[-1])
+    last_false = np.where(flags,-1,indices)
+    np.maximum.accumulate(last_false,axis=-1,out=last_false)
+    return indices-last_false
+
+# Index of the last True value up to every index, -1 before the first one
+def _last_index(flags:np.ndarray) -> np.ndarray:
+    indices = np.where(flags,np.arange(len(flags)),-1)
+    return np.maximum.accumulate(indices)
+
+# Counters are checked before they are updated with the current sample
+def _counter_before(counter:np.ndarray) -> np.ndarray:
+    before = np.zeros_like(counter)
+    before[...,1:] = counter[...,:-1]
+    return before
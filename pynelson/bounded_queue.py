@@ -0,0 +1,210 @@
+from threading import Condition
+from collections import deque
+from queue import Empty,Full
+import time
+from pynelson.types import Data,DataBatch,DataShed
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_DECIMATE = "decimate"
+
+class BoundedDataQueue:
+    """Data queue holding at most capacity data points, with a policy for producers that outrun the rule handler
+
+    Can be used wherever a Queue of Data, DataBatch or lists of Data is read. Sizes are counted in data points, not items.
+    Overflow policies:
+    - "block" -- put waits for free space, raises queue.Full if timeout passes first
+    - "drop_oldest" -- The oldest waiting data points are discarded to make room
+    - "drop_newest" -- Data points that do not fit are discarded
+    - "decimate" -- Above high_water data points, only every decimation-th incoming data point is kept; data points that
+      still do not fit are discarded
+    Wherever data points are shed a DataShed marker is placed into the queue, NelsonRuleHandler attaches it to its events.
+
+    Arguments:
+    - capacity -- Maximum number of data points waiting
+    - overflow -- Overflow policy, defaults to "block"
+    - decimation -- Keep every decimation-th data point with the "decimate" policy, defaults to 10
+    - high_water -- Number of waiting data points above which the "decimate" policy decimates, defaults to half the capacity
+    """
+
+    def __init__(
+            self,
+            capacity:int,
+            overflow:str=OVERFLOW_BLOCK,
+            decimation:int=10,
+            high_water:int=None) -> None:
+        if capacity<1:
+            raise ValueError("Invalid capacity")
+        if overflow not in (OVERFLOW_BLOCK,OVERFLOW_DROP_OLDEST,OVERFLOW_DROP_NEWEST,OVERFLOW_DECIMATE):
+            raise ValueError("Invalid overflow policy: "+str(overflow))
+        if decimation<1:
+            raise ValueError("Invalid decimation")
+        self.capacity=capacity
+        self.overflow=overflow
+        self.decimation=decimation
+        self.high_water=capacity//2 if high_water is None else high_water
+        self.items=deque()
+        self.size=0
+        self.shed_count=0
+        self.decimation_phase=0
+        self.condition=Condition()
+
+    def qsize(self) -> int:
+        """Number of data points waiting"""
+        return self.size
+
+    def empty(self) -> bool:
+        return self.size==0 and len(self.items)==0
+
+    def full(self) -> bool:
+        return self.size>=self.capacity
+
+    def put(
+            self,
+            item,
+            block:bool=True,
+            timeout:float=None):
+        """Place a Data object, DataBatch or list of Data objects into the queue, applying the overflow policy"""
+        count=item_size(item)
+        with self.condition:
+            if self.overflow==OVERFLOW_BLOCK:
+                # An item larger than the capacity is accepted into an empty queue instead of waiting forever
+                deadline=None if timeout is None else time.monotonic()+timeout
+                while self.size>0 and self.size+count>self.capacity:
+                    remaining=None if deadline is None else deadline-time.monotonic()
+                    if not block or (remaining is not None and remaining<=0):
+                        raise Full
+                    self.condition.wait(remaining)
+            elif self.overflow==OVERFLOW_DROP_OLDEST:
+                excess=max(count-self.capacity,0)
+                if excess>0:
+                    item=item_slice(item,excess,count)
+                    count-=excess
+                self.drop_oldest(self.size+count-self.capacity,excess)
+            else:
+                if self.overflow==OVERFLOW_DECIMATE and self.size+count>self.high_water:
+                    kept=item_decimate(item,self.decimation,self.decimation_phase)
+                    self.decimation_phase=(self.decimation_phase+count)%self.decimation
+                    shed=count-item_size(kept)
+                    item=kept
+                    count-=shed
+                else:
+                    shed=0
+                free=max(self.capacity-self.size,0)
+                if count>free:
+                    shed+=count-free
+                    item=item_slice(item,0,free)
+                    count=free
+                if count>0:
+                    self.items.append(item)
+                    self.size+=count
+                if shed>0:
+                    self.shed_tail(shed)
+                self.condition.notify_all()
+                return
+            self.items.append(item)
+            self.size+=count
+            self.condition.notify_all()
+
+    def put_nowait(
+            self,
+            item):
+        self.put(item,False)
+
+    def get(
+            self,
+            block:bool=True,
+            timeout:float=None):
+        """Take the next item, a Data object, DataBatch, list of Data objects or DataShed marker"""
+        with self.condition:
+            deadline=None if timeout is None else time.monotonic()+timeout
+            while len(self.items)==0:
+                remaining=None if deadline is None else deadline-time.monotonic()
+                if not block or (remaining is not None and remaining<=0):
+                    raise Empty
+                self.condition.wait(remaining)
+            item=self.items.popleft()
+            if not isinstance(item,DataShed):
+                self.size-=item_size(item)
+                self.condition.notify_all()
+            return item
+
+    def get_nowait(self):
+        return self.get(False)
+
+    # Count shed data points and mark the position in the queue, merging with a marker already at the tail
+    def shed_tail(
+            self,
+            count:int):
+        self.shed_count+=count
+        if len(self.items)>0 and isinstance(self.items[-1],DataShed):
+            self.items[-1].count+=count
+        else:
+            self.items.append(DataShed(count))
+
+    # Discard count data points from the head, the marker is placed where the consumer continues.
+    # skipped data points of the incoming item, already cut off by the caller, are added to the marker
+    def drop_oldest(
+            self,
+            count:int,
+            skipped:int=0):
+        if count<=0 and skipped==0:
+            return
+        shed=skipped
+        self.shed_count+=skipped
+        while count>0 and len(self.items)>0:
+            item=self.items.popleft()
+            if isinstance(item,DataShed):
+                shed+=item.count
+                continue
+            size=item_size(item)
+            if size>count:
+                self.items.appendleft(item_slice(item,count,size))
+                self.size-=count
+                shed+=count
+                self.shed_count+=count
+                break
+            self.size-=size
+            shed+=size
+            self.shed_count+=size
+            count-=size
+        if len(self.items)>0 and isinstance(self.items[0],DataShed):
+            self.items[0].count+=shed
+        else:
+            self.items.appendleft(DataShed(shed))
+
+def item_size(item) -> int:
+    if isinstance(item,Data):
+        return 1
+    return len(item)
+
+def item_slice(
+        item,
+        start:int,
+        end:int):
+    if isinstance(item,Data):
+        return item if start==0 and end>=1 else []
+    if isinstance(item,DataBatch):
+        return DataBatch(
+            item.values[start:end],
+            item.timestamps[start:end],
+            None if item.ids is None else item.ids[start:end],
+            item.id)
+    return item[start:end]
+
+# Keep every decimation-th data point of the decimated stream, phase is the number of data points decimated so far modulo decimation
+def item_decimate(
+        item,
+        decimation:int,
+        phase:int):
+    first=(decimation-phase)%decimation
+    if isinstance(item,Data):
+        return item if first==0 else []
+    if isinstance(item,DataBatch):
+        return DataBatch(
+            item.values[first::decimation],
+            item.timestamps[first::decimation],
+            None if item.ids is None else item.ids[first::decimation],
+            item.id)
+    return item[first::decimation]
@@ -0,0 +1,241 @@
+from threading import Thread
+from threading import Event
+from queue import Queue,Empty
+from array import array
+import os
+import pickle
+import struct
+import time
+from pynelson.types import ExceptionEvent
+
+MAGIC = b"PYNCKPT1"
+
+# data_sum, data_count, deviation_sq_sums, mean, standard_deviation, processed_count, ignore_count,
+# same_side_mean_count, continuous_slope_change_count, continuous_alt_direction_count,
+# within_standard_deviation_count, none_within_standard_deviation_count, flags,
+# previous value, window size, window head, window count, length of the pickled extras
+CORE = struct.Struct("<8sdqdddqqqqqqqIdqqqq")
+
+FLAG_NAMES = [
+    "rule3_increasing",
+    "expect_increase",
+    "nelson_rule_1_event",
+    "nelson_rule_2_event",
+    "nelson_rule_3_event",
+    "nelson_rule_4_event",
+    "nelson_rule_5_event",
+    "nelson_rule_6_event",
+    "nelson_rule_7_event",
+    "nelson_rule_8_event"]
+
+def snapshot_state(handler) -> bytes:
+    """Serialize the complete rule state of a NelsonRuleHandler into a compact binary representation
+
+    Must be called from the thread processing the handler's data, or while the handler is not running.
+    """
+    flags = 0
+    for bit,name in enumerate(FLAG_NAMES):
+        value = getattr(handler,name)
+        if value is True or (value is not False and value.is_set()):
+            flags |= 1<<bit
+    sides = handler.none_within_standard_deviation_sides
+    flags |= sides[0]<<10 | sides[1]<<11
+    previous_value = handler.previous_value
+    if previous_value is not None:
+        flags |= 1<<12
+    window = handler.data_window
+    extras = pickle.dumps({
+        "window_ids":None if all(id is None for id in window.ids) else window.ids,
+        "baseline":handler.baseline,
+        "compiled_rules":handler.compiled_rules})
+    core = CORE.pack(
+        MAGIC,
+        float(handler.data_sum),
+        handler.data_count,
+        float(handler.deviation_sq_sums),
+        handler.mean,
+        handler.standard_deviation,
+        handler.processed_count,
+        handler.ignore_count,
+        handler.same_side_mean_count,
+        handler.continuous_slope_change_count,
+        handler.continuous_alt_direction_count,
+        handler.within_standard_deviation_count,
+        handler.none_within_standard_deviation_count,
+        flags,
+        0.0 if previous_value is None else previous_value,
+        window.size,
+        window.head,
+        window.count,
+        len(extras))
+    return core+window.values.tobytes()+window.timestamps.tobytes()+extras
+
+def restore_state(
+        handler,
+        state:bytes):
+    """Restore a state created by snapshot_state into a NelsonRuleHandler that is not running yet
+
+    Only restore trusted states, baseline strategies and compiled rules are stored with pickle.
+    """
+    (magic,data_sum,data_count,deviation_sq_sums,mean,standard_deviation,processed_count,ignore_count,
+        same_side_mean_count,slope_count,alt_count,within_count,none_within_count,flags,
+        previous_value,window_size,window_head,window_count,extras_length) = CORE.unpack_from(state)
+    if magic!=MAGIC:
+        raise ValueError("Invalid checkpoint")
+    window = handler.data_window
+    if window_size!=window.size:
+        raise ValueError("Checkpoint window size "+str(window_size)+" does not match handler window size "+str(window.size))
+    offset = CORE.size
+    window_bytes = 16*window_size
+    values = array('d',state[offset:offset+window_bytes])
+    timestamps = array('d',state[offset+window_bytes:offset+2*window_bytes])
+    extras = pickle.loads(state[offset+2*window_bytes:offset+2*window_bytes+extras_length])
+
+    handler.data_sum = data_sum
+    handler.data_count = data_count
+    handler.deviation_sq_sums = deviation_sq_sums
+    handler.mean = mean
+    handler.standard_deviation = standard_deviation
+    handler.processed_count = processed_count
+    handler.ignore_count = ignore_count
+    handler.same_side_mean_count = same_side_mean_count
+    handler.continuous_slope_change_count = slope_count
+    handler.continuous_alt_direction_count = alt_count
+    handler.within_standard_deviation_count = within_count
+    handler.none_within_standard_deviation_count = none_within_count
+    handler.none_within_standard_deviation_sides = [bool(flags>>10&1),bool(flags>>11&1)]
+    for bit,name in enumerate(FLAG_NAMES):
+        value = bool(flags>>bit&1)
+        current = getattr(handler,name)
+        if isinstance(current,bool):
+            setattr(handler,name,value)
+        elif value:
+            current.set()
+        else:
+            current.clear()
+    handler.previous_value = previous_value if flags>>12&1 else None
+
+    window.values[:] = values
+    window.timestamps[:] = timestamps
+    window.ids[:] = [None]*(2*window_size) if extras["window_ids"] is None else extras["window_ids"]
+    window.head = window_head
+    window.count = window_count
+    handler.baseline = extras["baseline"]
+    handler.compiled_rules = extras["compiled_rules"]
+
+def save_checkpoint(
+        handler,
+        path:str):
+    """Write the state of a handler that is not running into a file"""
+    write_checkpoint(snapshot_state(handler),path)
+
+def write_checkpoint(
+        state:bytes,
+        path:str):
+    """Write a state created by snapshot_state into a file, replacing it atomically"""
+    temporary_path = path+".tmp"
+    with open(temporary_path,"wb") as file:
+        file.write(state)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path,path)
+
+def load_checkpoint(
+        handler,
+        path:str):
+    """Restore the state of a handler, that is not running yet, from a file written by save_checkpoint or CheckpointWriter"""
+    with open(path,"rb") as file:
+        restore_state(handler,file.read())
+
+def seed_baseline(
+        handler,
+        mean:float,
+        standard_deviation:float,
+        count:int):
+    """Start a handler, that is not running yet, from a precomputed baseline instead of learning it
+
+    The accumulated values are set as if count data points with the given mean and standard deviation had been processed.
+    Rules are checked once the data window is filled with new data, instead of after IGNORE_FIRST_ELEMENTS_COUNT data points.
+    Handlers using a baseline strategy should be given a seeded strategy, e.g. FrozenBaseline, instead.
+    """
+    if handler.baseline is not None:
+        raise ValueError("Handler uses a baseline strategy, seed the strategy instead")
+    if count<1:
+        raise ValueError("Invalid count")
+    handler.data_count = count
+    handler.data_sum = mean*count
+    handler.deviation_sq_sums = standard_deviation*standard_deviation*count
+    handler.mean = mean
+    handler.standard_deviation = standard_deviation
+    handler.ignore_count = count+handler.data_window.size
+
+class CheckpointWriter(Thread):
+    """Periodically write checkpoints of running handlers in the background
+
+    Every interval the handlers are asked to snapshot their state between two batches, which only serializes it in memory.
+    Writing the files happens in this thread, the last checkpoint is written when the stop event is set.
+    Requests are tagged with a round number, a reply arriving after its round has been given up is dropped instead of
+    being written as a later checkpoint. The last round waits at most shutdown_timeout for the handlers.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread
+    - handlers -- Dictionary of checkpoint file path -> NelsonRuleHandler
+    - interval -- Time in seconds between checkpoints, defaults to 60
+    - shutdown_timeout -- Time in seconds to wait for the last checkpoints once the stop event is set, defaults to 5
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            handlers:dict,
+            interval:float=60,
+            shutdown_timeout:float=5) -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.handlers=handlers
+        self.interval=interval
+        self.shutdown_timeout=shutdown_timeout
+        self.snapshot_queue=Queue()
+        self.round=0
+        self.stale_count=0 # Replies dropped because they arrived after their round
+
+    # Runs at thread start
+    def run(self):
+        try:
+            while not self.stop_event.wait(self.interval):
+                self.request_snapshots()
+                self.write_snapshots(self.interval)
+            self.request_snapshots()
+            self.write_snapshots(self.shutdown_timeout)
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(self.ident,e))
+
+    def request_snapshots(self):
+        self.round+=1
+        for path,handler in self.handlers.items():
+            # Only a handler that has finished can be read directly, one not started yet replies once it runs
+            if handler.ident is not None and not handler.is_alive():
+                self.snapshot_queue.put(((self.round,path),snapshot_state(handler)))
+            else:
+                handler.request_snapshot(self.snapshot_queue,(self.round,path))
+
+    # Waits up to timeout for the snapshots of the current round, handlers that are busy are written next time
+    def write_snapshots(
+            self,
+            timeout:float):
+        pending=len(self.handlers)
+        deadline=time.monotonic()+timeout
+        while pending>0:
+            try:
+                (round,path),state=self.snapshot_queue.get(True,max(0,deadline-time.monotonic()))
+            except Empty:
+                break
+            if round!=self.round:
+                self.stale_count+=1
+                continue
+            write_checkpoint(state,path)
+            pending-=1
@@ -0,0 +1,152 @@
+from threading import Lock
+from queue import Queue,Full,Empty
+from pynelson.types import NelsonRuleEvent
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+
+class Subscription(Queue):
+    """Bounded queue of the NelsonRuleEvents an EventBus delivers to a single consumer
+
+    Can be read like any event queue, e.g. by an EventStoreWriter. Filters left at None match every event, the stream
+    id of an event is its stream_id, or the id of its newest trigger point if None. When the queue is full the event bus
+    never waits, it drops the oldest or the newest event and counts it in dropped_count. An exception raised by the
+    predicate does not match the event, it is counted in error_count and kept as last_error.
+
+    Arguments:
+    - stream_ids -- Collection of stream ids to receive, defaults to None
+    - rule_ids -- Collection of rule ids to receive, defaults to None
+    - clear_events -- True for cleared events only, False for triggered events only, defaults to None
+    - predicate -- Callable taking a NelsonRuleEvent, returning True to receive it, defaults to None
+    - maxsize -- Maximum number of events waiting, defaults to 1024
+    - overflow -- "drop_oldest" or "drop_newest", defaults to "drop_oldest"
+    """
+
+    def __init__(
+            self,
+            stream_ids=None,
+            rule_ids=None,
+            clear_events:bool=None,
+            predicate=None,
+            maxsize:int=1024,
+            overflow:str=OVERFLOW_DROP_OLDEST) -> None:
+        if maxsize<1:
+            raise ValueError("Invalid maxsize")
+        if overflow not in (OVERFLOW_DROP_OLDEST,OVERFLOW_DROP_NEWEST):
+            raise ValueError("Invalid overflow policy: "+str(overflow))
+        Queue.__init__(self,maxsize)
+        self.stream_ids=None if stream_ids is None else frozenset(stream_ids)
+        self.rule_ids=None if rule_ids is None else frozenset(rule_ids)
+        self.clear_events=clear_events
+        self.predicate=predicate
+        self.overflow=overflow
+        self.dropped_count=0
+        self.error_count=0
+        self.last_error=None
+        # Several rule handlers can publish to the same bus, counters are updated holding it
+        self.count_lock=Lock()
+
+    def matches(
+            self,
+            event:NelsonRuleEvent,
+            stream_id) -> bool:
+        if not (
+                (self.rule_ids is None or event.rule_id in self.rule_ids) and
+                (self.clear_events is None or event.clear_event==self.clear_events) and
+                (self.stream_ids is None or stream_id in self.stream_ids)):
+            return False
+        if self.predicate is None:
+            return True
+        try:
+            return bool(self.predicate(event))
+        except Exception as e:
+            with self.count_lock:
+                self.error_count+=1
+                self.last_error=e
+            return False
+
+    def offer(
+            self,
+            event:NelsonRuleEvent):
+        """Place an event without waiting, applying the overflow policy when full"""
+        while True:
+            try:
+                self.put_nowait(event)
+                return
+            except Full:
+                with self.count_lock:
+                    self.dropped_count+=1
+                if self.overflow==OVERFLOW_DROP_NEWEST:
+                    return
+            try:
+                self.get_nowait()
+            except Empty:
+                pass
+
+class EventBus:
+    """Fan out NelsonRuleEvents to filtered subscribers
+
+    Pass the event bus as the event queue of rule handlers, or as the output queue of an EventPipeline, and every event is
+    delivered, in the thread placing it, into the queue of every matching Subscription. Subscribers share the event
+    objects, trigger data is never copied, so consumers must not modify them. Delivery never blocks: a slow subscriber
+    only loses its own events, and a failing predicate only affects its own subscription.
+    """
+
+    def __init__(self) -> None:
+        # Replaced, never modified, so put can iterate it while subscriptions change
+        self.subscriptions=()
+        self.published_count=0
+        self.count_lock=Lock()
+
+    def subscribe(
+            self,
+            stream_ids=None,
+            rule_ids=None,
+            clear_events:bool=None,
+            predicate=None,
+            maxsize:int=1024,
+            overflow:str=OVERFLOW_DROP_OLDEST) -> Subscription:
+        """Register a subscriber, arguments as for Subscription, and return its queue"""
+        subscription=Subscription(stream_ids,rule_ids,clear_events,predicate,maxsize,overflow)
+        self.subscriptions=self.subscriptions+(subscription,)
+        return subscription
+
+    def unsubscribe(
+            self,
+            subscription:Subscription):
+        self.subscriptions=tuple(other for other in self.subscriptions if other is not subscription)
+
+    def put(
+            self,
+            event,
+            block:bool=True,
+            timeout:float=None):
+        """Deliver a NelsonRuleEvent, or a list of them, to every matching subscriber"""
+        events=[event] if isinstance(event,NelsonRuleEvent) else event
+        subscriptions=self.subscriptions
+        with self.count_lock:
+            self.published_count+=len(events)
+        for event in events:
+            stream_id=event_stream_id(event)
+            for subscription in subscriptions:
+                if subscription.matches(event,stream_id):
+                    subscription.offer(event)
+
+    def put_nowait(
+            self,
+            event):
+        self.put(event,False)
+
+    def qsize(self) -> int:
+        """Number of events waiting in all subscriptions, an event delivered to several subscribers counts once per subscriber"""
+        return sum(subscription.qsize() for subscription in self.subscriptions)
+
+    def empty(self) -> bool:
+        """True if no subscription has an event waiting"""
+        return all(subscription.empty() for subscription in self.subscriptions)
+
+def event_stream_id(event:NelsonRuleEvent):
+    """Stream id of an event, the id of its newest trigger point if the event has none"""
+    if event.stream_id is not None or len(event.trigger_data)==0:
+        return event.stream_id
+    return event.trigger_data[len(event.trigger_data)-1].id
@@ -0,0 +1,192 @@
+from threading import Thread
+from threading import Event
+from queue import Queue,Empty
+import time
+from pynelson.types import NelsonRuleEvent,ExceptionEvent
+
+CLOCK_WALL = "wall"
+CLOCK_DATA = "data"
+
+class EventPipeline(Thread):
+    """Debounce, coalesce and batch NelsonRuleEvents between a rule handler and its consumers
+
+    Creates a thread reading the event queue of one or more rule handlers. A triggered/cleared event of a rule, per stream,
+    is only delivered once the new state has been held for the minimum hold time and the minimum number of samples of its
+    rule; if the rule flips back before that, both events are dropped. Every flush_interval the delivered events are placed
+    into the output queue as a single list. Events still held back when the stop event is set are delivered on exit.
+
+    Hold time is measured on the wall clock since the event arrived, or with clock "data" on the timestamps of the trigger
+    data, so holds also work in replay and burst mode. Held samples are counted from the sample_index of the event, and with
+    a data rate also estimated from the hold time. How far a stream has progressed is polled at every flush from its source,
+    a rule handler given in sources, and otherwise seen in later events of the same stream. A held event is delivered once
+    it has waited max_hold_time on the wall clock, so a stream that goes quiet cannot hold back a sustained violation.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread
+    - event_queue -- Queue of NelsonRuleEvents produced by the rule handlers
+    - output_queue -- Receives a list of NelsonRuleEvents every flush interval with at least one delivered event
+    - min_hold_time -- Time in seconds a new rule state has to be held, or a dictionary rule_id -> time, defaults to 0
+    - min_hold_samples -- Number of samples a new rule state has to be held, or a dictionary rule_id -> number, defaults to 0
+    - data_rate -- The data rate of the manufacturing process, seconds between samples, defaults to 0
+    - flush_interval -- Time in seconds between deliveries, defaults to 0.1
+    - clock -- "wall" or "data", defaults to "wall"
+    - sources -- Dictionary stream_id -> NelsonRuleHandler producing the events of the stream, its processed_count and
+      current_timestamp are polled at every flush, use the key None for a handler whose events carry no stream_id, defaults to None
+    - max_hold_time -- Time in seconds on the wall clock after which a held event is delivered regardless of its hold,
+      None to wait for the hold indefinitely, defaults to 60
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            event_queue:Queue,
+            output_queue:Queue,
+            min_hold_time=0,
+            min_hold_samples=0,
+            data_rate:float=0,
+            flush_interval:float=0.1,
+            clock:str=CLOCK_WALL,
+            sources:dict=None,
+            max_hold_time:float=60) -> None:
+        Thread.__init__(self)
+        if clock not in (CLOCK_WALL,CLOCK_DATA):
+            raise ValueError("Invalid clock: "+str(clock))
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.event_queue=event_queue
+        self.output_queue=output_queue
+        self.min_hold_time=min_hold_time
+        self.min_hold_samples=min_hold_samples
+        self.data_rate=data_rate
+        self.flush_interval=flush_interval
+        self.clock=clock
+        self.sources={} if sources is None else sources
+        self.max_hold_time=max_hold_time
+
+        self.delivered_states={} # (stream_id, rule_id) -> True if the last delivered event triggered the rule
+        self.pending={} # (stream_id, rule_id) -> (event, arrival time)
+        self.progress={} # stream_id -> (index of the newest checked sample, its timestamp) seen in events or polled from sources
+        self.received_count=0
+        self.delivered_count=0
+        self.suppressed_count=0
+
+    # Runs at thread start
+    def run(self):
+        try:
+            next_flush=time.monotonic()+self.flush_interval
+            while not self.stop_event.is_set():
+                try:
+                    self.process(self.event_queue.get(True,max(0,next_flush-time.monotonic())))
+                except Empty:
+                    pass
+                now=time.monotonic()
+                if now>=next_flush:
+                    self.flush(now)
+                    next_flush=now+self.flush_interval
+            self.flush(force=True)
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(self.ident,e))
+
+    def process(
+            self,
+            event:NelsonRuleEvent,
+            now:float=None):
+        """Register an event, to be delivered by a later flush"""
+        self.received_count+=1
+        self.advance(event)
+        key=(event.stream_id,event.rule_id)
+        if self.delivered_states.get(key,False)==(not event.clear_event):
+            # Flipped back before the previous event got delivered
+            if self.pending.pop(key,None) is not None:
+                self.suppressed_count+=2
+            else:
+                self.suppressed_count+=1
+            return
+        if key in self.pending:
+            self.suppressed_count+=1
+        self.pending[key]=(event,time.monotonic() if now is None else now)
+
+    # Track how far a stream has progressed, as seen in its events
+    def advance(
+            self,
+            event:NelsonRuleEvent):
+        self.advance_stream(event.stream_id,event.sample_index,trigger_timestamp(event))
+
+    def advance_stream(
+            self,
+            stream_id,
+            sample_index:int,
+            timestamp:float):
+        """Record that a stream has checked the sample numbered sample_index, with the given timestamp, either may be None"""
+        newest_index,newest_timestamp=self.progress.get(stream_id,(None,None))
+        if sample_index is not None and (newest_index is None or sample_index>newest_index):
+            newest_index=sample_index
+        if timestamp is not None and (newest_timestamp is None or timestamp>newest_timestamp):
+            newest_timestamp=timestamp
+        self.progress[stream_id]=(newest_index,newest_timestamp)
+
+    # Read how far the source handlers have progressed, the sample index of an event counts the samples checked before it
+    def poll_sources(self):
+        for stream_id,source in self.sources.items():
+            processed_count=source.processed_count
+            if processed_count>0:
+                self.advance_stream(stream_id,processed_count-1,source.current_timestamp)
+
+    def is_held(
+            self,
+            event:NelsonRuleEvent,
+            arrival:float,
+            now:float) -> bool:
+        """True once the state of an event has been held for the minimum time and samples of its rule, or waited max_hold_time"""
+        if self.max_hold_time is not None and now-arrival>=self.max_hold_time:
+            return True
+        sample_index,timestamp=self.progress.get(event.stream_id,(None,None))
+        if self.clock==CLOCK_WALL:
+            held_time=now-arrival
+        else:
+            event_timestamp=trigger_timestamp(event)
+            held_time=0 if event_timestamp is None or timestamp is None else timestamp-event_timestamp
+        held_samples=0 if event.sample_index is None or sample_index is None else sample_index-event.sample_index
+        if self.data_rate>0:
+            held_samples=max(held_samples,held_time/self.data_rate)
+        return (
+            held_time>=rule_setting(self.min_hold_time,event.rule_id) and
+            held_samples>=rule_setting(self.min_hold_samples,event.rule_id))
+
+    def flush(
+            self,
+            now:float=None,
+            force:bool=False) -> list:
+        """Deliver every pending event that has been held long enough, or every pending event if force, returns the delivered events"""
+        if now is None:
+            now=time.monotonic()
+        self.poll_sources()
+        ready=[(arrival,key,event) for key,(event,arrival) in self.pending.items() if force or self.is_held(event,arrival,now)]
+        if len(ready)==0:
+            return []
+        ready.sort(key=lambda item:item[0])
+        events=[]
+        for arrival,key,event in ready:
+            del self.pending[key]
+            self.delivered_states[key]=not event.clear_event
+            events.append(event)
+        self.delivered_count+=len(events)
+        self.output_queue.put(events)
+        return events
+
+def rule_setting(
+        setting,
+        rule_id:int):
+    """Value of a setting given for all rules, or as a dictionary rule_id -> value where missing rules get 0"""
+    if isinstance(setting,dict):
+        return setting.get(rule_id,0)
+    return setting
+
+def trigger_timestamp(event:NelsonRuleEvent) -> float:
+    """Timestamp of the newest trigger point of an event, None if it has none"""
+    if len(event.trigger_data)==0:
+        return None
+    return event.trigger_data[len(event.trigger_data)-1].timestamp
@@ -0,0 +1,208 @@
+from threading import Thread
+from threading import Event
+from queue import Queue
+from array import array
+import sqlite3
+from pynelson.types import NelsonRuleEvent,ExceptionEvent,TriggerData
+from pynelson.ingest import get_batch
+
+# Matches events of every stream in EventStore queries
+ANY_STREAM = object()
+
+# stream_id and rule_id are declared without a type, so integer and text ids keep their type
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    stream_id,
+    rule_id,
+    clear_event INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    trigger_values BLOB NOT NULL,
+    trigger_timestamps BLOB NOT NULL);
+CREATE INDEX IF NOT EXISTS events_stream_rule_timestamp ON events (stream_id, rule_id, timestamp);
+"""
+
+class EventStore:
+    """Persist NelsonRuleEvents and their trigger data in a local SQLite database
+
+    Every event is a row with its stream id, rule id, state and the timestamp of its newest trigger point; trigger values and
+    timestamps are stored as float64 blobs. The stream id is the event's stream_id, or the id of its newest trigger point if None.
+    A connection may only be used by the thread that opened it.
+
+    Arguments:
+    - path -- Path of the database file, created if it does not exist
+    """
+
+    def __init__(
+            self,
+            path:str) -> None:
+        self.connection=sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+    def write(
+            self,
+            events:list):
+        """Insert events in a single transaction"""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO events (stream_id,rule_id,clear_event,timestamp,trigger_values,trigger_timestamps) VALUES (?,?,?,?,?,?)",
+                (event_row(event) for event in events))
+
+    def query(
+            self,
+            stream_id=ANY_STREAM,
+            rule_id=None,
+            start:float=None,
+            end:float=None,
+            clear_event:bool=None,
+            limit:int=None) -> list:
+        """Return stored events, oldest first
+
+        Arguments:
+        - stream_id -- Only events of this stream, defaults to every stream
+        - rule_id -- Only events of this rule, defaults to every rule
+        - start -- Only events with a timestamp at or after start, defaults to None
+        - end -- Only events with a timestamp before end, defaults to None
+        - clear_event -- Only triggered (False) or cleared (True) events, defaults to both
+        - limit -- Maximum number of events, the oldest are returned first, defaults to None
+        """
+        conditions=[]
+        parameters=[]
+        if stream_id is not ANY_STREAM:
+            conditions.append("stream_id IS ?")
+            parameters.append(stream_id)
+        if rule_id is not None:
+            conditions.append("rule_id=?")
+            parameters.append(rule_id)
+        if start is not None:
+            conditions.append("timestamp>=?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("timestamp<?")
+            parameters.append(end)
+        if clear_event is not None:
+            conditions.append("clear_event=?")
+            parameters.append(int(clear_event))
+        statement="SELECT stream_id,rule_id,clear_event,trigger_values,trigger_timestamps FROM events"
+        if len(conditions)>0:
+            statement+=" WHERE "+" AND ".join(conditions)
+        statement+=" ORDER BY timestamp,id"
+        if limit is not None:
+            statement+=" LIMIT ?"
+            parameters.append(limit)
+        return [row_event(row) for row in self.connection.execute(statement,parameters)]
+
+    def open_violations(
+            self,
+            stream_id=ANY_STREAM) -> list:
+        """Return the triggering event of every rule, per stream, that has not been cleared since"""
+        statement="SELECT stream_id,rule_id,clear_event,trigger_values,trigger_timestamps FROM events WHERE id IN (SELECT max(id) FROM events"
+        parameters=[]
+        if stream_id is not ANY_STREAM:
+            statement+=" WHERE stream_id IS ?"
+            parameters.append(stream_id)
+        statement+=" GROUP BY stream_id,rule_id) AND clear_event=0 ORDER BY timestamp,id"
+        return [row_event(row) for row in self.connection.execute(statement,parameters)]
+
+    def close(self):
+        self.connection.close()
+
+def event_row(event:NelsonRuleEvent) -> tuple:
+    trigger_data=event.trigger_data
+    if isinstance(trigger_data,TriggerData):
+        values=array('d',trigger_data.values)
+        timestamps=array('d',trigger_data.timestamps)
+        ids=trigger_data.ids
+    else:
+        values=array('d',[data.value for data in trigger_data])
+        timestamps=array('d',[data.timestamp for data in trigger_data])
+        ids=[data.id for data in trigger_data]
+    stream_id=event.stream_id
+    if stream_id is None and ids is not None and len(ids)>0:
+        stream_id=ids[-1]
+    return (
+        stream_id,
+        event.rule_id,
+        int(event.clear_event),
+        timestamps[-1] if len(timestamps)>0 else 0.0,
+        values.tobytes(),
+        timestamps.tobytes())
+
+def row_event(row:tuple) -> NelsonRuleEvent:
+    stream_id,rule_id,clear_event,values,timestamps=row
+    values=array('d',values)
+    return NelsonRuleEvent(
+        rule_id,
+        bool(clear_event),
+        TriggerData(values,array('d',timestamps),[stream_id]*len(values)),
+        stream_id)
+
+class EventStoreWriter(Thread):
+    """Write NelsonRuleEvents into an EventStore from a background thread
+
+    Events are taken from the event queue of rule handlers, or the lists delivered by an EventPipeline, and inserted in one
+    transaction per batch. A batch is written once it holds batch_size queue items or flush_interval has passed since its first item.
+    Events still waiting when the stop event is set are written before the thread ends.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread
+    - event_queue -- Queue of NelsonRuleEvents or lists of NelsonRuleEvents
+    - path -- Path of the database file, created if it does not exist
+    - batch_size -- Maximum number of queue items written per transaction, defaults to 1024
+    - flush_interval -- Maximum time in seconds an event waits before it is written, defaults to 1
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            event_queue:Queue,
+            path:str,
+            batch_size:int=1024,
+            flush_interval:float=1) -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.event_queue=event_queue
+        self.path=path
+        self.batch_size=batch_size
+        self.flush_interval=flush_interval
+        self.written_count=0
+
+    # Runs at thread start
+    def run(self):
+        try:
+            store=EventStore(self.path)
+            try:
+                while not self.stop_event.is_set():
+                    self.write_batch(store,get_batch(self.event_queue,self.batch_size,0.1,self.flush_interval))
+                while not self.event_queue.empty():
+                    self.write_batch(store,get_batch(self.event_queue,self.batch_size,0))
+            finally:
+                store.close()
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(self.ident,e))
+
+    def write_batch(
+            self,
+            store:EventStore,
+            batch:list):
+        events=[]
+        for item in batch:
+            if isinstance(item,NelsonRuleEvent):
+                events.append(item)
+            else:
+                events.extend(item)
+        if len(events)>0:
+            store.write(events)
+            self.written_count+=len(events)
@@ -0,0 +1,337 @@
+from threading import Thread
+from threading import Event
+from threading import Lock
+from queue import Queue
+import functools
+import math
+import os
+import socket
+import socketserver
+import struct
+import time
+from pynelson.types import ExceptionEvent
+from pynelson.baseline import Baseline,WelfordBaseline
+
+# count, mean, M2
+STATISTICS = struct.Struct("<qdd")
+LENGTH = struct.Struct("<H")
+
+class RunningStatistics:
+    """Mergeable summary of a set of values: count, mean and M2, the sum of squared differences from the mean
+
+    merge is associative and commutative, summaries of any partition of the values can be merged in any order into the
+    summary of all values (Chan et al.).
+
+    Arguments:
+    - count: Number of values, defaults to 0
+    - mean: Mean of the values, defaults to 0
+    - m2: Sum of squared differences from the mean, defaults to 0
+    """
+
+    __slots__=("count","mean","m2")
+
+    def __init__(
+            self,
+            count:int=0,
+            mean:float=0.0,
+            m2:float=0.0) -> None:
+        self.count=count
+        self.mean=mean
+        self.m2=m2
+
+    @classmethod
+    def from_values(
+            cls,
+            values):
+        statistics=cls()
+        for value in values:
+            statistics.add(value)
+        return statistics
+
+    @classmethod
+    def from_baseline(
+            cls,
+            baseline:Baseline):
+        """Summary of the values aggregated by a baseline strategy, exact for WelfordBaseline and FleetBaseline
+
+        Only a FleetBaseline can be read while its handler is running, other strategies are read without synchronization.
+        """
+        if isinstance(baseline,FleetBaseline):
+            return baseline.local_statistics()
+        if isinstance(baseline,WelfordBaseline):
+            return cls(baseline.count,baseline.mean,baseline.m2)
+        return cls(baseline.count,baseline.mean,baseline.standard_deviation*baseline.standard_deviation*baseline.count)
+
+    @property
+    def standard_deviation(self) -> float:
+        """Population standard deviation, as used by the rule handlers"""
+        return math.sqrt(self.m2/self.count) if self.count>0 else 0.0
+
+    def add(
+            self,
+            value:float):
+        self.count+=1
+        delta=value-self.mean
+        self.mean+=delta/self.count
+        self.m2+=delta*(value-self.mean)
+
+    def merge(
+            self,
+            other) -> "RunningStatistics":
+        """Return the summary of the values of both summaries"""
+        count=self.count+other.count
+        if count==0:
+            return RunningStatistics()
+        delta=other.mean-self.mean
+        return RunningStatistics(
+            count,
+            self.mean+delta*other.count/count,
+            self.m2+other.m2+delta*delta*self.count*other.count/count)
+
+    def __add__(self,other):
+        return self.merge(other)
+
+    def to_bytes(self) -> bytes:
+        return STATISTICS.pack(self.count,self.mean,self.m2)
+
+    @classmethod
+    def from_bytes(
+            cls,
+            data:bytes):
+        return cls(*STATISTICS.unpack(data))
+
+def merge_all(statistics) -> RunningStatistics:
+    """Merge any number of summaries"""
+    return functools.reduce(RunningStatistics.merge,statistics,RunningStatistics())
+
+class FleetBaseline(Baseline):
+    """Baseline strategy checking against limits shared by a product family, while summarizing the handler's own data
+
+    Every value is aggregated into a local WelfordBaseline, which is what an AggregationClient pushes. Until limits
+    have been set, the rules are checked against the local baseline. The local baseline is updated holding a lock, so
+    local_statistics can be called from any thread.
+
+    Arguments:
+    - mean -- Initial fleet mean, defaults to None
+    - standard_deviation -- Initial fleet standard deviation, defaults to None
+    """
+
+    def __init__(
+            self,
+            mean:float=None,
+            standard_deviation:float=None) -> None:
+        Baseline.__init__(self)
+        self.local=WelfordBaseline()
+        self.local_lock=Lock()
+        self.limits=None if mean is None else (mean,standard_deviation)
+        if self.limits is not None:
+            self.mean,self.standard_deviation=self.limits
+
+    # The lock cannot be pickled, a restored baseline gets a new one
+    def __getstate__(self):
+        state=dict(self.__dict__)
+        del state["local_lock"]
+        return state
+
+    def __setstate__(self,state):
+        self.__dict__.update(state)
+        self.local_lock=Lock()
+
+    def local_statistics(self) -> RunningStatistics:
+        """Consistent RunningStatistics of the local baseline, may be called from any thread"""
+        with self.local_lock:
+            return RunningStatistics(self.local.count,self.local.mean,self.local.m2)
+
+    def set_limits(
+            self,
+            mean:float,
+            standard_deviation:float):
+        """Replace the fleet limits, may be called from any thread"""
+        self.limits=(mean,standard_deviation)
+
+    def add(
+            self,
+            value:float):
+        with self.local_lock:
+            self.local.add(value)
+        self.count=self.local.count
+        limits=self.limits
+        if limits is None:
+            self.mean=self.local.mean
+            self.standard_deviation=self.local.standard_deviation
+        else:
+            self.mean,self.standard_deviation=limits
+
+def encode_string(value:str) -> bytes:
+    data=value.encode()
+    return LENGTH.pack(len(data))+data
+
+def receive_exactly(
+        connection:socket.socket,
+        size:int) -> bytes:
+    data=b""
+    while len(data)<size:
+        chunk=connection.recv(size-len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data+=chunk
+    return data
+
+def receive_string(connection:socket.socket) -> str:
+    return receive_exactly(connection,LENGTH.unpack(receive_exactly(connection,LENGTH.size))[0]).decode()
+
+class AggregationServer(Thread):
+    """Combine the statistics pushed by many handlers into baselines per product family
+
+    Creates a thread accepting pushes on a local TCP port or Unix socket, every connection is answered in a thread of
+    its own, so a slow client does not hold up the others. A push carries a family, a source name and the source's
+    RunningStatistics; the latest push of every source is kept and the answer is the merge of all sources of the family.
+    Sources that have not pushed within max_age seconds are left out.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread
+    - address -- (host, port) for TCP or a path for a Unix socket, defaults to ("127.0.0.1", 9470)
+    - max_age -- Time in seconds after which a source that stopped pushing is left out, defaults to None keeping every source
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            address=("127.0.0.1",9470),
+            max_age:float=None) -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.max_age=max_age
+        self.sources={} # family -> {source -> (RunningStatistics, time of push)}
+        self.sources_lock=Lock()
+        aggregator=self
+
+        class RequestHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                self.request.settimeout(5)
+                try:
+                    family=receive_string(self.request)
+                    source=receive_string(self.request)
+                    statistics=RunningStatistics.from_bytes(receive_exactly(self.request,STATISTICS.size))
+                    self.request.sendall(aggregator.push(family,source,statistics).to_bytes())
+                except OSError:
+                    # A client that disconnects or stalls is dropped, it pushes again next interval
+                    pass
+
+        self.address=address
+        if isinstance(address,str):
+            self.server=socketserver.ThreadingUnixStreamServer(address,RequestHandler)
+        else:
+            self.server=socketserver.ThreadingTCPServer(address,RequestHandler)
+        self.server.daemon_threads=True
+        self.server.timeout=0.5
+
+    # Runs at thread start
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                self.server.handle_request()
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(self.ident,e))
+        finally:
+            self.server.server_close()
+            if isinstance(self.address,str):
+                os.unlink(self.address)
+
+    def push(
+            self,
+            family:str,
+            source:str,
+            statistics:RunningStatistics) -> RunningStatistics:
+        """Store the statistics of a source and return the combined statistics of its family"""
+        now=time.monotonic()
+        with self.sources_lock:
+            self.sources.setdefault(family,{})[source]=(statistics,now)
+        return self.combined(family,now)
+
+    def combined(
+            self,
+            family:str,
+            now:float=None) -> RunningStatistics:
+        """Merge of the latest statistics of every source of a family"""
+        if now is None:
+            now=time.monotonic()
+        with self.sources_lock:
+            sources=self.sources.get(family,{})
+            if self.max_age is not None:
+                for source in [source for source,(_,pushed) in sources.items() if now-pushed>self.max_age]:
+                    del sources[source]
+            return merge_all(statistics for statistics,_ in sources.values())
+
+def push_statistics(
+        address,
+        family:str,
+        source:str,
+        statistics:RunningStatistics,
+        timeout:float=5) -> RunningStatistics:
+    """Push statistics to an AggregationServer and return the combined statistics of the family"""
+    family_socket=socket.AF_UNIX if isinstance(address,str) else socket.AF_INET
+    with socket.socket(family_socket,socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(address)
+        connection.sendall(encode_string(family)+encode_string(source)+statistics.to_bytes())
+        return RunningStatistics.from_bytes(receive_exactly(connection,STATISTICS.size))
+
+class AggregationClient(Thread):
+    """Periodically push the statistics of a handler using a FleetBaseline and apply the combined baseline as frozen limits
+
+    The statistics are read from the baseline while the handler is running, as a consistent snapshot taken under its lock.
+    Failed pushes are reported to the exception queue and retried next interval.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread
+    - baseline -- FleetBaseline of the handler
+    - family -- Name of the product family
+    - source -- Unique name of the handler within the family
+    - address -- Address of the AggregationServer, defaults to ("127.0.0.1", 9470)
+    - interval -- Time in seconds between pushes, defaults to 60
+    - min_count -- Minimum number of combined data points before limits are applied, defaults to 1
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            baseline:FleetBaseline,
+            family:str,
+            source:str,
+            address=("127.0.0.1",9470),
+            interval:float=60,
+            min_count:int=1) -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.baseline=baseline
+        self.family=family
+        self.source=source
+        self.address=address
+        self.interval=interval
+        self.min_count=min_count
+        self.combined=None
+
+    # Runs at thread start
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.push()
+            except Exception as e:
+                self.exception_queue.put(
+                    ExceptionEvent(self.ident,e))
+
+    def push(self) -> RunningStatistics:
+        """Push the local statistics once and apply the combined baseline"""
+        combined=push_statistics(self.address,self.family,self.source,RunningStatistics.from_baseline(self.baseline))
+        self.combined=combined
+        if combined.count>=self.min_count:
+            self.baseline.set_limits(combined.mean,combined.standard_deviation)
+        return combined
@@ -0,0 +1,222 @@
+from threading import Lock
+from array import array
+import tempfile
+import numpy as np
+from pynelson.types import DataBatch
+
+class HistoryBuffer:
+    """Recent data points of a single stream, the newest in memory and older ones spilled to a memory-mapped ring file
+
+    The newest points are appended to a preallocated in-memory block of memory_size points. Once the block is full it is
+    copied in one operation into a ring file holding file_size further points, overwriting the oldest spilled points.
+    Memory used by the process stays fixed, the ring file is paged in by the operating system only while being read.
+    Every point is numbered in the order it was appended, points older than the newest memory_size+file_size are lost.
+    Only values and timestamps are kept, lookups by time assume timestamps do not decrease.
+
+    Appending must happen from a single thread, reading is safe from any thread.
+
+    Arguments:
+    - memory_size -- Number of newest data points kept in memory, defaults to 65536
+    - file_size -- Number of older data points kept in the ring file, defaults to 16 times memory_size
+    - path -- Path of the ring file, created or overwritten, defaults to None using an anonymous temporary file
+    """
+
+    def __init__(
+            self,
+            memory_size:int=65536,
+            file_size:int=None,
+            path:str=None) -> None:
+        if file_size is None:
+            file_size=16*memory_size
+        if memory_size<1 or file_size<1:
+            raise ValueError("Invalid history size")
+        self.memory_size=memory_size
+        self.file_size=file_size
+        self.path=path
+        self.memory_values=array('d',bytes(8*memory_size))
+        self.memory_timestamps=array('d',bytes(8*memory_size))
+        self.memory_count=0
+        self.spilled_count=0 # Number of points moved to the ring file, the number of the oldest point in memory
+        self.file=tempfile.TemporaryFile() if path is None else open(path,"w+b")
+        # Row 0 holds values, row 1 timestamps
+        self.ring=np.memmap(self.file,dtype=np.float64,mode="w+",shape=(2,file_size))
+        # Held while spilling and reading, appending to the memory block never touches points a reader can see as unread
+        self.lock=Lock()
+
+    def __len__(self):
+        """Number of data points retained"""
+        return min(self.spilled_count,self.file_size)+self.memory_count
+
+    @property
+    def count(self) -> int:
+        """Number of data points appended so far, the number the next point will get"""
+        return self.spilled_count+self.memory_count
+
+    @property
+    def first(self) -> int:
+        """Number of the oldest data point retained"""
+        return max(self.spilled_count-self.file_size,0)
+
+    def append(
+            self,
+            value:float,
+            timestamp:float):
+        memory_count=self.memory_count
+        if memory_count==self.memory_size:
+            self.spill()
+            memory_count=0
+        self.memory_values[memory_count]=value
+        self.memory_timestamps[memory_count]=timestamp
+        self.memory_count=memory_count+1
+
+    def append_many(
+            self,
+            values,
+            timestamps):
+        """Append columns of values and timestamps, e.g. those of a DataBatch"""
+        values=np.asarray(values,dtype=np.float64)
+        timestamps=np.asarray(timestamps,dtype=np.float64)
+        start=0
+        while start<len(values):
+            if self.memory_count==self.memory_size:
+                self.spill()
+            end=min(len(values),start+self.memory_size-self.memory_count)
+            memory_values=np.frombuffer(self.memory_values)
+            memory_timestamps=np.frombuffer(self.memory_timestamps)
+            memory_values[self.memory_count:self.memory_count+end-start]=values[start:end]
+            memory_timestamps[self.memory_count:self.memory_count+end-start]=timestamps[start:end]
+            self.memory_count+=end-start
+            start=end
+
+    # Move the full memory block into the ring file
+    def spill(self):
+        with self.lock:
+            values=np.frombuffer(self.memory_values)
+            timestamps=np.frombuffer(self.memory_timestamps)
+            # A block larger than the ring file only leaves its newest points
+            skip=max(self.memory_size-self.file_size,0)
+            position=(self.spilled_count+skip)%self.file_size
+            length=self.memory_size-skip
+            head=min(length,self.file_size-position)
+            self.ring[0,position:position+head]=values[skip:skip+head]
+            self.ring[1,position:position+head]=timestamps[skip:skip+head]
+            self.ring[0,:length-head]=values[skip+head:]
+            self.ring[1,:length-head]=timestamps[skip+head:]
+            self.spilled_count+=self.memory_size
+            self.memory_count=0
+
+    # Views of the retained points numbered start up to end, in order, must be called holding the lock
+    def segments(
+            self,
+            start:int,
+            end:int) -> list:
+        start=max(start,self.first)
+        end=min(end,self.count)
+        segments=[]
+        if start<min(end,self.spilled_count):
+            file_end=min(end,self.spilled_count)
+            position=start%self.file_size
+            length=file_end-start
+            head=min(length,self.file_size-position)
+            segments.append((self.ring[0,position:position+head],self.ring[1,position:position+head]))
+            if length>head:
+                segments.append((self.ring[0,:length-head],self.ring[1,:length-head]))
+        if end>self.spilled_count:
+            memory_start=max(start-self.spilled_count,0)
+            memory_end=end-self.spilled_count
+            segments.append((
+                np.frombuffer(self.memory_values)[memory_start:memory_end],
+                np.frombuffer(self.memory_timestamps)[memory_start:memory_end]))
+        return segments
+
+    def read(
+            self,
+            start:int,
+            end:int) -> DataBatch:
+        """Copy the retained points numbered start up to, but not including, end into a DataBatch"""
+        with self.lock:
+            segments=self.segments(start,end)
+            values=np.concatenate([values for values,_ in segments]) if segments else np.empty(0)
+            timestamps=np.concatenate([timestamps for _,timestamps in segments]) if segments else np.empty(0)
+        return DataBatch(values,timestamps)
+
+    def locate(
+            self,
+            timestamp:float) -> int:
+        """Number of the first retained point with a timestamp of at least timestamp, count if there is none"""
+        with self.lock:
+            position=self.first
+            for _,timestamps in self.segments(self.first,self.count):
+                index=int(np.searchsorted(timestamps,timestamp))
+                position+=index
+                if index<len(timestamps):
+                    break
+            return position
+
+    def read_between(
+            self,
+            start:float,
+            end:float) -> DataBatch:
+        """Copy the retained points with timestamps from start up to and including end into a DataBatch"""
+        return self.read(self.locate(start),self.locate(np.nextafter(end,np.inf)))
+
+    @property
+    def last_timestamp(self) -> float:
+        """Timestamp of the newest point, None if there is none"""
+        with self.lock:
+            if self.memory_count>0:
+                return self.memory_timestamps[self.memory_count-1]
+            if self.spilled_count>0:
+                return float(self.ring[1,(self.spilled_count-1)%self.file_size])
+            return None
+
+    def close(self):
+        """Release the ring file, an anonymous file is deleted"""
+        with self.lock:
+            self.ring=None
+            self.file.close()
+
+class TriggerContext:
+    """Lazy accessor for the data around the data point that was checked when an event was emitted
+
+    Holds only a reference to the HistoryBuffer of the stream and the number and timestamp of the point, data is copied
+    from the history when requested. Data after the point becomes available as the stream continues, points no longer
+    retained by the history are left out.
+
+    Arguments:
+    - history -- HistoryBuffer of the stream
+    - index -- Number of the data point in the history
+    - timestamp -- Timestamp of the data point
+    """
+
+    __slots__=("history","index","timestamp")
+
+    def __init__(
+            self,
+            history:HistoryBuffer,
+            index:int,
+            timestamp:float) -> None:
+        self.history=history
+        self.index=index
+        self.timestamp=timestamp
+
+    def around(
+            self,
+            before:float,
+            after:float) -> DataBatch:
+        """Points from before seconds ahead of the trigger point up to after seconds past it"""
+        return self.history.read_between(self.timestamp-before,self.timestamp+after)
+
+    def points(
+            self,
+            before:int,
+            after:int) -> DataBatch:
+        """The before points ahead of the trigger point, the trigger point and the after points following it"""
+        return self.history.read(self.index-before,self.index+after+1)
+
+    def is_complete(
+            self,
+            after:float) -> bool:
+        """True once the stream has passed after seconds past the trigger point"""
+        last_timestamp=self.history.last_timestamp
+        return last_timestamp is not None and last_timestamp>=self.timestamp+after
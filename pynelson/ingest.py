@@ -0,0 +1,37 @@
+from queue import Queue,Empty
+import time
+
+def get_batch(
+        data_queue:Queue,
+        batch_size:int,
+        poll_interval:float,
+        max_delay:float=0) -> list:
+    """Take up to batch_size items from a queue with a single wakeup
+
+    Waits at most poll_interval for the first item, returning an empty list if none arrived, so callers can recheck their stop event.
+    Then drains every item already waiting; with max_delay set, keeps waiting for further items until the batch is full
+    or max_delay has passed since the first item was taken.
+
+    Arguments:
+    - data_queue -- Queue to take items from
+    - batch_size -- Maximum number of items returned
+    - poll_interval -- Maximum time in seconds to wait for the first item
+    - max_delay -- Maximum time in seconds to wait for the batch to fill up, defaults to 0
+    """
+    try:
+        batch=[data_queue.get(True,poll_interval)]
+    except Empty:
+        return []
+    deadline=time.monotonic()+max_delay
+    while len(batch)<batch_size:
+        try:
+            batch.append(data_queue.get_nowait())
+        except Empty:
+            remaining=deadline-time.monotonic()
+            if remaining<=0:
+                break
+            try:
+                batch.append(data_queue.get(True,remaining))
+            except Empty:
+                break
+    return batch
@@ -0,0 +1,97 @@
+from threading import Thread
+from threading import Event
+from queue import Queue
+from http.server import HTTPServer,BaseHTTPRequestHandler
+from pynelson.types import ExceptionEvent
+
+# Metric name, type, help text and key of NelsonRuleHandler.get_metrics
+HANDLER_METRICS = [
+    ("pynelson_samples_processed_total","counter","Number of data points checked","samples_processed"),
+    ("pynelson_samples_shed_total","counter","Number of data points shed before reaching the handler","samples_shed"),
+    ("pynelson_queue_depth","gauge","Number of items waiting in the data queue","queue_depth"),
+    ("pynelson_ingestion_lag_seconds","gauge","Seconds between the timestamp of the last data point and the time it was checked","ingestion_lag"),
+    ("pynelson_seconds_since_last_sample","gauge","Seconds since the last data point was checked","seconds_since_last_sample"),
+    ("pynelson_mean","gauge","Current mean","mean"),
+    ("pynelson_standard_deviation","gauge","Current standard deviation","standard_deviation")]
+
+def format_prometheus(handlers:dict) -> str:
+    """Render the metrics of rule handlers in the Prometheus text exposition format
+
+    Arguments:
+    - handlers -- Dictionary of name -> NelsonRuleHandler, the name is used as the handler label
+    """
+    snapshots = {name:handler.get_metrics() for name,handler in handlers.items()}
+    lines = []
+    for metric,metric_type,help_text,key in HANDLER_METRICS:
+        lines.append("# HELP "+metric+" "+help_text)
+        lines.append("# TYPE "+metric+" "+metric_type)
+        for name,snapshot in snapshots.items():
+            if snapshot[key] is not None:
+                lines.append(metric+"{handler=\""+escape_label(name)+"\"} "+repr(float(snapshot[key])))
+    for metric,metric_type,help_text,key in (
+            ("pynelson_events_emitted_total","counter","Number of events placed into the event queue","events_emitted"),
+            ("pynelson_rule_evaluation_seconds","gauge","Average seconds spent evaluating a rule on sampled data points","rule_evaluation_seconds")):
+        lines.append("# HELP "+metric+" "+help_text)
+        lines.append("# TYPE "+metric+" "+metric_type)
+        for name,snapshot in snapshots.items():
+            for rule_id,value in snapshot[key].items():
+                lines.append(metric+"{handler=\""+escape_label(name)+"\",rule=\""+escape_label(rule_id)+"\"} "+repr(float(value)))
+    return "\n".join(lines)+"\n"
+
+def escape_label(value) -> str:
+    return str(value).replace("\\","\\\\").replace("\"","\\\"").replace("\n","\\n")
+
+class MetricsExporter(Thread):
+    """Serve the metrics of rule handlers in the Prometheus text format on a local HTTP port
+
+    Creates a thread answering GET /metrics until the stop event is set.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread
+    - handlers -- Dictionary of name -> NelsonRuleHandler, the name is used as the handler label
+    - port -- Port to listen on, defaults to 9464
+    - host -- Address to listen on, defaults to 127.0.0.1
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            handlers:dict,
+            port:int=9464,
+            host:str="127.0.0.1") -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.handlers=handlers
+        exporter=self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path!="/metrics":
+                    self.send_error(404)
+                    return
+                body=format_prometheus(exporter.handlers).encode()
+                self.send_response(200)
+                self.send_header("Content-Type","text/plain; version=0.0.4")
+                self.send_header("Content-Length",str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self,format,*args):
+                pass
+
+        self.server=HTTPServer((host,port),RequestHandler)
+        self.server.timeout=0.5
+
+    # Runs at thread start
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                self.server.handle_request()
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(self.ident,e))
+        finally:
+            self.server.server_close()
@@ -0,0 +1,391 @@
+from threading import Thread
+from threading import Event
+from queue import Queue
+from array import array
+import numpy as np
+import pynelson
+from pynelson.types import Data,DataBatch,DataShed,NelsonRuleEvent,ExceptionEvent,TriggerData
+from pynelson.batch import TRIGGER_DATA_OFFSETS
+from pynelson.ingest import get_batch
+
+class MultiStreamEngine:
+    """Apply Nelson Rules to any number of data streams at once
+
+    Data is routed by its stream id, every stream is checked exactly like a separate NelsonRuleHandler would check it.
+    The state of all streams is kept in struct-of-arrays form, one NumPy array per rule variable indexed by stream slot,
+    so a batch of data is evaluated for all streams in a handful of array operations.
+
+    Arguments:
+    - window_size -- Number of most recent data points kept per stream, at least 15, defaults to 15
+    - capacity -- Number of streams to allocate state for up front, grows when exceeded, defaults to 64
+    """
+
+    def __init__(
+            self,
+            window_size:int=15,
+            capacity:int=64) -> None:
+        if window_size<15:
+            raise ValueError("Window size must be at least 15")
+        self.window_size=window_size
+        self.capacity=0
+        self.stream_ids=[]
+        self.stream_slots={}
+
+        self.data_sum=np.zeros(0)
+        self.data_count=np.zeros(0,dtype=np.int64)
+        self.deviation_sq_sums=np.zeros(0)
+        self.mean=np.zeros(0)
+        self.standard_deviation=np.zeros(0)
+        self.previous_value=np.zeros(0)
+
+        # NR 2 variables
+        self.same_side_mean_count=np.zeros(0,dtype=np.int64)
+
+        # NR 3 variables
+        self.rule3_increasing=np.zeros(0,dtype=bool)
+        self.continuous_slope_change_count=np.zeros(0,dtype=np.int64)
+
+        # NR 4 variables
+        self.expect_increase=np.zeros(0,dtype=bool)
+        self.continuous_alt_direction_count=np.zeros(0,dtype=np.int64)
+
+        # NR 5+6 variables, every point is stored twice so the newest window_size points are contiguous
+        self.window_values=np.zeros((0,2*window_size))
+        self.window_timestamps=np.zeros((0,2*window_size))
+        self.window_head=np.zeros(0,dtype=np.int64)
+
+        # NR 7 variables
+        self.within_standard_deviation_count=np.zeros(0,dtype=np.int64)
+
+        # NR 8 variables, sides holds whether the current run has points above and below
+        self.none_within_standard_deviation_count=np.zeros(0,dtype=np.int64)
+        self.none_within_standard_deviation_sides=np.zeros((0,2),dtype=bool)
+
+        # Events, one column per rule
+        self.rule_events=np.zeros((0,8),dtype=bool)
+
+        # Shed data points, events of a stream are flagged as degraded until its data_count reaches degraded_until
+        self.shed_count=0
+        self.degraded_until=np.zeros(0,dtype=np.int64)
+
+        self.grow(capacity)
+
+    def __len__(self):
+        return len(self.stream_ids)
+
+    def grow(
+            self,
+            capacity:int):
+        """Allocate state for at least capacity streams"""
+        if capacity<=self.capacity:
+            return
+        for name,value in list(vars(self).items()):
+            if isinstance(value,np.ndarray):
+                grown=np.zeros((capacity,)+value.shape[1:],dtype=value.dtype)
+                grown[:self.capacity]=value
+                setattr(self,name,grown)
+        self.capacity=capacity
+
+    def get_slot(
+            self,
+            stream_id) -> int:
+        """Return the state slot of a stream, registering it on first use"""
+        slot=self.stream_slots.get(stream_id)
+        if slot is None:
+            slot=len(self.stream_ids)
+            if slot==self.capacity:
+                self.grow(2*self.capacity)
+            self.stream_slots[stream_id]=slot
+            self.stream_ids.append(stream_id)
+        return slot
+
+    def record_shed(
+            self,
+            count:int):
+        """Record data points shed before reaching the engine, e.g. reported by a DataShed marker
+
+        It is not known which streams lost data, so the events of every stream are flagged as degraded until its data window has been refilled.
+        """
+        self.shed_count+=count
+        streams=len(self.stream_ids)
+        self.degraded_until[:streams]=self.data_count[:streams]+self.window_size
+
+    def process(
+            self,
+            data_list:list) -> list:
+        """Check a list of Data objects, routed by their id, and return the triggered/cleared NelsonRuleEvents"""
+        return self.process_arrays(
+            [data.id for data in data_list],
+            [data.value for data in data_list],
+            [data.timestamp for data in data_list])
+
+    def process_batch(
+            self,
+            batch:DataBatch) -> list:
+        """Check a DataBatch, routed by its ids, and return the triggered/cleared NelsonRuleEvents"""
+        ids=batch.ids if batch.ids is not None else [batch.id]*len(batch)
+        return self.process_arrays(ids,batch.values,batch.timestamps)
+
+    def process_arrays(
+            self,
+            stream_ids,
+            values,
+            timestamps) -> list:
+        """Check columns of stream ids, values and timestamps and return the triggered/cleared NelsonRuleEvents
+
+        Order is preserved per stream, events of a stream are returned in the order a NelsonRuleHandler would emit them.
+        Stream ids given as a NumPy array of numbers or strings are looked up once per distinct id.
+        """
+        if isinstance(stream_ids,np.ndarray) and stream_ids.dtype!=object:
+            unique_ids,inverse=np.unique(stream_ids,return_inverse=True)
+            slots=np.fromiter(map(self.get_slot,unique_ids.tolist()),dtype=np.int64,count=len(unique_ids))[inverse]
+        else:
+            slots=np.fromiter(map(self.get_slot,stream_ids),dtype=np.int64,count=len(stream_ids))
+        values=np.asarray(values,dtype=np.float64)
+        timestamps=np.asarray(timestamps,dtype=np.float64)
+        if len(values)!=len(slots) or len(timestamps)!=len(slots):
+            raise ValueError("Length of stream ids, values and timestamps must match")
+        if len(slots)==0:
+            return []
+
+        # Split the batch into rounds where every stream appears at most once, keeping arrival order
+        order=np.argsort(slots,kind="stable")
+        sorted_slots=slots[order]
+        group_start=np.flatnonzero(np.concatenate(([True],sorted_slots[1:]!=sorted_slots[:-1])))
+        group_sizes=np.diff(np.append(group_start,len(slots)))
+        rank=np.empty(len(slots),dtype=np.int64)
+        rank[order]=np.arange(len(slots))-np.repeat(group_start,group_sizes)
+
+        events=[]
+        if group_sizes.max()==1:
+            self.step(slots,values,timestamps,events)
+            return events
+        round_order=np.argsort(rank,kind="stable")
+        round_start=np.searchsorted(rank[round_order],np.arange(group_sizes.max()+1))
+        for start,end in zip(round_start[:-1],round_start[1:]):
+            selected=round_order[start:end]
+            self.step(slots[selected],values[selected],timestamps[selected],events)
+        return events
+
+    def step(
+            self,
+            slots:np.ndarray,
+            values:np.ndarray,
+            timestamps:np.ndarray,
+            events:list):
+        """Check one data point for each of the given, distinct, stream slots and append the resulting events"""
+        size=self.window_size
+        mean=self.mean[slots]
+        sd=self.standard_deviation[slots]
+        previous=self.previous_value[slots]
+        active=self.data_count[slots]>pynelson.IGNORE_FIRST_ELEMENTS_COUNT
+
+        if active.any():
+            a_slots=slots[active]
+            a_values=values[active]
+            a_mean=mean[active]
+            a_sd=sd[active]
+            a_previous=previous[active]
+            up=a_previous<a_values
+            down=a_previous>a_values
+            last=self.window_head[a_slots]+size
+            rows=self.window_values[a_slots]
+            conditions=np.zeros((len(a_slots),8),dtype=bool)
+
+            # NR 1
+            conditions[:,0]=(a_values>a_mean+3*a_sd)|(a_values<a_mean-3*a_sd)
+
+            # NR 2
+            conditions[:,1]=self.same_side_mean_count[a_slots]>=9
+            same_side=((a_previous>=a_mean)&(a_values>=a_mean))|((a_previous<a_mean)&(a_values<a_mean))
+            self.same_side_mean_count[a_slots]=np.where(same_side,self.same_side_mean_count[a_slots]+1,0)
+
+            # NR 3
+            slope_count=self.continuous_slope_change_count[a_slots]
+            increasing=self.rule3_increasing[a_slots]
+            conditions[:,2]=slope_count>=6
+            slope_count=np.where(up,np.where(increasing,slope_count+1,0),slope_count)
+            increasing=increasing|up
+            slope_count=np.where(down,np.where(increasing,0,slope_count+1),slope_count)
+            self.continuous_slope_change_count[a_slots]=slope_count
+            self.rule3_increasing[a_slots]=increasing&~down
+
+            # NR 4
+            alt_count=self.continuous_alt_direction_count[a_slots]
+            expect_increase=self.expect_increase[a_slots]
+            conditions[:,3]=alt_count>=14
+            self.continuous_alt_direction_count[a_slots]=np.where(
+                up,
+                np.where(expect_increase,alt_count+1,1),
+                np.where(down,np.where(expect_increase,1,alt_count+1),0))
+            self.expect_increase[a_slots]=np.where(up,False,np.where(down,True,expect_increase))
+
+            # NR 5
+            pos_count=np.zeros(len(a_slots),dtype=np.int64)
+            neg_count=np.zeros(len(a_slots),dtype=np.int64)
+            row_index=np.arange(len(a_slots))
+            for lag in range(1,4):
+                lagged=rows[row_index,last-lag]
+                pos_count+=lagged>(a_mean+2*a_sd)
+                neg_count+=lagged<(a_mean-2*a_sd)
+            conditions[:,4]=(pos_count>=2)|(neg_count>=2)
+
+            # NR 6
+            pos_count[:]=0
+            neg_count[:]=0
+            for lag in range(1,6):
+                lagged=rows[row_index,last-lag]
+                pos_count+=lagged>(a_mean+a_sd)
+                neg_count+=lagged<(a_mean-a_sd)
+            conditions[:,5]=(pos_count>=4)|(neg_count>=4)
+
+            # NR 7
+            conditions[:,6]=self.within_standard_deviation_count[a_slots]>=15
+            within=(a_values>=a_mean-a_sd)&(a_values<=a_mean+a_sd)
+            self.within_standard_deviation_count[a_slots]=np.where(within,self.within_standard_deviation_count[a_slots]+1,0)
+
+            # NR 8
+            outside_count=self.none_within_standard_deviation_count[a_slots]
+            sides=self.none_within_standard_deviation_sides[a_slots]
+            conditions[:,7]=(outside_count>=8)&sides[:,0]&sides[:,1]
+            outside_sides=np.stack((a_values>a_mean+a_sd,a_values<a_mean-a_sd),axis=1)
+            outside=outside_sides.any(axis=1)
+            self.none_within_standard_deviation_count[a_slots]=np.where(outside,outside_count+1,0)
+            self.none_within_standard_deviation_sides[a_slots]=(sides|outside_sides)&outside[:,None]
+
+            changed=conditions!=self.rule_events[a_slots]
+            if changed.any():
+                self.rule_events[a_slots]=conditions
+                a_timestamps=timestamps[active]
+                for row,column in zip(*np.nonzero(changed)):
+                    events.append(self.create_event(
+                        a_slots[row],
+                        column+1,
+                        not conditions[row,column],
+                        a_values[row],
+                        a_timestamps[row]))
+
+        # Placing new data to the right, dropping the oldest element
+        head=self.window_head[slots]
+        self.window_values[slots,head]=values
+        self.window_values[slots,head+size]=values
+        self.window_timestamps[slots,head]=timestamps
+        self.window_timestamps[slots,head+size]=timestamps
+        head+=1
+        head[head==size]=0
+        self.window_head[slots]=head
+
+        # Add data to the accumulated values, same operations as NelsonRuleHandler
+        data_sum=self.data_sum[slots]+values
+        data_count=self.data_count[slots]+1
+        deviation=data_sum/data_count-values
+        deviation_sq_sums=self.deviation_sq_sums[slots]+deviation*deviation
+        self.data_sum[slots]=data_sum
+        self.data_count[slots]=data_count
+        self.deviation_sq_sums[slots]=deviation_sq_sums
+        self.mean[slots]=data_sum/data_count
+        self.standard_deviation[slots]=np.sqrt(deviation_sq_sums/data_count)
+        self.previous_value[slots]=values
+
+    # Trigger data is taken from the window before the current value is placed into it
+    def create_event(
+            self,
+            slot:int,
+            rule_id:int,
+            clear_event:bool,
+            value:float,
+            timestamp:float) -> NelsonRuleEvent:
+        stream_id=self.stream_ids[slot]
+        if rule_id==1:
+            event=NelsonRuleEvent(
+                rule_id,
+                clear_event,
+                [Data(value.item(),stream_id,timestamp.item())],
+                stream_id)
+        else:
+            start,end=TRIGGER_DATA_OFFSETS[rule_id]
+            last=self.window_head[slot]+self.window_size
+            event=NelsonRuleEvent(
+                rule_id,
+                clear_event,
+                TriggerData(
+                    array('d',self.window_values[slot,last+start:last+end].tobytes()),
+                    array('d',self.window_timestamps[slot,last+start:last+end].tobytes()),
+                    [stream_id]*(end-start)),
+                stream_id)
+        event.sample_index=int(self.data_count[slot])
+        if self.shed_count>0:
+            event.shed_count=self.shed_count
+            event.degraded=bool(self.data_count[slot]<self.degraded_until[slot])
+        return event
+
+class MultiStreamHandler(Thread):
+    """Apply Nelson Rules to many continuous processes sharing a single data queue
+
+    Creates one thread for all streams, Data objects are routed by their id. Pending data is drained from the queue and checked
+    in batches by a MultiStreamEngine, every NelsonRuleEvent placed into the event queue carries the id of its stream.
+    DataShed markers are passed to the engine, which flags the events with shed_count and degraded like a NelsonRuleHandler.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put a NelsonRuleException object inside of it
+    - stop_event -- Event to stop thread
+    - data_queue -- Containts the manufacturing data arriving from every stream, data is wrapped in a Data object with its stream id
+    - event_queue -- If a Nelson Rule is triggered/cleared, place NelsonRuleEvent inside of this queue
+    - batch_size -- Maximum number of queue items checked at once, defaults to 4096
+    - window_size -- Number of most recent data points kept per stream, at least 15, defaults to 15
+    - max_batch_delay -- Time in seconds to wait for a batch to fill up before processing it, defaults to 0
+    - poll_interval -- Time in seconds between checks of the stop event while the data queue is empty, defaults to 0.1
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            data_queue:Queue,
+            event_queue:Queue,
+            batch_size:int=4096,
+            window_size:int=15,
+            max_batch_delay:float=0,
+            poll_interval:float=0.1) -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.data_queue=data_queue
+        self.event_queue=event_queue
+        self.batch_size=batch_size
+        self.max_batch_delay=max_batch_delay
+        self.poll_interval=poll_interval
+        self.engine=MultiStreamEngine(window_size)
+
+    # Runs at thread start
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                batch=get_batch(
+                    self.data_queue,
+                    self.batch_size,
+                    self.poll_interval,
+                    self.max_batch_delay)
+                events=[]
+                data_list=[]
+                for item in batch:
+                    if isinstance(item,Data):
+                        data_list.append(item)
+                    elif isinstance(item,DataBatch):
+                        events.extend(self.engine.process(data_list))
+                        data_list=[]
+                        events.extend(self.engine.process_batch(item))
+                    elif isinstance(item,DataShed):
+                        events.extend(self.engine.process(data_list))
+                        data_list=[]
+                        self.engine.record_shed(item.count)
+                    else:
+                        data_list.extend(item)
+                events.extend(self.engine.process(data_list))
+                for event in events:
+                    self.event_queue.put(event)
+
+            except Exception as e:
+                self.exception_queue.put(
+                    ExceptionEvent(self.ident,e))
+                break
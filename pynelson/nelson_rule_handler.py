@@ -1,24 +1,45 @@
 from threading import Thread
 from threading import Event
-from pynelson.types import Data,NelsonRuleEvent,ExceptionEvent
+from threading import Lock
+from pynelson.types import Data,DataBatch,DataShed,NelsonRuleEvent,ExceptionEvent
+from pynelson.window import DataWindow
+from pynelson.ingest import get_batch
+from pynelson.baseline import Baseline
+from pynelson.history import HistoryBuffer,TriggerContext
+from pynelson.rules import compile_rules
+from pynelson.checkpoint import snapshot_state
 from queue import Queue
 import sys
 import math
+import time
+import cProfile
+import pstats
 import pynelson
 
 class NelsonRuleHandler(Thread):
     """Apply Nelson Rules to a continuous process
 
-    Creates a thread to check all received data if they trigger a Nelson Rule. Data is aggregated, and stores the last 15 at all times.
+    Creates a thread to check all received data if they trigger a Nelson Rule. Data is aggregated, and stores the last window_size at all times.
     
     Requires: queues for exceptions, data and events; stop event to signal thread to terminate gracefully and the data rate from the manufacturing process
 
+    Pending data is drained from the data queue in batches of up to batch_size items per wakeup, the stop event is rechecked every poll_interval while idle.
+    Besides Data objects the data queue accepts DataBatch objects, as placed by submit_many, and lists of Data objects.
+
     Arguments:   
     - exception_queue -- If an exception occurs during any process, put a NelsonRuleException object inside of it
     - stop_event -- Event to stop thread
-    - data_queue -- Containts the manufacturing data arriving from any source, data is wrapped in a Data object
+    - data_queue -- Containts the manufacturing data arriving from any source, data is wrapped in a Data object, or a RingConsumer reading producers in other processes
     - event_queue -- If a Nelson Rule is triggered/cleared, place NelsonRuleEvent inside of this queue
     - data_rate -- The data rate of the currently running manufacturing process
+    - window_size -- Number of most recent data points kept for the rules, at least 15, defaults to 15
+    - batch_size -- Maximum number of queue items processed per wakeup, defaults to 1024
+    - max_batch_delay -- Time in seconds to wait for a batch to fill up before processing it, defaults to 0
+    - poll_interval -- Time in seconds between checks of the stop event while the data queue is empty, defaults to 0.1
+    - baseline -- Baseline strategy providing mean and standard deviation, defaults to None aggregating the whole history
+    - rules -- List of pynelson.rules Rule definitions checked in a single compiled pass instead of the built-in Nelson Rules, defaults to None
+    - metrics_sample_interval -- Rule evaluation time is measured on every metrics_sample_interval-th data point, defaults to 64
+    - history -- HistoryBuffer receiving every data point, events then carry a TriggerContext for the data around them, defaults to None
     """
 
     def __init__(
@@ -27,19 +48,44 @@ class NelsonRuleHandler(Thread):
             stop_event:Event,
             data_queue:Queue,
             event_queue:Queue,
-            data_rate:float) -> None:
+            data_rate:float,
+            window_size:int=15,
+            batch_size:int=1024,
+            max_batch_delay:float=0,
+            poll_interval:float=0.1,
+            baseline:Baseline=None,
+            rules:list=None,
+            metrics_sample_interval:int=64,
+            history:HistoryBuffer=None) -> None:
         Thread.__init__(self)
+        if window_size<15:
+            raise ValueError("Window size must be at least 15")
+        self.compiled_rules = None if rules is None else compile_rules(rules)
+        if self.compiled_rules is not None and self.compiled_rules.length>window_size:
+            raise ValueError("Window size must be at least the length of the longest rule")
         self.exception_queue=exception_queue
         self.stop_event=stop_event
         self.data_queue = data_queue
         self.event_queue=event_queue
         self.data_rate=data_rate
+        self.batch_size=batch_size
+        self.max_batch_delay=max_batch_delay
+        self.poll_interval=poll_interval
 
         self.print_data = False
+        self.snapshot_request = None
+        self.snapshot_lock = Lock() # Guards snapshot_request and finished
+        self.finished = False # True once the thread no longer processes data, snapshots are then taken by the requester
+
+        self.baseline = baseline
+        self.history = history
 
-        self.previous_data:Data = None
+        self.previous_value:float = None
+        self.current_timestamp:float = None
+        self.current_id = None
         self.data_sum:float = 0
         self.data_count = 0
+        self.ignore_count = pynelson.IGNORE_FIRST_ELEMENTS_COUNT # Rules are checked once more data points have been aggregated
         self.deviation_sq_sums:float = 0 # Sum of the deviation of elements squared
         self.mean=0
         self.standard_deviation=0
@@ -56,8 +102,7 @@ class NelsonRuleHandler(Thread):
         self.continuous_alt_direction_count=0
 
         # NR 5+6 variables
-        self.data_window = [Data]*15
-        self.data_window_len=len(self.data_window)
+        self.data_window = DataWindow(window_size)
 
         # NR 7 variables
         self.within_standard_deviation_count = 0
@@ -66,6 +111,28 @@ class NelsonRuleHandler(Thread):
         self.none_within_standard_deviation_count = 0
         self.none_within_standard_deviation_sides = [False,False]
 
+        # Metrics
+        self.metrics_sample_interval = metrics_sample_interval
+        self.processed_count = 0
+        self.last_data_timestamp = None
+        self.last_sample_time = None
+        self.events_emitted = {}
+        self.shed_count = 0 # Data points shed before reaching the handler, reported by DataShed markers
+        self.degraded_until = 0 # Events are flagged as degraded until processed_count reaches this value
+        self.rule_times = {} # rule_id -> (sum of seconds, number of timings), replaced in one assignment so readers never see half an update
+        self.profile:cProfile.Profile = None
+        self.profile_interval = 0
+        self.next_profile_count = 0 # A batch is profiled once processed_count reaches this value
+        self.rule_methods = [
+            (1,self.apply_nelson_rule_1),
+            (2,self.apply_nelson_rule_2),
+            (3,self.apply_nelson_rule_3),
+            (4,self.apply_nelson_rule_4),
+            (5,self.apply_nelson_rule_5),
+            (6,self.apply_nelson_rule_6),
+            (7,self.apply_nelson_rule_7),
+            (8,self.apply_nelson_rule_8)]
+
         # Events
         self.nelson_rule_1_event = Event()
         self.nelson_rule_2_event = Event()
@@ -80,97 +147,220 @@ class NelsonRuleHandler(Thread):
     def run(self):
         while not self.stop_event.is_set():
             try:
-                data:Data = self.data_queue.get(True)
-                if self.print_data:
-                    print(str(self.data_sum)+"/"+str(self.data_count)+" -> "+str(data.value)+" <"+str(self.standard_deviation)+">",)
-                    self.print_data=False
-                if self.data_count>pynelson.IGNORE_FIRST_ELEMENTS_COUNT:
-                    self.apply_nelson_rule_1(data)
-                    self.apply_nelson_rule_2(data)
-                    self.apply_nelson_rule_3(data)
-                    self.apply_nelson_rule_4(data)
-                    self.apply_nelson_rule_5(data)
-                    self.apply_nelson_rule_6(data)
-                    self.apply_nelson_rule_7(data)
-                    self.apply_nelson_rule_8(data)
-                
-                # Shifting array to the left, placing new data to the right
-                for i in range(1,self.data_window_len):
-                    self.data_window[i-1]=self.data_window[i]
-                self.data_window[self.data_window_len-1]=data
-
-                # Add data to the accumulated values
-                self.data_sum+=data.value
-                self.data_count+=1
-                self.deviation_sq_sums+=((self.data_sum/self.data_count)-data.value)*((self.data_sum/self.data_count)-data.value)
-
-                # Calculate mean and standard deviation, make sure to put this after accumulating data
-                self.mean = self.data_sum/self.data_count
-                self.standard_deviation = math.sqrt(self.deviation_sq_sums/self.data_count)
-                
-                # Save previous element
-                self.previous_data=data
-
-                # Check memory size to avoid running out of memory
-                if self.data_count%10000==0:
-                    self.resize_memory()
+                batch = get_batch(
+                    self.data_queue,
+                    self.batch_size,
+                    self.poll_interval,
+                    self.max_batch_delay)
+                profile = self.profile
+                if profile is not None and len(batch)>0 and self.processed_count>=self.next_profile_count:
+                    profile.enable()
+                    self.process_batch(batch)
+                    profile.disable()
+                    self.next_profile_count = self.processed_count+self.profile_interval
+                else:
+                    self.process_batch(batch)
+                if len(batch)>0:
+                    # Timed once per batch, every data point of the batch is checked within the same wakeup
+                    self.last_sample_time = time.time()
+                if self.snapshot_request is not None:
+                    self.serve_snapshot_request()
 
             except Exception as e:
                 self.exception_queue.put(
                     ExceptionEvent(self.ident,e))
                 break
+        with self.snapshot_lock:
+            self.finished = True
+        self.serve_snapshot_request()
+
+    def process_batch(
+            self,
+            batch:list):
+        """Check every item of a batch taken from the data queue"""
+        for item in batch:
+            self.process_item(item)
+
+    def process_item(
+            self,
+            item):
+        """Check a Data object, a DataBatch or a list of Data objects, or record a DataShed marker"""
+        if isinstance(item,Data):
+            self.process_value(item.value,item.timestamp,item.id)
+        elif isinstance(item,DataShed):
+            # Events stay degraded until the data window has been refilled after the gap
+            self.shed_count += item.count
+            self.degraded_until = self.processed_count+self.data_window.size
+        elif isinstance(item,DataBatch):
+            process_value = self.process_value
+            if item.ids is None:
+                for value,timestamp in zip(item.values.tolist(),item.timestamps.tolist()):
+                    process_value(value,timestamp)
+            else:
+                for value,timestamp,id in zip(item.values.tolist(),item.timestamps.tolist(),item.ids):
+                    process_value(value,timestamp,id)
+        else:
+            for data in item:
+                self.process_value(data.value,data.timestamp,data.id)
+
+    def process_data(
+            self,
+            data:Data):
+        """Check a single data point against every Nelson Rule and add it to the aggregated values"""
+        self.process_value(data.value,data.timestamp,data.id)
+
+    def process_value(
+            self,
+            value:float,
+            timestamp:float,
+            id=None):
+        """Check a single data point, given without a Data object, against every Nelson Rule and add it to the aggregated values"""
+        self.current_timestamp=timestamp
+        self.current_id=id
+        if self.print_data:
+            print(str(self.data_sum)+"/"+str(self.data_count)+" -> "+str(value)+" <"+str(self.standard_deviation)+">",)
+            self.print_data=False
+        transitions = None
+        if self.data_count>self.ignore_count:
+            if self.processed_count%self.metrics_sample_interval==0:
+                transitions = self.apply_rules_timed(value)
+            elif self.compiled_rules is None:
+                self.apply_nelson_rule_1(value)
+                self.apply_nelson_rule_2(value)
+                self.apply_nelson_rule_3(value)
+                self.apply_nelson_rule_4(value)
+                self.apply_nelson_rule_5(value)
+                self.apply_nelson_rule_6(value)
+                self.apply_nelson_rule_7(value)
+                self.apply_nelson_rule_8(value)
+            else:
+                transitions = self.compiled_rules.check(value,self.mean,self.standard_deviation)
+
+        # Placing new data to the right, dropping the oldest element
+        self.data_window.append(value,timestamp,id)
+
+        # Trigger data of compiled rules includes the current element
+        if transitions:
+            for rule_id,clear_event in transitions:
+                self.emit(
+                    NelsonRuleEvent(
+                        rule_id,
+                        clear_event,
+                        self.data_window.snapshot(self.compiled_rules.rule_lengths[rule_id],0))
+                    )
+
+        if self.baseline is None:
+            # Add data to the accumulated values
+            self.data_sum+=value
+            self.data_count+=1
+            self.deviation_sq_sums+=((self.data_sum/self.data_count)-value)*((self.data_sum/self.data_count)-value)
+
+            # Calculate mean and standard deviation, make sure to put this after accumulating data
+            self.mean = self.data_sum/self.data_count
+            self.standard_deviation = math.sqrt(self.deviation_sq_sums/self.data_count)
+        else:
+            self.baseline.add(value)
+            self.data_count+=1
+            self.mean = self.baseline.mean
+            self.standard_deviation = self.baseline.standard_deviation
+            
+        if self.history is not None:
+            self.history.append(value,timestamp)
+
+        # Save previous element
+        self.previous_value=value
+        self.processed_count+=1
+        self.last_data_timestamp=timestamp
+
+        # Check memory size to avoid running out of memory
+        if self.baseline is None and self.data_count%10000==0:
+            self.resize_memory()
+
+    # Same as the rule checks of process_data, measuring the time spent on each rule
+    def apply_rules_timed(
+            self,
+            value:float):
+        if self.compiled_rules is not None:
+            start = time.perf_counter()
+            transitions = self.compiled_rules.check(value,self.mean,self.standard_deviation)
+            self.add_rule_time("compiled",time.perf_counter()-start)
+            return transitions
+        for rule_id,apply_rule in self.rule_methods:
+            start = time.perf_counter()
+            apply_rule(value)
+            self.add_rule_time(rule_id,time.perf_counter()-start)
+        return None
+
+    def add_rule_time(
+            self,
+            rule_id,
+            seconds:float):
+        time_sum,count = self.rule_times.get(rule_id,(0,0))
+        self.rule_times[rule_id] = (time_sum+seconds,count+1)
+
+    def emit(
+            self,
+            event:NelsonRuleEvent):
+        """Place an event into the event queue, counting it per rule and flagging it if input was shed"""
+        self.events_emitted[event.rule_id] = self.events_emitted.get(event.rule_id,0)+1
+        event.sample_index = self.processed_count
+        if self.shed_count>0:
+            event.shed_count = self.shed_count
+            event.degraded = self.processed_count<self.degraded_until
+        if self.history is not None:
+            # The current data point is appended to the history after the rules have been checked
+            event.context = TriggerContext(self.history,self.history.count,self.current_timestamp)
+        self.event_queue.put(event)
 
     # One point is more than 3 standard deviations from the mean.
     def apply_nelson_rule_1(
             self,
-            data:Data):
-        value = data.value
+            value:float):
         if value>self.mean+3*self.standard_deviation or value<self.mean-3*self.standard_deviation:
             if not self.nelson_rule_1_event.is_set():
                 # print("[NELSON RULE 1 TRIGGERED] -> data: "+str(value)+" | mean: "+str(self.mean)+" | SD: "+str(self.standardDeviation))
                 self.nelson_rule_1_event.set()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         1,
                         False,
-                        [data])
+                        [Data(value,self.current_id,self.current_timestamp)])
                     )
         else:
             if self.nelson_rule_1_event.is_set():
                 # print("[NELSON RULE 1 CLEARED]")
                 self.nelson_rule_1_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         1,
                         True,
-                        [data])
+                        [Data(value,self.current_id,self.current_timestamp)])
                     )
 
     # Nine (or more) points in a row are on the same side of the mean.
     def apply_nelson_rule_2(
             self,
-            data:Data):
-        value = data.value
+            value:float):
         if self.same_side_mean_count>=9:
             if not self.nelson_rule_2_event.is_set():
                 self.nelson_rule_2_event.set()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         2,
                         False,
-                        self.data_window[self.data_window_len-9:self.data_window_len-1])
+                        self.data_window.snapshot(9,1))
                     )
         else:
             if self.nelson_rule_2_event.is_set():
                 self.nelson_rule_2_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         2,
                         True,
-                        self.data_window[self.data_window_len-9:self.data_window_len-1])
+                        self.data_window.snapshot(9,1))
                     )
 
-        if (self.previous_data.value>=self.mean and value>=self.mean) or (self.previous_data.value<self.mean and value<self.mean):
+        if (self.previous_value>=self.mean and value>=self.mean) or (self.previous_value<self.mean and value<self.mean):
             self.same_side_mean_count+=1
         else:
             self.same_side_mean_count=0
@@ -178,34 +368,33 @@ class NelsonRuleHandler(Thread):
     # Six (or more) points in a row are continually increasing (or decreasing).
     def apply_nelson_rule_3(
             self,
-            data:Data):
-        value = data.value
+            value:float):
         if self.continuous_slope_change_count>=6:
             if not self.nelson_rule_3_event.is_set():
                 self.nelson_rule_3_event.set()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         3,
                         False,
-                        self.data_window[self.data_window_len-6:self.data_window_len-1])
+                        self.data_window.snapshot(6,1))
                     )
         else:
             if self.nelson_rule_3_event.is_set():
                 self.nelson_rule_3_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         3,
                         True,
-                        self.data_window[self.data_window_len-6:self.data_window_len-1])
+                        self.data_window.snapshot(6,1))
                     )
 
-        if self.previous_data.value<value:
+        if self.previous_value<value:
             if self.rule3_increasing:
                 self.continuous_slope_change_count+=1
             else:
                 self.continuous_slope_change_count=0
                 self.rule3_increasing=True
-        if self.previous_data.value>value:
+        if self.previous_value>value:
             if not self.rule3_increasing:
                 self.continuous_slope_change_count+=1
             else:
@@ -215,34 +404,33 @@ class NelsonRuleHandler(Thread):
     # Fourteen (or more) points in a row alternate in direction, increasing then decreasing.
     def apply_nelson_rule_4(
             self,
-            data:Data):
-        value = data.value
+            value:float):
         if self.continuous_alt_direction_count>=14:
             if not self.nelson_rule_4_event.is_set():
                 self.nelson_rule_4_event.set()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         4,
                         False,
-                        self.data_window[self.data_window_len-14:self.data_window_len-1])
+                        self.data_window.snapshot(14,1))
                     )
         else:
             if self.nelson_rule_4_event.is_set():
                 self.nelson_rule_4_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         4,
                         True,
-                        self.data_window[self.data_window_len-14:self.data_window_len-1])
+                        self.data_window.snapshot(14,1))
                     )
 
-        if self.previous_data.value<value:
+        if self.previous_value<value:
             if self.expect_increase:
                 self.continuous_alt_direction_count+=1
             else:
                 self.continuous_alt_direction_count=1
             self.expect_increase=False
-        elif self.previous_data.value>value:
+        elif self.previous_value>value:
             if self.expect_increase:
                 self.continuous_alt_direction_count=1
             else:
@@ -254,16 +442,16 @@ class NelsonRuleHandler(Thread):
     # Two (or three) out of three points in a row are more than 2 standard deviations from the mean in the same direction.
     def apply_nelson_rule_5(
             self,
-            data:Data):
+            value:float):
         pos_count = 0
         pos_count_max = 0
         neg_count = 0
         neg_count_max = 0
         
-        for i in range(self.data_window_len-3,self.data_window_len):
-            if self.data_window[i].value>(self.mean+2*self.standard_deviation):
+        for window_value in self.data_window.last_values(3):
+            if window_value>(self.mean+2*self.standard_deviation):
                 pos_count+=1
-            elif self.data_window[i].value<(self.mean-2*self.standard_deviation):
+            elif window_value<(self.mean-2*self.standard_deviation):
                 neg_count+=1
 
             if neg_count>0:
@@ -274,35 +462,35 @@ class NelsonRuleHandler(Thread):
         if pos_count_max>=2 or neg_count_max>=2:
             if not self.nelson_rule_5_event.is_set():
                 self.nelson_rule_5_event.set()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         5,
                         False,
-                        self.data_window[self.data_window_len-3:self.data_window_len-1])
+                        self.data_window.snapshot(3,1))
                     )
         else:
             if self.nelson_rule_5_event.is_set():
                 self.nelson_rule_5_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         5,
                         True,
-                        self.data_window[self.data_window_len-3:self.data_window_len-1])
+                        self.data_window.snapshot(3,1))
                     )
 
     # Four (or five) out of five points in a row are more than 1 standard deviation from the mean in the same direction.
     def apply_nelson_rule_6(
             self,
-            data:Data):
+            value:float):
         pos_count = 0
         pos_count_max = 0
         neg_count = 0
         neg_count_max = 0
 
-        for i in range(self.data_window_len-5,self.data_window_len):
-            if self.data_window[i].value>(self.mean+self.standard_deviation):
+        for window_value in self.data_window.last_values(5):
+            if window_value>(self.mean+self.standard_deviation):
                 pos_count+=1
-            elif self.data_window[i].value<(self.mean-self.standard_deviation):
+            elif window_value<(self.mean-self.standard_deviation):
                 neg_count+=1
 
             if neg_count>0:
@@ -313,44 +501,43 @@ class NelsonRuleHandler(Thread):
         if pos_count_max>=4 or neg_count_max>=4:
             if not self.nelson_rule_6_event.is_set():
                 self.nelson_rule_6_event.set()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         6,
                         False,
-                        self.data_window[self.data_window_len-5:self.data_window_len-1])
+                        self.data_window.snapshot(5,1))
                     )
         else:
             if self.nelson_rule_6_event.is_set():
                 self.nelson_rule_6_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         6,
                         True,
-                        self.data_window[self.data_window_len-5:self.data_window_len-1])
+                        self.data_window.snapshot(5,1))
                     )
 
     # Fifteen points in a row are all within 1 standard deviation of the mean on either side of the mean.
     def apply_nelson_rule_7(
             self,
-            data:Data):
-        value = data.value
+            value:float):
         if self.within_standard_deviation_count>=15:
             if not self.nelson_rule_7_event.is_set():
                 self.nelson_rule_7_event.set()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         7,
                         False,
-                        self.data_window[self.data_window_len-15:self.data_window_len-1])
+                        self.data_window.snapshot(15,1))
                     )
         else:
             if self.nelson_rule_7_event.is_set():
                 self.nelson_rule_7_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         7,
                         True,
-                        self.data_window[self.data_window_len-15:self.data_window_len-1])
+                        self.data_window.snapshot(15,1))
                     )
 
         if value>=self.mean-self.standard_deviation and value<=self.mean+self.standard_deviation:
@@ -361,25 +548,24 @@ class NelsonRuleHandler(Thread):
     # Eight points in a row exist, but none within 1 standard deviation of the mean, and the points are in both directions from the mean.
     def apply_nelson_rule_8(
             self,
-            data:Data):
-        value = data.value
+            value:float):
         if self.none_within_standard_deviation_count>=8 and self.none_within_standard_deviation_sides==[True,True]:
                 if not self.nelson_rule_8_event.is_set():
                     self.nelson_rule_8_event.set()
-                    self.event_queue.put(
+                    self.emit(
                         NelsonRuleEvent(
                             8,
                             False,
-                            self.data_window[self.data_window_len-8:self.data_window_len-1])
+                            self.data_window.snapshot(8,1))
                         )
         else:
             if self.nelson_rule_8_event.is_set():
                 self.nelson_rule_8_event.clear()
-                self.event_queue.put(
+                self.emit(
                     NelsonRuleEvent(
                         8,
                         True,
-                        self.data_window[self.data_window_len-8:self.data_window_len-1])
+                        self.data_window.snapshot(8,1))
                     )
         
         applicable = False
@@ -392,11 +578,11 @@ class NelsonRuleHandler(Thread):
             on_pos_side = False
 
         if applicable:
-            self.none_within_standard_deviation_count+=0
+            self.none_within_standard_deviation_count+=1
             if on_pos_side:
                 self.none_within_standard_deviation_sides[0]=True
             else:
-                self.none_within_standard_deviation_sides[0]=True
+                self.none_within_standard_deviation_sides[1]=True
         else:
             self.none_within_standard_deviation_count=0
             self.none_within_standard_deviation_sides=[False,False]
@@ -419,6 +605,83 @@ class NelsonRuleHandler(Thread):
             self.deviation_sq_sums = self.deviation_sq_sums/self.data_count
             self.data_count=1
 
+    def submit_many(
+            self,
+            values,
+            timestamps=None):
+        """Place a whole frame of data into the data queue as a single item
+
+        Arguments:
+        - values -- Sequence of values
+        - timestamps -- Sequence of timestamps belonging to values, defaults to the current system time
+        """
+        self.data_queue.put(DataBatch(values,timestamps))
+
+    def get_metrics(self) -> dict:
+        """Return a snapshot of the handler's metrics
+
+        Keys:
+        - samples_processed -- Number of data points checked
+        - samples_shed -- Number of data points shed before reaching the handler
+        - queue_depth -- Number of items waiting in the data queue
+        - ingestion_lag -- Seconds between the timestamp of the last data point and the time it was checked
+        - seconds_since_last_sample -- Seconds since the last data point was checked
+        - mean, standard_deviation -- Current baseline
+        - events_emitted -- rule_id -> number of events placed into the event queue
+        - rule_evaluation_seconds -- rule_id -> average seconds spent evaluating the rule, measured on sampled data points
+        """
+        now = time.time()
+        return {
+            "samples_processed":self.processed_count,
+            "samples_shed":self.shed_count,
+            "queue_depth":None if self.data_queue is None else self.data_queue.qsize(),
+            "ingestion_lag":None if self.last_sample_time is None else self.last_sample_time-self.last_data_timestamp,
+            "seconds_since_last_sample":None if self.last_sample_time is None else now-self.last_sample_time,
+            "mean":self.mean,
+            "standard_deviation":self.standard_deviation,
+            "events_emitted":dict(self.events_emitted),
+            "rule_evaluation_seconds":{rule_id:time_sum/count for rule_id,(time_sum,count) in list(self.rule_times.items())}}
+
+    def start_profiling(
+            self,
+            sample_interval:int=100):
+        """Profile one batch out of roughly every sample_interval data points of the running thread"""
+        if sample_interval<1:
+            raise ValueError("Invalid sample interval")
+        self.profile_interval = sample_interval
+        self.next_profile_count = self.processed_count
+        self.profile = cProfile.Profile()
+
+    def stop_profiling(self) -> pstats.Stats:
+        """Stop profiling and return the collected statistics, None if profiling was not started"""
+        profile = self.profile
+        self.profile = None
+        if profile is None:
+            return None
+        return pstats.Stats(profile)
+
+    def request_snapshot(
+            self,
+            snapshot_queue:Queue,
+            key=None):
+        """Request a snapshot of the rule state, taken between two batches and placed into snapshot_queue as (key, bytes)
+
+        Once the thread has finished, the snapshot is taken right away in the calling thread, so a request is never lost during shutdown.
+        """
+        with self.snapshot_lock:
+            if not self.finished:
+                self.snapshot_request = (snapshot_queue,key)
+                return
+        snapshot_queue.put((key,snapshot_state(self)))
+
+    def serve_snapshot_request(self):
+        with self.snapshot_lock:
+            request = self.snapshot_request
+            self.snapshot_request = None
+        if request is not None:
+            snapshot_queue,key = request
+            snapshot_queue.put((key,snapshot_state(self)))
+
     def request_print_data(self):
         """Call to request next data to be printed"""
         self.print_data=True
\ No newline at end of file
@@ -0,0 +1,238 @@
+import csv
+import mmap
+import os
+import numpy as np
+from pynelson.types import Data,DataBatch
+
+MAGIC = b"PYNELSON"
+VERSION = 2
+HEADER = np.dtype([("magic","S8"),("version","<u4"),("reserved","<u4")])
+# Every block is followed by count float64 timestamps and then count float64 values
+BLOCK = np.dtype([("count","<u8")])
+COLUMN = np.dtype("<f8")
+
+def read_csv(
+        path:str,
+        chunk_size:int=65536,
+        value_column:str="value",
+        timestamp_column:str="timestamp",
+        delimiter:str=",") -> tuple:
+    """Read a CSV file with a header row in chunks, yielding (timestamps, values) NumPy arrays of up to chunk_size rows
+
+    Arguments:
+    - path -- Path of the CSV file
+    - chunk_size -- Maximum number of rows per chunk, defaults to 65536
+    - value_column -- Name of the value column, defaults to "value"
+    - timestamp_column -- Name of the timestamp column, defaults to "timestamp"
+    - delimiter -- Field delimiter, defaults to ","
+    """
+    with open(path,newline="") as file:
+        reader = csv.reader(file,delimiter=delimiter)
+        header = next(reader)
+        value_index = header.index(value_column)
+        timestamp_index = header.index(timestamp_column)
+        timestamps = []
+        values = []
+        for row in reader:
+            if len(row)==0:
+                continue
+            timestamps.append(row[timestamp_index])
+            values.append(row[value_index])
+            if len(values)==chunk_size:
+                yield np.array(timestamps,dtype=np.float64),np.array(values,dtype=np.float64)
+                timestamps = []
+                values = []
+        if len(values)>0:
+            yield np.array(timestamps,dtype=np.float64),np.array(values,dtype=np.float64)
+
+class BinaryWriter:
+    """Record data into the binary replay format
+
+    The file starts with a 16 byte header (magic, version) followed by blocks. Each block holds an 8 byte record count
+    followed by the float64 timestamps and then the float64 values of its records, so both columns are contiguous within
+    a block. Data is buffered and written as one block every buffer_size records, write appends its columns as a block.
+    Blocks are appended, an existing file is continued. An incomplete trailing block, e.g. left by a crash while writing,
+    is cut off before appending.
+
+    Arguments:
+    - path -- Path of the file
+    - buffer_size -- Number of records buffered before they are written, defaults to 4096
+    """
+
+    def __init__(
+            self,
+            path:str,
+            buffer_size:int=4096) -> None:
+        exists = os.path.exists(path) and os.path.getsize(path)>0
+        if exists:
+            open_header(path)
+            size = os.path.getsize(path)
+            with open(path,"rb") as file:
+                _,end = read_blocks(file,size)
+            if end<size:
+                os.truncate(path,end)
+        self.file = open(path,"ab")
+        if not exists:
+            self.file.write(np.array([(MAGIC,VERSION,0)],dtype=HEADER).tobytes())
+        self.timestamps = np.empty(buffer_size,dtype=COLUMN)
+        self.values = np.empty(buffer_size,dtype=COLUMN)
+        self.buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+    def write_data(
+            self,
+            data:Data):
+        """Append a single Data object"""
+        self.timestamps[self.buffered] = data.timestamp
+        self.values[self.buffered] = data.value
+        self.buffered += 1
+        if self.buffered==len(self.values):
+            self.flush()
+
+    def write(
+            self,
+            timestamps,
+            values):
+        """Append columns of timestamps and values"""
+        if len(timestamps)!=len(values):
+            raise ValueError("Length of timestamps does not match length of values")
+        self.flush()
+        self.write_block(timestamps,values)
+        self.file.flush()
+
+    def write_block(
+            self,
+            timestamps,
+            values):
+        if len(values)==0:
+            return
+        self.file.write(np.array([len(values)],dtype=BLOCK).tobytes())
+        self.file.write(np.asarray(timestamps,dtype=COLUMN).tobytes())
+        self.file.write(np.asarray(values,dtype=COLUMN).tobytes())
+
+    def flush(self):
+        self.write_block(self.timestamps[:self.buffered],self.values[:self.buffered])
+        self.buffered = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def open_header(path:str):
+    with open(path,"rb") as file:
+        header = np.frombuffer(file.read(HEADER.itemsize),dtype=HEADER)
+    if len(header)!=1 or header["magic"][0]!=MAGIC or header["version"][0]!=VERSION:
+        raise ValueError("Not a pynelson replay file: "+path)
+
+def read_blocks(
+        file,
+        size:int) -> tuple:
+    """Return the (offset of the timestamps, record count) of every complete block of a file and the end of the last complete block"""
+    blocks = []
+    offset = HEADER.itemsize
+    while offset+BLOCK.itemsize<=size:
+        file.seek(offset)
+        count = int(np.frombuffer(file.read(BLOCK.itemsize),dtype=BLOCK)["count"][0])
+        end = offset+BLOCK.itemsize+2*COLUMN.itemsize*count
+        if end>size:
+            break
+        blocks.append((offset+BLOCK.itemsize,count))
+        offset = end
+    return blocks,offset
+
+class BinaryReader:
+    """Read a file of the binary replay format through mmap, without loading it
+
+    blocks holds a (timestamps, values) pair of contiguous read-only NumPy views of the mapped file per block, an
+    incomplete trailing block is ignored. timestamps and values are the views of a single-block file, and copies
+    joining every block otherwise, made on first access.
+    Views and DataBatch columns taken from the reader stay valid after close, the last of them to be released unmaps the file.
+
+    Arguments:
+    - path -- Path of the file
+    """
+
+    def __init__(
+            self,
+            path:str) -> None:
+        open_header(path)
+        self.file = open(path,"rb")
+        block_offsets,_ = read_blocks(self.file,os.path.getsize(path))
+        self.count = sum(count for _,count in block_offsets)
+        self.map = None
+        self.blocks = []
+        if self.count>0:
+            self.map = mmap.mmap(self.file.fileno(),0,access=mmap.ACCESS_READ)
+            for offset,count in block_offsets:
+                self.blocks.append((
+                    np.frombuffer(self.map,dtype=COLUMN,count=count,offset=offset),
+                    np.frombuffer(self.map,dtype=COLUMN,count=count,offset=offset+COLUMN.itemsize*count)))
+        self.columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.joined_columns()[0]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.joined_columns()[1]
+
+    def joined_columns(self) -> tuple:
+        if self.columns is None:
+            if len(self.blocks)==0:
+                self.columns = (np.empty(0,dtype=COLUMN),np.empty(0,dtype=COLUMN))
+            elif len(self.blocks)==1:
+                self.columns = self.blocks[0]
+            else:
+                self.columns = tuple(np.concatenate(column) for column in zip(*self.blocks))
+        return self.columns
+
+    def chunks(
+            self,
+            chunk_size:int=65536) -> tuple:
+        """Yield (timestamps, values) contiguous views of up to chunk_size records, a chunk never spans two blocks"""
+        for timestamps,values in self.blocks:
+            for start in range(0,len(values),chunk_size):
+                yield timestamps[start:start+chunk_size],values[start:start+chunk_size]
+
+    def close(self):
+        self.blocks = None
+        self.columns = None
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # Views are still exported, the mapping is released together with the last of them
+                pass
+            self.map = None
+        self.file.close()
+
+def replay(
+        handler,
+        chunks) -> int:
+    """Check every chunk of (timestamps, values) with a NelsonRuleHandler in the calling thread, returns the number of data points
+
+    Arguments:
+    - handler -- NelsonRuleHandler, not started, placing its events into its event queue
+    - chunks -- Iterable of (timestamps, values), e.g. read_csv(path) or BinaryReader(path).chunks()
+    """
+    count = 0
+    for timestamps,values in chunks:
+        handler.process_item(DataBatch(values,timestamps))
+        count += len(values)
+    return count
@@ -0,0 +1,206 @@
+class Rule:
+    """Definition of a configurable control chart rule
+
+    Every rule is evaluated over the most recent length points, including the current one.
+
+    Arguments:
+    - rule_id -- Identification placed into the NelsonRuleEvent of the rule
+    - length -- Number of most recent points the rule looks at
+    """
+
+    def __init__(
+            self,
+            rule_id,
+            length:int) -> None:
+        if length<1:
+            raise ValueError("Invalid rule length")
+        self.rule_id=rule_id
+        self.length=length
+
+class BeyondLimit(Rule):
+    """count out of length points in a row are more than sigma standard deviations from the mean in the same direction"""
+
+    def __init__(
+            self,
+            rule_id,
+            count:int,
+            length:int,
+            sigma:float) -> None:
+        Rule.__init__(self,rule_id,length)
+        if count<1 or count>length:
+            raise ValueError("Invalid rule count")
+        self.count=count
+        self.sigma=sigma
+
+class WithinLimit(Rule):
+    """length points in a row are all within sigma standard deviations of the mean on either side of the mean"""
+
+    def __init__(
+            self,
+            rule_id,
+            length:int,
+            sigma:float) -> None:
+        Rule.__init__(self,rule_id,length)
+        self.sigma=sigma
+
+class OutsideLimitBothSides(Rule):
+    """length points in a row are all more than sigma standard deviations from the mean, in both directions"""
+
+    def __init__(
+            self,
+            rule_id,
+            length:int,
+            sigma:float) -> None:
+        Rule.__init__(self,rule_id,length)
+        self.sigma=sigma
+
+class SameSideRun(Rule):
+    """length points in a row are on the same side of the mean"""
+
+class Trend(Rule):
+    """length points in a row are continually increasing (or decreasing)"""
+
+class Alternating(Rule):
+    """length points in a row alternate in direction, increasing then decreasing"""
+
+NELSON_RULES = [
+    BeyondLimit(1,1,1,3),
+    SameSideRun(2,9),
+    Trend(3,6),
+    Alternating(4,14),
+    BeyondLimit(5,2,3,2),
+    BeyondLimit(6,4,5,1),
+    WithinLimit(7,15,1),
+    OutsideLimitBothSides(8,8,1)]
+
+WESTERN_ELECTRIC_RULES = [
+    BeyondLimit("WE1",1,1,3),
+    BeyondLimit("WE2",2,3,2),
+    BeyondLimit("WE3",4,5,1),
+    SameSideRun("WE4",8)]
+
+# The range based R-4s rule cannot be expressed in terms of single points, it is not part of the set
+WESTGARD_RULES = [
+    BeyondLimit("1_3s",1,1,3),
+    BeyondLimit("2_2s",2,2,2),
+    BeyondLimit("4_1s",4,4,1),
+    SameSideRun("10_x",10)]
+
+class CompiledRules:
+    """Any number of rules compiled into a single per-sample pass
+
+    Every point is classified against each distinct sigma level once, the classification of the most recent points is kept
+    as one bitmask per level and side, trends and alternation as move counters. Each rule then only inspects that shared state.
+
+    Arguments:
+    - rules -- List of Rule definitions, rule ids must be unique
+    """
+
+    def __init__(
+            self,
+            rules:list) -> None:
+        self.rules=list(rules)
+        self.rule_ids=[rule.rule_id for rule in self.rules]
+        if len(set(self.rule_ids))!=len(self.rule_ids):
+            raise ValueError("Rule ids must be unique")
+        self.rule_lengths={rule.rule_id:rule.length for rule in self.rules}
+        self.length=max(self.rule_lengths.values(),default=1)
+        self.history_mask=(1<<self.length)-1
+
+        # Level 0 classifies points by the side of the mean they are on
+        self.levels=sorted({0}|{rule.sigma for rule in self.rules if hasattr(rule,"sigma")})
+        self.above=[0]*len(self.levels)
+        self.below=[0]*len(self.levels)
+
+        self.count=0
+        self.previous_value=None
+        self.increase_count=0
+        self.decrease_count=0
+        self.alternating_count=0
+        self.last_direction=0
+        self.rule_active=[False]*len(self.rules)
+        self.checks=[self.compile_rule(rule) for rule in self.rules]
+
+    # Compiled checks are closures, they are recreated instead of pickled
+    def __getstate__(self):
+        state=dict(self.__dict__)
+        del state["checks"]
+        return state
+
+    def __setstate__(
+            self,
+            state:dict):
+        self.__dict__.update(state)
+        self.checks=[self.compile_rule(rule) for rule in self.rules]
+
+    def compile_rule(
+            self,
+            rule:Rule):
+        mask=(1<<rule.length)-1
+        length=rule.length
+        moves=length-1
+        above=self.above
+        below=self.below
+        if isinstance(rule,BeyondLimit):
+            level=self.levels.index(rule.sigma)
+            count=rule.count
+            return lambda: (above[level]&mask).bit_count()>=count or (below[level]&mask).bit_count()>=count
+        if isinstance(rule,WithinLimit):
+            level=self.levels.index(rule.sigma)
+            return lambda: self.count>=length and (above[level]|below[level])&mask==0
+        if isinstance(rule,OutsideLimitBothSides):
+            level=self.levels.index(rule.sigma)
+            return lambda: (above[level]|below[level])&mask==mask and above[level]&mask!=0 and below[level]&mask!=0
+        if isinstance(rule,SameSideRun):
+            return lambda: above[0]&mask==mask or below[0]&mask==mask
+        if isinstance(rule,Trend):
+            return lambda: self.increase_count>=moves or self.decrease_count>=moves
+        if isinstance(rule,Alternating):
+            return lambda: self.alternating_count>=moves
+        raise ValueError("Unsupported rule: "+type(rule).__name__)
+
+    def check(
+            self,
+            value:float,
+            mean:float,
+            standard_deviation:float) -> list:
+        """Add a point and return the (rule_id, clear_event) pairs of every rule that got triggered/cleared by it"""
+        self.count+=1
+        history_mask=self.history_mask
+        above=self.above
+        below=self.below
+        for i,level in enumerate(self.levels):
+            above[i]=((above[i]<<1)|(value>mean+level*standard_deviation))&history_mask
+            below[i]=((below[i]<<1)|(value<mean-level*standard_deviation))&history_mask
+
+        if self.previous_value is not None:
+            if value>self.previous_value:
+                direction=1
+                self.increase_count+=1
+                self.decrease_count=0
+            elif value<self.previous_value:
+                direction=-1
+                self.decrease_count+=1
+                self.increase_count=0
+            else:
+                direction=0
+                self.increase_count=0
+                self.decrease_count=0
+            if direction!=0 and direction==-self.last_direction:
+                self.alternating_count+=1
+            else:
+                self.alternating_count=1 if direction!=0 else 0
+            self.last_direction=direction
+        self.previous_value=value
+
+        transitions=[]
+        for i,check in enumerate(self.checks):
+            active=check()
+            if active!=self.rule_active[i]:
+                self.rule_active[i]=active
+                transitions.append((self.rule_ids[i],not active))
+        return transitions
+
+def compile_rules(rules:list) -> CompiledRules:
+    """Compile a list of Rule definitions, for example NELSON_RULES+WESTERN_ELECTRIC_RULES, into a single per-sample pass"""
+    return CompiledRules(rules)
@@ -0,0 +1,193 @@
+from threading import Thread
+from threading import Event
+from queue import Queue,Empty
+from collections import deque
+import signal
+import time
+from pynelson.types import ExceptionEvent
+
+class ServiceConfig:
+    """Describes a thread run by a Supervisor
+
+    Arguments:
+    - name: Unique name of the service
+    - factory: Callable taking (exception_queue, stop_event) and returning a new, not started Thread, e.g.
+      functools.partial(NelsonRuleHandler, data_queue=data_queue, event_queue=event_queue, data_rate=0.2)
+    - restart: True to start a new thread when the running one ends before the stop event is set, defaults to True
+    - max_restarts: Maximum number of restarts, defaults to 3
+    - restart_delay: Time in seconds between the end of a thread and its restart, defaults to 1
+    """
+
+    def __init__(
+            self,
+            name:str,
+            factory,
+            restart:bool=True,
+            max_restarts:int=3,
+            restart_delay:float=1) -> None:
+        self.name=name
+        self.factory=factory
+        self.restart=restart
+        self.max_restarts=max_restarts
+        self.restart_delay=restart_delay
+
+class ServiceStatus:
+    """State of a service of a Supervisor
+
+    Arguments:
+    - config: ServiceConfig of the service
+    """
+
+    def __init__(
+            self,
+            config:ServiceConfig) -> None:
+        self.config=config
+        self.thread=None
+        self.restarts=0
+        self.last_exception=None
+        self.restart_time=None
+
+    @property
+    def alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+class Supervisor:
+    """Start, monitor and restart the threads of a runtime, and shut them down within a bounded time
+
+    Every service thread shares the exception queue and stop event of the supervisor. The supervisor blocks on the
+    exception queue, it does not poll: an ExceptionEvent, the end of a thread or stop() wake it up. Threads ending before
+    the stop event is set are restarted according to their ServiceConfig. Services are started as daemon threads, so a
+    thread that does not end within shutdown_timeout cannot keep the process alive.
+
+    Arguments:
+    - services -- List of ServiceConfig, started in order
+    - exception_queue -- Queue the services put their ExceptionEvents into, defaults to a new Queue
+    - stop_event -- Event to stop every service, defaults to a new Event
+    - shutdown_timeout -- Maximum time in seconds to wait for all services to end after the stop event is set, defaults to 5
+    - monitor_interval -- Maximum time in seconds between two liveness checks of the services, defaults to 1
+    - exception_history -- Number of (service name, ExceptionEvent) pairs kept in exceptions, defaults to 100
+    """
+
+    def __init__(
+            self,
+            services:list,
+            exception_queue:Queue=None,
+            stop_event:Event=None,
+            shutdown_timeout:float=5,
+            monitor_interval:float=1,
+            exception_history:int=100) -> None:
+        self.exception_queue=Queue() if exception_queue is None else exception_queue
+        self.stop_event=Event() if stop_event is None else stop_event
+        self.shutdown_timeout=shutdown_timeout
+        self.monitor_interval=monitor_interval
+        self.services={}
+        for config in services:
+            if config.name in self.services:
+                raise ValueError("Duplicate service name: "+config.name)
+            self.services[config.name]=ServiceStatus(config)
+        self.exceptions=deque(maxlen=exception_history)
+
+    def __getitem__(
+            self,
+            name:str) -> Thread:
+        """Currently running thread of a service"""
+        return self.services[name].thread
+
+    def start(self):
+        """Start every service that has not been started yet"""
+        for status in self.services.values():
+            if status.thread is None:
+                self.start_service(status)
+
+    def start_service(
+            self,
+            status:ServiceStatus):
+        thread=status.config.factory(self.exception_queue,self.stop_event)
+        thread.daemon=True
+        thread.start()
+        status.thread=thread
+        status.restart_time=None
+
+    def stop(self):
+        """Set the stop event and wake up the supervisor"""
+        self.stop_event.set()
+        self.exception_queue.put(None)
+
+    def handle_signals(self):
+        """Stop on SIGINT and SIGTERM, must be called from the main thread
+
+        The signal handler only sets the stop event, putting to the exception queue could wait on the lock of the queue held
+        by the interrupted thread. The supervisor notices the stop event within monitor_interval.
+        """
+        for signal_number in (signal.SIGINT,signal.SIGTERM):
+            signal.signal(signal_number,lambda number,frame:self.stop_event.set())
+
+    def run(self) -> list:
+        """Start the services and supervise them until the stop event is set, then shut down
+
+        Returns the names of services whose threads did not end within shutdown_timeout.
+        """
+        self.start()
+        while not self.stop_event.is_set():
+            try:
+                item=self.exception_queue.get(True,self.next_wakeup())
+            except Empty:
+                item=None
+            if item is not None:
+                self.record_exception(item)
+            self.check_services()
+        return self.shutdown()
+
+    # Time until the next liveness check or scheduled restart
+    def next_wakeup(self) -> float:
+        timeout=self.monitor_interval
+        now=time.monotonic()
+        for status in self.services.values():
+            if status.restart_time is not None:
+                timeout=min(timeout,status.restart_time-now)
+        return max(timeout,0)
+
+    def record_exception(
+            self,
+            exception_event:ExceptionEvent):
+        name=None
+        for status in self.services.values():
+            if status.thread is not None and status.thread.ident==exception_event.thread_id:
+                status.last_exception=exception_event.exception
+                name=status.config.name
+                break
+        self.exceptions.append((name,exception_event))
+
+    def check_services(self):
+        now=time.monotonic()
+        for status in self.services.values():
+            if status.thread is None or status.alive or self.stop_event.is_set():
+                continue
+            config=status.config
+            if not config.restart or status.restarts>=config.max_restarts:
+                continue
+            if status.restart_time is None:
+                status.restart_time=now+config.restart_delay
+            elif now>=status.restart_time:
+                status.restarts+=1
+                self.start_service(status)
+
+    def shutdown(self) -> list:
+        """Set the stop event and wait up to shutdown_timeout for every service, returns the names of those still running"""
+        self.stop_event.set()
+        deadline=time.monotonic()+self.shutdown_timeout
+        for status in self.services.values():
+            if status.thread is not None:
+                status.thread.join(max(0,deadline-time.monotonic()))
+        while True:
+            try:
+                item=self.exception_queue.get_nowait()
+            except Empty:
+                break
+            if item is not None:
+                self.record_exception(item)
+        return [name for name,status in self.services.items() if status.alive]
+
+    def status(self) -> dict:
+        """Return name -> ServiceStatus of every service"""
+        return dict(self.services)
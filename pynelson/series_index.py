@@ -0,0 +1,114 @@
+import math
+import numpy as np
+from pynelson.batch import evaluate
+
+class SeriesIndex:
+    """Prefix-sum index over a recorded series for range statistics and re-evaluating rules against another baseline
+
+    Cumulative sums of values and squared values are kept at every chunk boundary only, so the index takes
+    2*len/chunk_size floats. The statistics of any range read at most one partial chunk at each end, independent of the
+    length of the range or series. Values are shifted by the first value before summing to limit cancellation, ranges of
+    up to chunk_size data points are computed directly.
+
+    The arrays are not copied, the read-only views of a BinaryReader can be indexed without loading the file.
+
+    Arguments:
+    - timestamps -- Non-decreasing sequence or NumPy array of timestamps
+    - values -- Sequence or NumPy array of values belonging to timestamps
+    - chunk_size -- Number of data points per stored prefix sum, defaults to 1024
+    """
+
+    def __init__(
+            self,
+            timestamps,
+            values,
+            chunk_size:int=1024) -> None:
+        if chunk_size<1:
+            raise ValueError("Invalid chunk size")
+        self.timestamps=np.asarray(timestamps,dtype=np.float64)
+        self.values=np.asarray(values,dtype=np.float64)
+        if len(self.timestamps)!=len(self.values):
+            raise ValueError("Length of timestamps does not match length of values")
+        if np.any(self.timestamps[1:]<self.timestamps[:-1]):
+            raise ValueError("Timestamps have to be non-decreasing")
+        self.chunk_size=chunk_size
+        self.offset=self.values[0].item() if len(self.values)>0 else 0.0
+        chunk_count=len(self.values)//chunk_size
+        self.sums=np.zeros(chunk_count+1)
+        self.square_sums=np.zeros(chunk_count+1)
+        for chunk in range(chunk_count):
+            shifted=self.values[chunk*chunk_size:(chunk+1)*chunk_size]-self.offset
+            self.sums[chunk+1]=self.sums[chunk]+shifted.sum()
+            self.square_sums[chunk+1]=self.square_sums[chunk]+np.dot(shifted,shifted)
+
+    def __len__(self):
+        return len(self.values)
+
+    def prefix(
+            self,
+            index:int) -> tuple:
+        """Shifted sum and sum of squares of the first index values"""
+        chunk=min(index//self.chunk_size,len(self.sums)-1)
+        shifted=self.values[chunk*self.chunk_size:index]-self.offset
+        return (
+            self.sums[chunk].item()+shifted.sum().item(),
+            self.square_sums[chunk].item()+np.dot(shifted,shifted).item())
+
+    def indices(
+            self,
+            start:float=None,
+            end:float=None) -> tuple:
+        """First index at or after start and first index at or after end, covering the data points in [start, end)"""
+        first=0 if start is None else int(np.searchsorted(self.timestamps,start,"left"))
+        last=len(self.values) if end is None else int(np.searchsorted(self.timestamps,end,"left"))
+        return first,max(first,last)
+
+    def statistics(
+            self,
+            start:float=None,
+            end:float=None) -> tuple:
+        """Return (count, mean, standard deviation) of the data points with a timestamp in [start, end)
+
+        The standard deviation is the population standard deviation, as used by the rule handlers. Mean and standard
+        deviation are None for an empty range.
+        """
+        return self.statistics_between(*self.indices(start,end))
+
+    def statistics_between(
+            self,
+            first:int,
+            last:int) -> tuple:
+        """Return (count, mean, standard deviation) of the data points with an index in [first, last)"""
+        count=last-first
+        if count<=0:
+            return 0,None,None
+        # Short ranges are summed directly, the difference of two large prefix sums would cancel most of their precision
+        if count<=self.chunk_size:
+            values=self.values[first:last]
+            return count,values.mean().item(),values.std().item()
+        first_sum,first_square_sum=self.prefix(first)
+        last_sum,last_square_sum=self.prefix(last)
+        shifted_mean=(last_sum-first_sum)/count
+        variance=(last_square_sum-first_square_sum)/count-shifted_mean*shifted_mean
+        return count,shifted_mean+self.offset,math.sqrt(max(variance,0.0))
+
+    def evaluate(
+            self,
+            start:float=None,
+            end:float=None,
+            baseline_start:float=None,
+            baseline_end:float=None) -> list:
+        """Apply Nelson Rules to the data points in [start, end), checked against the mean and standard deviation of [baseline_start, baseline_end)
+
+        Returns the NelsonRuleEvents a NelsonRuleHandler with a FrozenBaseline of the baseline range would produce when
+        fed the data points of the range, including its warm-up period.
+        """
+        count,mean,standard_deviation=self.statistics(baseline_start,baseline_end)
+        if count==0:
+            raise ValueError("Baseline range contains no data")
+        first,last=self.indices(start,end)
+        return evaluate(
+            self.values[first:last],
+            self.timestamps[first:last],
+            mean,
+            standard_deviation)
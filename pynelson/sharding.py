@@ -0,0 +1,294 @@
+from threading import Thread
+from threading import Event
+from queue import Queue,Empty
+import multiprocessing
+import os
+import numpy as np
+from pynelson.types import Data,DataBatch,DataShed,ExceptionEvent,TriggerData
+from pynelson.multi_stream import MultiStreamEngine
+from pynelson.ingest import get_batch
+
+class ShardedRuntime(Thread):
+    """Apply Nelson Rules to many continuous processes using a pool of worker processes
+
+    Creates a thread that routes every Data object of the data queue, by hashing its id, to one of shard_count worker processes.
+    Each worker checks the streams of its shard with a MultiStreamEngine, so rule evaluation is not limited to a single core by the GIL.
+    Queue items are drained in batches and routed as columns. Stream ids are interned once into integer codes, only
+    columns of codes, values and timestamps are sent to the workers and the stream ids are put back into their events.
+    A DataBatch with NumPy ids is interned with one lookup per distinct id, so the routing thread does no per-point Python work for it.
+    Events and exceptions of all workers are merged back into the event and exception queue, events of a stream keep their order.
+    DataShed markers are passed to every worker, whose engine flags the events with shed_count and degraded.
+    A worker that dies is reported with an ExceptionEvent and no longer waited for, data routed to it is lost.
+    Setting the stop event routes the items still waiting in the data queue, flushes pending data, stops the workers and
+    joins them before the thread terminates.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread and worker processes
+    - data_queue -- Containts the manufacturing data arriving from every stream, data is wrapped in a Data object with its stream id
+    - event_queue -- If a Nelson Rule is triggered/cleared, place NelsonRuleEvent inside of this queue
+    - shard_count -- Number of worker processes, defaults to the number of CPU cores
+    - batch_size -- Number of data points sent to a worker at once, and maximum number of queue items routed per wakeup, defaults to 4096
+    - window_size -- Number of most recent data points kept per stream, at least 15, defaults to 15
+    - poll_interval -- Time in seconds between checks of the stop event while the data queue is empty, defaults to 0.1
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            data_queue:Queue,
+            event_queue:Queue,
+            shard_count:int=None,
+            batch_size:int=4096,
+            window_size:int=15,
+            poll_interval:float=0.1) -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.data_queue=data_queue
+        self.event_queue=event_queue
+        self.shard_count=os.cpu_count() if shard_count is None else shard_count
+        self.batch_size=batch_size
+        self.window_size=window_size
+        self.poll_interval=poll_interval
+
+        self.shard_queues=[]
+        self.workers=[]
+        self.result_queue=None
+        self.collector=None
+        self.pending=[] # Per shard, list of (stream codes, values, timestamps) columns not sent yet
+        self.pending_counts=[]
+        self.stream_codes={} # stream id -> integer code sent to the workers
+        self.code_ids=[] # code -> stream id
+        self.code_shards=np.zeros(64,dtype=np.int64) # code -> shard
+
+    def shard_of(
+            self,
+            stream_id) -> int:
+        """Return the index of the worker responsible for a stream"""
+        return hash(stream_id)%self.shard_count
+
+    def stream_code(
+            self,
+            stream_id) -> int:
+        """Return the integer code of a stream, registering it on first use"""
+        code=self.stream_codes.get(stream_id)
+        if code is None:
+            code=len(self.code_ids)
+            if code==len(self.code_shards):
+                self.code_shards=np.concatenate((self.code_shards,np.zeros(code,dtype=np.int64)))
+            self.code_shards[code]=self.shard_of(stream_id)
+            self.stream_codes[stream_id]=code
+            self.code_ids.append(stream_id)
+        return code
+
+    def stream_codes_of(
+            self,
+            stream_ids) -> np.ndarray:
+        """Return the integer codes of a column of stream ids, a NumPy array of numbers or strings is looked up once per distinct id"""
+        if isinstance(stream_ids,np.ndarray) and stream_ids.dtype!=object:
+            unique_ids,inverse=np.unique(stream_ids,return_inverse=True)
+            return np.fromiter(map(self.stream_code,unique_ids.tolist()),dtype=np.int64,count=len(unique_ids))[inverse]
+        return np.fromiter(map(self.stream_code,stream_ids),dtype=np.int64,count=len(stream_ids))
+
+    # Runs at thread start
+    def run(self):
+        try:
+            self.start_workers()
+            while not self.stop_event.is_set():
+                batch = get_batch(self.data_queue,self.batch_size,self.poll_interval)
+                if len(batch)>0:
+                    self.process_batch(batch)
+                if self.data_queue.empty():
+                    self.flush()
+            self.drain()
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(self.ident,e))
+        finally:
+            self.stop_workers()
+
+    # Route the items left in the data queue once the stop event is set
+    def drain(self):
+        while True:
+            batch=get_batch(self.data_queue,self.batch_size,0)
+            if len(batch)==0:
+                return
+            self.process_batch(batch)
+
+    def process_batch(
+            self,
+            batch:list):
+        """Route a list of queue items to the workers, consecutive Data objects are routed together"""
+        data_list=[]
+        for item in batch:
+            if isinstance(item,Data):
+                data_list.append(item)
+            elif isinstance(item,DataBatch):
+                self.route_data(data_list)
+                data_list=[]
+                self.route_batch(item)
+            elif isinstance(item,DataShed):
+                self.route_data(data_list)
+                data_list=[]
+                self.route_shed(item)
+            else:
+                data_list.extend(item)
+        self.route_data(data_list)
+
+    def route_data(
+            self,
+            data_list:list):
+        if len(data_list)==0:
+            return
+        self.route(
+            np.fromiter((self.stream_code(data.id) for data in data_list),dtype=np.int64,count=len(data_list)),
+            np.fromiter((data.value for data in data_list),dtype=np.float64,count=len(data_list)),
+            np.fromiter((data.timestamp for data in data_list),dtype=np.float64,count=len(data_list)))
+
+    def route_batch(
+            self,
+            batch:DataBatch):
+        if batch.ids is None:
+            code=self.stream_code(batch.id)
+            self.add_pending(int(self.code_shards[code]),np.full(len(batch),code,dtype=np.int64),batch.values,batch.timestamps)
+        else:
+            self.route(self.stream_codes_of(batch.ids),batch.values,batch.timestamps)
+
+    def route(
+            self,
+            codes:np.ndarray,
+            values:np.ndarray,
+            timestamps:np.ndarray):
+        """Split columns of stream codes, values and timestamps by shard, keeping the order within every shard"""
+        shards=self.code_shards[codes]
+        order=np.argsort(shards,kind="stable")
+        bounds=np.searchsorted(shards[order],np.arange(self.shard_count+1))
+        for shard in range(self.shard_count):
+            start,end=bounds[shard],bounds[shard+1]
+            if end>start:
+                selected=order[start:end]
+                self.add_pending(shard,codes[selected],values[selected],timestamps[selected])
+
+    # Every worker records the marker after the data routed before it, it is not known which streams lost data
+    def route_shed(
+            self,
+            shed:DataShed):
+        self.flush()
+        for shard_queue in self.shard_queues:
+            shard_queue.put(DataShed(shed.count))
+
+    def add_pending(
+            self,
+            shard:int,
+            codes:np.ndarray,
+            values:np.ndarray,
+            timestamps:np.ndarray):
+        self.pending[shard].append((codes,values,timestamps))
+        self.pending_counts[shard]+=len(values)
+        if self.pending_counts[shard]>=self.batch_size:
+            self.flush_shard(shard)
+
+    def start_workers(self):
+        self.result_queue=multiprocessing.Queue()
+        for shard in range(self.shard_count):
+            shard_queue=multiprocessing.Queue()
+            worker=multiprocessing.Process(
+                target=run_shard,
+                args=(shard,shard_queue,self.result_queue,self.window_size),
+                daemon=True)
+            worker.start()
+            self.shard_queues.append(shard_queue)
+            self.workers.append(worker)
+            self.pending.append([])
+            self.pending_counts.append(0)
+        self.collector=Thread(target=self.collect,daemon=True)
+        self.collector.start()
+
+    def flush(self):
+        """Send all pending data to the workers"""
+        for shard in range(len(self.pending)):
+            self.flush_shard(shard)
+
+    def flush_shard(
+            self,
+            shard:int):
+        pending=self.pending[shard]
+        if len(pending)>0:
+            self.shard_queues[shard].put(tuple(np.concatenate(columns) for columns in zip(*pending)))
+            self.pending[shard]=[]
+            self.pending_counts[shard]=0
+
+    def stop_workers(self):
+        if len(self.workers)==0:
+            return
+        self.flush()
+        for shard_queue in self.shard_queues:
+            shard_queue.put(None)
+        self.collector.join()
+        for worker in self.workers:
+            worker.join()
+
+    # Forwards worker results until every worker has signalled it finished or has died
+    def collect(self):
+        running=set(range(self.shard_count))
+        exited=set()
+        while len(running)>0:
+            try:
+                result=self.result_queue.get(True,0.5)
+            except Empty:
+                for shard in sorted(running):
+                    worker=self.workers[shard]
+                    if worker.is_alive():
+                        continue
+                    # Results of an exited worker are already in the queue, it is given up after a further wait without them
+                    if shard in exited:
+                        running.discard(shard)
+                        self.exception_queue.put(
+                            ExceptionEvent(worker.pid,RuntimeError("Worker of shard "+str(shard)+" exited with code "+str(worker.exitcode))))
+                    else:
+                        exited.add(shard)
+                continue
+            if isinstance(result,int):
+                running.discard(result)
+            elif isinstance(result,ExceptionEvent):
+                self.exception_queue.put(result)
+            else:
+                for event in result:
+                    restore_stream_id(event,self.code_ids[event.stream_id])
+                    self.event_queue.put(event)
+
+def restore_stream_id(
+        event,
+        stream_id):
+    """Replace the stream code a worker put into an event, and its trigger data, by the stream id"""
+    event.stream_id=stream_id
+    if isinstance(event.trigger_data,TriggerData):
+        event.trigger_data.ids=[stream_id]*len(event.trigger_data)
+    else:
+        for data in event.trigger_data:
+            data.id=stream_id
+
+def run_shard(
+        shard:int,
+        shard_queue,
+        result_queue,
+        window_size:int):
+    """Worker process checking the streams of a single shard, identified by their codes, finishes by putting its shard index into the result queue"""
+    engine=MultiStreamEngine(window_size)
+    try:
+        while True:
+            batch=shard_queue.get(True)
+            if batch is None:
+                break
+            if isinstance(batch,DataShed):
+                engine.record_shed(batch.count)
+                continue
+            events=engine.process_arrays(*batch)
+            if len(events)>0:
+                result_queue.put(events)
+    except Exception as e:
+        result_queue.put(
+            ExceptionEvent(os.getpid(),e))
+    result_queue.put(shard)
@@ -0,0 +1,250 @@
+from multiprocessing import shared_memory
+from multiprocessing import resource_tracker
+from queue import Empty,Full
+import datetime
+import os
+import time
+import numpy as np
+from pynelson.types import DataBatch
+
+MAGIC = 0x474e4952_4c454e59
+RECORD = np.dtype([("timestamp","<f8"),("value","<f8")])
+
+# The write index and dropped count are only written by the producer, the read index only by the consumer.
+# Each index sits in its own cache line, the records follow the header.
+WRITE_OFFSET = 0
+READ_OFFSET = 64
+DROPPED_OFFSET = 128
+MAGIC_OFFSET = 136
+CAPACITY_OFFSET = 144
+HEADER_SIZE = 192
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP = "drop"
+OVERFLOW_ERROR = "error"
+
+# Names of the rings created by this process, attaching to them must not touch the resource tracker registration
+created_names = set()
+
+# Longest sleep between two checks of a waiting producer or consumer
+MAX_WAIT_STEP = 0.001
+
+class SharedRing:
+    """Single-producer/single-consumer ring of (timestamp, value) records in multiprocessing.shared_memory
+
+    Indices only grow and are published after the records they cover, the producer only moves the write index and the
+    consumer only moves the read index, so neither side takes a lock. Waiting sides poll with a growing sleep of up to 1 ms.
+    Publishing an index by a plain store relies on the memory model of x86 (TSO), where stores become visible to other
+    cores in program order, so a reader seeing the new index also sees the records. CPUs with a weaker memory model, e.g.
+    ARM, may make the index visible first; the ring is not safe across processes on those.
+    The process creating the ring unlinks the shared memory on close.
+
+    Arguments:
+    - name -- Name of the shared memory block, defaults to None creating a block with a random name
+    - capacity -- Number of records, rounded up to a power of two; creates the ring if given, attaches to an existing one if None
+    """
+
+    def __init__(
+            self,
+            name:str=None,
+            capacity:int=None) -> None:
+        self.owner=capacity is not None
+        if self.owner:
+            if capacity<1:
+                raise ValueError("Invalid capacity")
+            capacity=1<<(capacity-1).bit_length()
+            self.memory=shared_memory.SharedMemory(name,True,HEADER_SIZE+capacity*RECORD.itemsize)
+            self.memory.buf[:HEADER_SIZE]=bytes(HEADER_SIZE)
+            np.ndarray(1,np.uint64,self.memory.buf,CAPACITY_OFFSET)[0]=capacity
+            np.ndarray(1,np.uint64,self.memory.buf,MAGIC_OFFSET)[0]=MAGIC
+            created_names.add(self.memory.name)
+        else:
+            if name is None:
+                raise ValueError("Name required to attach to a ring")
+            self.memory=shared_memory.SharedMemory(name)
+            # Only the owner may unlink, keep the resource tracker of this process from doing so at exit
+            if self.memory.name not in created_names:
+                unregister_tracking(self.memory.name)
+            if int(np.ndarray(1,np.uint64,self.memory.buf,MAGIC_OFFSET)[0])!=MAGIC:
+                self.memory.close()
+                raise ValueError("Not a pynelson ring: "+name)
+            capacity=int(np.ndarray(1,np.uint64,self.memory.buf,CAPACITY_OFFSET)[0])
+        self.name=self.memory.name
+        self.capacity=capacity
+        self.mask=capacity-1
+        self.write_index=np.ndarray(1,np.uint64,self.memory.buf,WRITE_OFFSET)
+        self.read_index=np.ndarray(1,np.uint64,self.memory.buf,READ_OFFSET)
+        self.dropped_count=np.ndarray(1,np.uint64,self.memory.buf,DROPPED_OFFSET)
+        self.records=np.ndarray(capacity,RECORD,self.memory.buf,HEADER_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+    def qsize(self) -> int:
+        """Number of records waiting to be consumed"""
+        return int(self.write_index[0])-int(self.read_index[0])
+
+    def empty(self) -> bool:
+        return self.qsize()==0
+
+    @property
+    def dropped(self) -> int:
+        """Number of records discarded by a producer with the drop overflow policy"""
+        return int(self.dropped_count[0])
+
+    def close(self):
+        """Release the mapping, the owner also removes the shared memory block"""
+        if self.records is None:
+            return
+        self.write_index=self.read_index=self.dropped_count=self.records=None
+        self.memory.close()
+        if self.owner:
+            created_names.discard(self.name)
+            self.memory.unlink()
+
+def unregister_tracking(name:str):
+    """Remove a shared memory block attached to from the resource tracker of this process, only POSIX registers blocks"""
+    if os.name!="posix":
+        return
+    # The tracker knows the block by its POSIX name, with the leading slash that SharedMemory.name leaves out
+    resource_tracker.unregister(name if name.startswith("/") else "/"+name,"shared_memory")
+
+class RingProducer(SharedRing):
+    """Writing side of a SharedRing, to be used by a single thread of a single process
+
+    Overflow policies, applied when a write does not fit into the free space:
+    - "block" -- Wait for the consumer, raises queue.Full if timeout passes first
+    - "drop" -- Write what fits, the remaining records are discarded and counted in dropped
+    - "error" -- Raise queue.Full without writing
+
+    Arguments:
+    - name -- Name of the shared memory block, defaults to None creating a block with a random name
+    - capacity -- Number of records, rounded up to a power of two; creates the ring if given, attaches to an existing one if None
+    - overflow -- Overflow policy, defaults to "block"
+    - timeout -- Maximum time in seconds a blocking write waits for space, defaults to None waiting forever
+    """
+
+    def __init__(
+            self,
+            name:str=None,
+            capacity:int=None,
+            overflow:str=OVERFLOW_BLOCK,
+            timeout:float=None) -> None:
+        if overflow not in (OVERFLOW_BLOCK,OVERFLOW_DROP,OVERFLOW_ERROR):
+            raise ValueError("Invalid overflow policy: "+str(overflow))
+        SharedRing.__init__(self,name,capacity)
+        self.overflow=overflow
+        self.timeout=timeout
+
+    def put(
+            self,
+            value:float,
+            timestamp:float=None) -> int:
+        """Write a single data point, timestamp defaults to the current system time; returns the number of records written"""
+        if timestamp is None:
+            timestamp=datetime.datetime.now().timestamp()
+        return self.put_many((value,),(timestamp,))
+
+    def put_many(
+            self,
+            values,
+            timestamps=None) -> int:
+        """Write a frame of data points with a single index update per contiguous part, returns the number of records written
+
+        Frames larger than the ring are written in parts when blocking.
+
+        Arguments:
+        - values -- Sequence or NumPy array of values
+        - timestamps -- Sequence or NumPy array of timestamps belonging to values, defaults to the current system time
+        """
+        values=np.asarray(values,dtype=np.float64)
+        if timestamps is None:
+            timestamps=np.full(len(values),datetime.datetime.now().timestamp())
+        else:
+            timestamps=np.asarray(timestamps,dtype=np.float64)
+        if len(timestamps)!=len(values):
+            raise ValueError("Length of timestamps does not match length of values")
+        written=0
+        deadline=None if self.timeout is None else time.monotonic()+self.timeout
+        wait_step=0
+        while written<len(values):
+            write=int(self.write_index[0])
+            free=self.capacity-(write-int(self.read_index[0]))
+            if free==0 or (free<len(values)-written and self.overflow==OVERFLOW_ERROR):
+                if self.overflow==OVERFLOW_ERROR:
+                    raise Full
+                if self.overflow==OVERFLOW_DROP:
+                    self.dropped_count[0]+=len(values)-written
+                    break
+                if deadline is not None and time.monotonic()>=deadline:
+                    raise Full
+                time.sleep(wait_step)
+                wait_step=min(MAX_WAIT_STEP,wait_step*2 or 0.00001)
+                continue
+            wait_step=0
+            count=min(free,len(values)-written)
+            start=write&self.mask
+            first=min(count,self.capacity-start)
+            self.records["timestamp"][start:start+first]=timestamps[written:written+first]
+            self.records["value"][start:start+first]=values[written:written+first]
+            if first<count:
+                self.records["timestamp"][:count-first]=timestamps[written+first:written+count]
+                self.records["value"][:count-first]=values[written+first:written+count]
+            # Published after the records, see the memory model note of SharedRing
+            self.write_index[0]=write+count
+            written+=count
+        return written
+
+class RingConsumer(SharedRing):
+    """Reading side of a SharedRing that can be given to a NelsonRuleHandler in place of its data queue
+
+    Follows the queue.Queue interface used by the handlers: get returns a DataBatch of every record waiting, up to
+    max_batch, copied out of the shared memory in one step.
+
+    Arguments:
+    - name -- Name of the shared memory block, defaults to None creating a block with a random name
+    - capacity -- Number of records, rounded up to a power of two; creates the ring if given, attaches to an existing one if None
+    - max_batch -- Maximum number of records returned by a single get, defaults to 4096
+    - id -- Identification given to every data point, defaults to None
+    """
+
+    def __init__(
+            self,
+            name:str=None,
+            capacity:int=None,
+            max_batch:int=4096,
+            id=None) -> None:
+        SharedRing.__init__(self,name,capacity)
+        self.max_batch=max_batch
+        self.id=id
+
+    def get(
+            self,
+            block:bool=True,
+            timeout:float=None) -> DataBatch:
+        """Take the waiting records as a DataBatch, raises queue.Empty if none arrive within timeout"""
+        deadline=None if timeout is None else time.monotonic()+timeout
+        wait_step=0
+        while True:
+            read=int(self.read_index[0])
+            count=min(int(self.write_index[0])-read,self.max_batch)
+            if count>0:
+                break
+            if not block or (deadline is not None and time.monotonic()>=deadline):
+                raise Empty
+            time.sleep(wait_step)
+            wait_step=min(MAX_WAIT_STEP,wait_step*2 or 0.00001)
+        start=read&self.mask
+        first=min(count,self.capacity-start)
+        if first==count:
+            records=self.records[start:start+count].copy()
+        else:
+            records=np.concatenate((self.records[start:],self.records[:count-first]))
+        self.read_index[0]=read+count
+        return DataBatch(records["value"],records["timestamp"],id=self.id)
+
+    def get_nowait(self) -> DataBatch:
+        return self.get(False)
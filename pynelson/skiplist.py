@@ -0,0 +1,133 @@
+import math
+import random
+
+class End:
+    """Sentinel greater than every value, terminating every level of an IndexableSkiplist"""
+
+    def __lt__(self,other):
+        return False
+
+    def __le__(self,other):
+        return other is self
+
+    def __gt__(self,other):
+        return other is not self
+
+    def __ge__(self,other):
+        return True
+
+class Node:
+    __slots__=("value","next","width")
+
+    def __init__(
+            self,
+            value,
+            next:list,
+            width:list) -> None:
+        self.value=value
+        self.next=next
+        self.width=width
+
+NIL = Node(End(),[],[])
+
+class IndexableSkiplist:
+    """Sorted multiset with O(log n) insert, remove, access by rank and rank of a value
+
+    Every link stores the number of elements it skips, so positions are found by summing widths while descending the levels.
+    Elements must be totally ordered, NaN is not supported.
+
+    Arguments:
+    - expected_size -- Expected maximum number of elements, determines the number of levels, defaults to 100
+    """
+
+    def __init__(
+            self,
+            expected_size:int=100) -> None:
+        self.size=0
+        self.levels=int(1+math.log2(max(expected_size,2)))
+        self.head=Node(None,[NIL]*self.levels,[1]*self.levels)
+        self.random=random.Random(0)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(
+            self,
+            index:int):
+        """Element of rank index, 0 being the smallest"""
+        if index<0:
+            index+=self.size
+        if not 0<=index<self.size:
+            raise IndexError("Index out of range")
+        node=self.head
+        index+=1
+        for level in reversed(range(self.levels)):
+            while node.width[level]<=index:
+                index-=node.width[level]
+                node=node.next[level]
+        return node.value
+
+    def __iter__(self):
+        node=self.head.next[0]
+        while node is not NIL:
+            yield node.value
+            node=node.next[0]
+
+    def rank(
+            self,
+            value) -> int:
+        """Number of elements smaller than value"""
+        node=self.head
+        rank=0
+        for level in reversed(range(self.levels)):
+            while node.next[level].value<value:
+                rank+=node.width[level]
+                node=node.next[level]
+        return rank
+
+    def insert(
+            self,
+            value):
+        chain=[None]*self.levels
+        steps_at_level=[0]*self.levels
+        node=self.head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value<=value:
+                steps_at_level[level]+=node.width[level]
+                node=node.next[level]
+            chain[level]=node
+        height=min(self.levels,1-int(math.log2(1.0-self.random.random())))
+        new_node=Node(value,[None]*height,[None]*height)
+        steps=0
+        for level in range(height):
+            previous_node=chain[level]
+            new_node.next[level]=previous_node.next[level]
+            previous_node.next[level]=new_node
+            new_node.width[level]=previous_node.width[level]-steps
+            previous_node.width[level]=steps+1
+            steps+=steps_at_level[level]
+        for level in range(height,self.levels):
+            chain[level].width[level]+=1
+        self.size+=1
+
+    def remove(
+            self,
+            value):
+        """Remove one element equal to value, raises KeyError if there is none"""
+        chain=[None]*self.levels
+        node=self.head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value<value:
+                node=node.next[level]
+            chain[level]=node
+        removed=chain[0].next[0]
+        if removed is NIL or removed.value!=value:
+            raise KeyError(value)
+        height=len(removed.next)
+        for level in range(height):
+            previous_node=chain[level]
+            previous_node.width[level]+=removed.width[level]-1
+            previous_node.next[level]=removed.next[level]
+        for level in range(height,self.levels):
+            chain[level].width[level]-=1
+        self.size-=1
@@ -0,0 +1,184 @@
+from threading import Thread
+from threading import Event
+from queue import Queue
+import numpy as np
+from pynelson.types import Data,DataBatch,DataShed,ExceptionEvent
+from pynelson.ingest import get_batch
+
+STATISTICS = ("mean","range","standard_deviation")
+
+class Subgrouper:
+    """Reduce raw samples into subgroups of size samples or of interval seconds, using NumPy
+
+    Every complete subgroup yields its mean (X-bar), range (R) and sample standard deviation (S, n-1 denominator, 0 for
+    subgroups of one sample), timestamped with its last sample. Samples of an incomplete subgroup are kept until it is
+    completed by a later call, a time bucket is complete once a sample of a later bucket arrives.
+
+    Arguments:
+    - size -- Number of samples per subgroup, defaults to None
+    - interval -- Length in seconds of the time bucket of a subgroup, buckets are aligned to multiples of interval, defaults to None
+    """
+
+    def __init__(
+            self,
+            size:int=None,
+            interval:float=None) -> None:
+        if (size is None)==(interval is None):
+            raise ValueError("Either size or interval is required")
+        if (size is not None and size<1) or (interval is not None and interval<=0):
+            raise ValueError("Invalid subgroup size or interval")
+        self.size=size
+        self.interval=interval
+        self.values=np.empty(0)
+        self.timestamps=np.empty(0)
+
+    def add(
+            self,
+            values,
+            timestamps) -> dict:
+        """Add samples, returns the statistics of the subgroups they complete
+
+        Returns a dictionary with NumPy arrays "timestamp", "count", "mean", "range" and "standard_deviation", one entry per subgroup.
+        """
+        values=np.concatenate((self.values,np.asarray(values,dtype=np.float64)))
+        timestamps=np.concatenate((self.timestamps,np.asarray(timestamps,dtype=np.float64)))
+        if self.size is not None:
+            end=len(values)-len(values)%self.size
+            starts=np.arange(0,end,self.size)
+        else:
+            buckets=np.floor(timestamps/self.interval)
+            starts=np.concatenate(([0],np.flatnonzero(buckets[1:]!=buckets[:-1])+1)) if len(values)>0 else np.empty(0,dtype=np.intp)
+            end=starts[-1] if len(starts)>0 else 0
+            starts=starts[:-1]
+        self.values=values[end:]
+        self.timestamps=timestamps[end:]
+        return reduce_subgroups(values[:end],timestamps[:end],starts)
+
+    def flush(self) -> dict:
+        """Return the statistics of the incomplete subgroup, if any, and drop it"""
+        values=self.values
+        timestamps=self.timestamps
+        self.values=np.empty(0)
+        self.timestamps=np.empty(0)
+        return reduce_subgroups(values,timestamps,np.zeros(min(len(values),1),dtype=np.intp))
+
+def reduce_subgroups(
+        values:np.ndarray,
+        timestamps:np.ndarray,
+        starts:np.ndarray) -> dict:
+    """Statistics of the subgroups of values beginning at the indices starts, the last one ending with values"""
+    if len(starts)==0:
+        empty=np.empty(0)
+        return {"timestamp":empty,"count":np.empty(0,dtype=np.intp),"mean":empty,"range":empty,"standard_deviation":empty}
+    counts=np.diff(np.append(starts,len(values)))
+    means=np.add.reduceat(values,starts)/counts
+    deviations=values-np.repeat(means,counts)
+    squares=np.add.reduceat(deviations*deviations,starts)
+    return {
+        "timestamp":timestamps[starts+counts-1],
+        "count":counts,
+        "mean":means,
+        "range":np.maximum.reduceat(values,starts)-np.minimum.reduceat(values,starts),
+        "standard_deviation":np.sqrt(squares/np.maximum(counts-1,1))}
+
+class SubgroupStage(Thread):
+    """Turn raw high-rate samples into subgroup statistics in front of rule handlers
+
+    Creates a thread reading raw data (Data, DataBatch or lists of Data) from the data queue and placing a DataBatch of
+    subgroup statistics into the queue of every requested statistic, e.g. {"mean": xbar_queue, "range": r_queue} for an
+    X-bar/R chart. Each output queue is read by its own NelsonRuleHandler, which then checks one data point per subgroup.
+    The incomplete subgroup is delivered when the stop event is set. A DataShed marker closes the incomplete subgroup,
+    which is delivered before the marker is passed on in order, so no subgroup spans shed data points.
+
+    Arguments:
+    - exception_queue -- If an exception occurs during any process, put an ExceptionEvent object inside of it
+    - stop_event -- Event to stop thread
+    - data_queue -- Contains the raw manufacturing data
+    - output_queues -- Dictionary of statistic ("mean", "range" or "standard_deviation") -> Queue
+    - size -- Number of samples per subgroup, defaults to None
+    - interval -- Length in seconds of the time bucket of a subgroup, defaults to None
+    - id -- Identification given to every subgroup data point, defaults to None
+    - batch_size -- Maximum number of queue items processed per wakeup, defaults to 1024
+    - poll_interval -- Maximum time in seconds to wait for data before rechecking the stop event, defaults to 0.1
+    """
+
+    def __init__(
+            self,
+            exception_queue:Queue,
+            stop_event:Event,
+            data_queue:Queue,
+            output_queues:dict,
+            size:int=None,
+            interval:float=None,
+            id=None,
+            batch_size:int=1024,
+            poll_interval:float=0.1) -> None:
+        Thread.__init__(self)
+        for statistic in output_queues:
+            if statistic not in STATISTICS:
+                raise ValueError("Invalid statistic: "+str(statistic))
+        self.exception_queue=exception_queue
+        self.stop_event=stop_event
+        self.data_queue=data_queue
+        self.output_queues=output_queues
+        self.subgrouper=Subgrouper(size,interval)
+        self.id=id
+        self.batch_size=batch_size
+        self.poll_interval=poll_interval
+        self.sample_count=0
+        self.subgroup_count=0
+
+    # Runs at thread start
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                batch=get_batch(self.data_queue,self.batch_size,self.poll_interval)
+                if len(batch)>0:
+                    self.process(batch)
+            self.deliver(self.subgrouper.flush())
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(self.ident,e))
+
+    def process(
+            self,
+            batch:list):
+        """Subgroup a list of queue items and deliver the completed subgroups"""
+        values=[]
+        timestamps=[]
+        for item in batch:
+            if isinstance(item,DataShed):
+                self.add_samples(values,timestamps)
+                values=[]
+                timestamps=[]
+                self.deliver(self.subgrouper.flush())
+                # Shed raw data points are passed on, so the rule handlers flag their events
+                for queue in self.output_queues.values():
+                    queue.put(item)
+            elif isinstance(item,DataBatch):
+                values.append(item.values)
+                timestamps.append(item.timestamps)
+            else:
+                items=[item] if isinstance(item,Data) else item
+                values.append(np.array([data.value for data in items],dtype=np.float64))
+                timestamps.append(np.array([data.timestamp for data in items],dtype=np.float64))
+        self.add_samples(values,timestamps)
+
+    def add_samples(
+            self,
+            values:list,
+            timestamps:list):
+        if len(values)==0:
+            return
+        values=np.concatenate(values)
+        self.sample_count+=len(values)
+        self.deliver(self.subgrouper.add(values,np.concatenate(timestamps)))
+
+    def deliver(
+            self,
+            subgroups:dict):
+        if len(subgroups["count"])==0:
+            return
+        self.subgroup_count+=len(subgroups["count"])
+        for statistic,queue in self.output_queues.items():
+            queue.put(DataBatch(subgroups[statistic],subgroups["timestamp"],id=self.id))
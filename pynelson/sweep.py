@@ -0,0 +1,295 @@
+import itertools
+import time
+import numpy as np
+import pynelson
+from pynelson.batch import _run_lengths,_counter_before
+
+class SweepConfiguration:
+    """Parameters of the Nelson Rules evaluated by a sweep, the defaults reproduce NelsonRuleHandler
+
+    Rule 8 has no parameters here and is not part of a sweep.
+
+    Arguments:
+    - rule1_sigma -- Distance from the mean, in standard deviations, beyond which rule 1 triggers, defaults to 3
+    - rule2_length -- Number of data points on the same side of the mean for rule 2, defaults to 9
+    - rule3_length -- Number of continuous increases or decreases for rule 3, defaults to 6
+    - rule4_length -- Number of alternating directions for rule 4, defaults to 14
+    - rule5_sigma -- Distance from the mean checked by rule 5, defaults to 2
+    - rule5_count -- Number of data points beyond rule5_sigma, on the same side, for rule 5, defaults to 2
+    - rule5_length -- Number of previous data points checked by rule 5, defaults to 3
+    - rule6_sigma -- Distance from the mean checked by rule 6, defaults to 1
+    - rule6_count -- Number of data points beyond rule6_sigma, on the same side, for rule 6, defaults to 4
+    - rule6_length -- Number of previous data points checked by rule 6, defaults to 5
+    - rule7_sigma -- Distance from the mean data points have to stay within for rule 7, defaults to 1
+    - rule7_length -- Number of data points within rule7_sigma for rule 7, defaults to 15
+    - warm_up -- Number of data points the rules are not checked for, defaults to IGNORE_FIRST_ELEMENTS_COUNT
+    """
+
+    def __init__(
+            self,
+            rule1_sigma:float=3,
+            rule2_length:int=9,
+            rule3_length:int=6,
+            rule4_length:int=14,
+            rule5_sigma:float=2,
+            rule5_count:int=2,
+            rule5_length:int=3,
+            rule6_sigma:float=1,
+            rule6_count:int=4,
+            rule6_length:int=5,
+            rule7_sigma:float=1,
+            rule7_length:int=15,
+            warm_up:int=None) -> None:
+        self.rule1_sigma=rule1_sigma
+        self.rule2_length=rule2_length
+        self.rule3_length=rule3_length
+        self.rule4_length=rule4_length
+        self.rule5_sigma=rule5_sigma
+        self.rule5_count=rule5_count
+        self.rule5_length=rule5_length
+        self.rule6_sigma=rule6_sigma
+        self.rule6_count=rule6_count
+        self.rule6_length=rule6_length
+        self.rule7_sigma=rule7_sigma
+        self.rule7_length=rule7_length
+        self.warm_up=pynelson.IGNORE_FIRST_ELEMENTS_COUNT if warm_up is None else warm_up
+        if self.warm_up<max(rule5_length,rule6_length):
+            raise ValueError("warm_up has to be at least rule5_length and rule6_length")
+
+    def __repr__(self):
+        return "SweepConfiguration("+", ".join(name+"="+repr(value) for name,value in vars(self).items())+")"
+
+class SweepResult:
+    """Outcome of a single configuration of a sweep
+
+    Arguments:
+    - configuration: The SweepConfiguration
+    - trigger_counts: Dictionary of rule_id -> number of times the rule triggered
+    - trigger_indices: Dictionary of rule_id -> NumPy array of the sample indices at which the rule triggered
+    - seconds: Time spent evaluating, work shared by configurations with the same warm_up is split evenly between them
+    """
+
+    def __init__(
+            self,
+            configuration:SweepConfiguration,
+            trigger_counts:dict,
+            trigger_indices:dict,
+            seconds:float) -> None:
+        self.configuration=configuration
+        self.trigger_counts=trigger_counts
+        self.trigger_indices=trigger_indices
+        self.seconds=seconds
+
+    @property
+    def total_triggers(self) -> int:
+        return sum(self.trigger_counts.values())
+
+def grid(**parameters) -> list:
+    """Build a SweepConfiguration for every combination of the given parameter values
+
+    Example: grid(rule1_sigma=[2.5,3,3.5], rule2_length=[7,8,9]) returns 9 configurations.
+    """
+    names=list(parameters)
+    return [
+        SweepConfiguration(**dict(zip(names,values)))
+        for values in itertools.product(*(parameters[name] for name in names))]
+
+def sweep(
+        values,
+        configurations:list,
+        chunk_size:int=65536) -> list:
+    """Evaluate a series against many rule configurations in a single pass
+
+    The running mean and standard deviation, directions and runs are computed once per warm_up, every threshold is
+    applied to all configurations at once as a (configurations x samples) array. The series is processed in chunks of
+    chunk_size samples, run counters are carried across chunk boundaries, so memory does not grow with the length of the
+    series times the number of configurations. Triggers are counted the way NelsonRuleHandler emits them, once per change
+    from cleared to triggered.
+
+    Returns a SweepResult per configuration, in the order of configurations.
+
+    Arguments:
+    - values -- Sequence or NumPy array of the recorded values
+    - configurations -- List of SweepConfiguration
+    - chunk_size -- Number of samples evaluated at once, defaults to 65536
+    """
+    x=np.asarray(values,dtype=np.float64)
+    results=[None]*len(configurations)
+    warm_ups={}
+    for index,configuration in enumerate(configurations):
+        warm_ups.setdefault(configuration.warm_up,[]).append(index)
+    for warm_up,indices in warm_ups.items():
+        start=time.perf_counter()
+        first=warm_up+1
+        found=[{rule_id:[] for rule_id in range(1,8)} for _ in indices]
+        previous_states={}
+        for offset,states in sweep_chunks(x,[configurations[index] for index in indices],chunk_size):
+            for rule_id,state in states.items():
+                previous_state=np.empty_like(state)
+                previous_state[:,0]=previous_states.get(rule_id,False)
+                previous_state[:,1:]=state[:,:-1]
+                previous_states[rule_id]=state[:,-1]
+                rows,columns=np.nonzero(state&~previous_state)
+                bounds=np.concatenate(([0],np.cumsum(np.bincount(rows,minlength=len(indices)))))
+                for row,trigger_indices in enumerate(found):
+                    trigger_indices[rule_id].append(columns[bounds[row]:bounds[row+1]]+first+offset)
+        seconds=(time.perf_counter()-start)/len(indices)
+        for index,trigger_indices in zip(indices,found):
+            trigger_indices={rule_id:np.concatenate(chunks) if chunks else np.empty(0,dtype=np.int64) for rule_id,chunks in trigger_indices.items()}
+            trigger_counts={rule_id:len(rule_indices) for rule_id,rule_indices in trigger_indices.items()}
+            results[index]=SweepResult(configurations[index],trigger_counts,trigger_indices,seconds)
+    return results
+
+def sweep_states(
+        x:np.ndarray,
+        configurations:list) -> dict:
+    """Rule states of configurations sharing a warm_up, rule_id -> boolean array of shape (configurations, evaluated samples)"""
+    chunks=[states for _,states in sweep_chunks(x,configurations,max(len(x),1))]
+    if len(chunks)==0:
+        return {rule_id:np.zeros((len(configurations),0),dtype=bool) for rule_id in range(1,8)}
+    return chunks[0]
+
+def sweep_chunks(
+        x:np.ndarray,
+        configurations:list,
+        chunk_size:int):
+    """Yield (offset, states) for consecutive chunks of the evaluated samples of configurations sharing a warm_up
+
+    states is rule_id -> boolean array of shape (configurations, chunk length), offset the index of the chunk's first
+    evaluated sample. Running sums, runs and counters are carried from one chunk to the next, the concatenated states
+    equal those of the whole series.
+    """
+    if chunk_size<1:
+        raise ValueError("Invalid chunk size")
+    n=len(x)
+    first=configurations[0].warm_up+1
+    count=len(configurations)
+    if n<=first:
+        return
+
+    def parameter(name):
+        return np.array([getattr(configuration,name) for configuration in configurations],dtype=np.float64)[:,None]
+
+    rule1_sigma=parameter("rule1_sigma")
+    rule2_length=parameter("rule2_length")
+    rule3_length=parameter("rule3_length")
+    rule4_length=parameter("rule4_length")
+    rule7_sigma=parameter("rule7_sigma")
+    rule7_length=parameter("rule7_length")
+
+    # Running sums of the data points before the chunk, added in the same order as by NelsonRuleHandler
+    data_sum=np.cumsum(x[:first-1])[-1] if first>1 else 0.0
+    deviation_sq_sum=0.0
+    if first>1:
+        counts=np.arange(1,first,dtype=np.float64)
+        deviation=np.cumsum(x[:first-1])/counts-x[:first-1]
+        deviation_sq_sum=np.cumsum(deviation*deviation)[-1]
+
+    # Runs and counters at the last evaluated sample of the previous chunk
+    same_side_run=0
+    slope_count=0
+    last_direction=-1 # Direction of the last move, a rule 3 count starts as if the previous move went down
+    previous_up=False
+    previous_down=False
+    alternating_run=0
+    alt_count=0
+    within_run=np.zeros((count,1),dtype=np.int64)
+
+    for start in range(0,n-first,chunk_size):
+        end=min(start+chunk_size,n-first)
+        evaluated=end-start
+
+        # Statistics and directions shared by every configuration, as in pynelson.batch.evaluate_states
+        chunk=x[first-1+start:first-1+end]
+        counts=np.arange(first+start,first+end,dtype=np.float64)
+        running_sum=np.cumsum(np.concatenate(([data_sum],chunk)))[1:]
+        running_mean=running_sum/counts
+        deviation=running_mean-chunk
+        running_deviation_sq=np.cumsum(np.concatenate(([deviation_sq_sum],deviation*deviation)))[1:]
+        data_sum=running_sum[-1]
+        deviation_sq_sum=running_deviation_sq[-1]
+        mean=running_mean
+        sd=np.sqrt(running_deviation_sq/counts)
+        current=x[first+start:first+end]
+        previous=chunk
+        up=previous<current
+        down=previous>current
+
+        def lagged(lag):
+            return x[first+start-lag:first+end-lag]
+
+        states={}
+
+        # NR 1
+        limit=rule1_sigma*sd
+        states[1]=(current>mean+limit)|(current<mean-limit)
+
+        # NR 2
+        same_side=((previous>=mean)&(current>=mean))|((previous<mean)&(current<mean))
+        run=_run_lengths_carried(same_side,same_side_run)
+        states[2]=_counter_before_carried(run,same_side_run)>=rule2_length
+        same_side_run=run[-1]
+
+        # NR 3
+        direction=up.astype(np.int8)-down.astype(np.int8)
+        moves=np.flatnonzero(direction)
+        move_directions=np.concatenate(([last_direction],direction[moves]))
+        move_counts=_run_lengths_carried(move_directions[1:]==move_directions[:-1],slope_count)
+        last_move=np.full(evaluated,-1)
+        last_move[moves]=np.arange(len(moves))
+        np.maximum.accumulate(last_move,out=last_move)
+        slopes=np.where(last_move>=0,move_counts[np.maximum(last_move,0)] if len(moves)>0 else 0,slope_count)
+        states[3]=_counter_before_carried(slopes,slope_count)>=rule3_length
+        slope_count=slopes[-1]
+        if len(moves)>0:
+            last_direction=move_directions[-1]
+
+        # NR 4
+        alternating=np.empty(evaluated,dtype=bool)
+        alternating[0]=(up[0] and previous_down) or (down[0] and previous_up)
+        alternating[1:]=(up[1:]&down[:-1])|(down[1:]&up[:-1])
+        run=_run_lengths_carried(alternating,alternating_run)
+        alternating_run=run[-1]
+        alts=np.where(up|down,run+1,0)
+        states[4]=_counter_before_carried(alts,alt_count)>=rule4_length
+        alt_count=alts[-1]
+        previous_up=bool(up[-1])
+        previous_down=bool(down[-1])
+
+        # NR 5 and 6, a lag only counts for configurations checking at least that many previous data points
+        for rule_id in (5,6):
+            limit=parameter("rule"+str(rule_id)+"_sigma")*sd
+            lengths=parameter("rule"+str(rule_id)+"_length")
+            pos_count=np.zeros((count,evaluated),dtype=np.int16)
+            neg_count=np.zeros((count,evaluated),dtype=np.int16)
+            for lag in range(1,int(lengths.max())+1):
+                checked=lengths>=lag
+                pos_count+=(lagged(lag)>mean+limit)&checked
+                neg_count+=(lagged(lag)<mean-limit)&checked
+            required=parameter("rule"+str(rule_id)+"_count")
+            states[rule_id]=(pos_count>=required)|(neg_count>=required)
+
+        # NR 7
+        limit=rule7_sigma*sd
+        within=(current>=mean-limit)&(current<=mean+limit)
+        run=_run_lengths_carried(within,within_run)
+        states[7]=_counter_before_carried(run,within_run[:,0])>=rule7_length
+        within_run=run[:,-1:]
+
+        yield start,states
+
+# Run lengths continuing a run of carry at the end of the previous chunk
+def _run_lengths_carried(
+        flags:np.ndarray,
+        carry) -> np.ndarray:
+    run=_run_lengths(flags)
+    unbroken=run==np.arange(1,flags.shape[-1]+1)
+    return run+np.where(unbroken,carry,0)
+
+# Counters are checked before they are updated with the current sample, carry is the counter of the previous chunk's last sample
+def _counter_before_carried(
+        counter:np.ndarray,
+        carry) -> np.ndarray:
+    before=_counter_before(counter)
+    before[...,0]=carry
+    return before
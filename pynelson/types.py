@@ -1,47 +1,170 @@
 import datetime
+import numbers
+from collections.abc import Sequence
+import numpy as np
 
 class Data:
     """Represents a single data point originating from any manufacturing process
+
+    Data uses __slots__, no attributes other than value, id and timestamp can be set on it. Callers attaching further
+    attributes subclass Data without __slots__, handlers accept the subclass like any Data object.
             
     Arguments:
     - value: Current value
     - id: Any sort of identification, defaults to None
-    - timestamp: Timestamp of the received data, defaults to the current system time
+    - timestamp: Timestamp of the received data in seconds since the epoch, a datetime is converted, defaults to the current system time
     """
 
+    __slots__=("value","id","timestamp")
+
     def __init__(
             self,
             value,
             id=None,
             timestamp=None) -> None:
         
-        if not isinstance(value,int) and not isinstance(value,float):
+        if not isinstance(value,(int,float)):
             raise ValueError("Invalid Data value")
 
         self.value=value
         self.id=id
-        if timestamp==None:
+        if timestamp is None:
             self.timestamp=datetime.datetime.now().timestamp()
-        else:
+        elif isinstance(timestamp,numbers.Real):
             self.timestamp=timestamp
+        elif isinstance(timestamp,datetime.datetime):
+            self.timestamp=timestamp.timestamp()
+        else:
+            raise ValueError("Invalid Data timestamp, expected seconds since the epoch")
+
+class DataBatch:
+    """Represents many data points as columns, accepted wherever a Data object is
+
+    Values and timestamps are stored in contiguous float64 NumPy arrays, no object is created per data point.
+
+    Arguments:
+    - values: Sequence or NumPy array of values
+    - timestamps: Sequence or NumPy array of timestamps in seconds since the epoch belonging to values, defaults to the current system time for all data points
+    - ids: Sequence of identifications belonging to values, defaults to None
+    - id: Identification shared by all data points, used if ids is None, defaults to None
+    """
+
+    __slots__=("values","timestamps","ids","id")
+
+    def __init__(
+            self,
+            values,
+            timestamps=None,
+            ids=None,
+            id=None) -> None:
+        self.values=np.ascontiguousarray(values,dtype=np.float64)
+        if timestamps is None:
+            self.timestamps=np.full(len(self.values),datetime.datetime.now().timestamp())
+        else:
+            try:
+                self.timestamps=np.ascontiguousarray(timestamps,dtype=np.float64)
+            except (TypeError,ValueError):
+                raise ValueError("Invalid DataBatch timestamps, expected seconds since the epoch") from None
+        if len(self.timestamps)!=len(self.values) or (ids is not None and len(ids)!=len(self.values)):
+            raise ValueError("Length of timestamps and ids must match length of values")
+        if ids is None and id is not None:
+            ids=[id]*len(self.values)
+        self.ids=ids
+        self.id=id
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        """Iterate the data points as Data objects"""
+        ids=self.ids if self.ids is not None else [None]*len(self.values)
+        for value,timestamp,id in zip(self.values.tolist(),self.timestamps.tolist(),ids):
+            yield Data(value,id,timestamp)
+
+class DataShed:
+    """Marker placed into a data queue where data points have been shed, e.g. by a BoundedDataQueue
+
+    Arguments:
+    - count: Number of data points shed at this position
+    """
+
+    __slots__=("count",)
+
+    def __init__(
+            self,
+            count:int) -> None:
+        self.count=count
+
+class TriggerData(Sequence):
+    """Read-only sequence of the data points responsible for triggering/clearing an event
+
+    Points are kept as columns and only wrapped into Data objects when accessed.
+
+    Arguments:
+    - values: array('d') of values
+    - timestamps: array('d') of timestamps, same length as values
+    - ids: List of identifications, defaults to None
+    """
+
+    __slots__=("values","timestamps","ids")
+
+    def __init__(
+            self,
+            values,
+            timestamps,
+            ids:list=None) -> None:
+        self.values=values
+        self.timestamps=timestamps
+        self.ids=ids
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(
+            self,
+            index):
+        if isinstance(index,slice):
+            return TriggerData(
+                self.values[index],
+                self.timestamps[index],
+                None if self.ids is None else self.ids[index])
+        return Data(
+            self.values[index],
+            None if self.ids is None else self.ids[index],
+            self.timestamps[index])
 
 class NelsonRuleEvent:
     """Schema to represent any event triggered/cleared by a Nelson Rule
             
     Arguments:
-    - rule_id: 1-indexed identification of a rule [1-8]
+    - rule_id: 1-indexed identification of a rule [1-8], or the rule_id of a configured pynelson.rules Rule
     - clear_event: True if this event is supposed to clear a previously triggered event, False otherwise
     - trigger_data: Depending on the rule, contains the values responsible for triggering/clearing an event
+    - stream_id: Identification of the stream the event belongs to, defaults to None
+    - shed_count: Number of data points shed from the input before this event, defaults to 0
+    - degraded: True if data points were shed recently enough to affect the data this event was computed on, defaults to False
+    - context: pynelson.history.TriggerContext loading the data around the event on demand, set if the handler keeps a history, defaults to None
+    - sample_index: Number of data points of the stream checked before the one this event was emitted on, defaults to None
     """
             
     def __init__(
             self,
             rule_id:int,
             clear_event:bool,
-            trigger_data:[]) -> None:
+            trigger_data:[],
+            stream_id=None,
+            shed_count:int=0,
+            degraded:bool=False,
+            context=None,
+            sample_index:int=None) -> None:
         self.rule_id=rule_id
         self.clear_event=clear_event
         self.trigger_data=trigger_data
+        self.stream_id=stream_id
+        self.shed_count=shed_count
+        self.degraded=degraded
+        self.context=context
+        self.sample_index=sample_index
 
 class ExceptionEvent:
     """Unified schema to represent an Exception raised by any threads used during the process
@@ -0,0 +1,65 @@
+from array import array
+from pynelson.types import TriggerData
+
+class DataWindow:
+    """Fixed size circular buffer holding the most recent data points
+
+    Values and timestamps are stored in preallocated array('d') storage, appending is O(1) and never moves stored points.
+    Every point is written twice, at its slot and one window length further, so the most recent points are always
+    contiguous and can be read through a memoryview without reordering.
+
+    Arguments:
+    - size -- Number of data points kept in the window
+    """
+
+    def __init__(
+            self,
+            size:int) -> None:
+        if size<1:
+            raise ValueError("Invalid window size")
+        self.size=size
+        self.values=array('d',bytes(16*size))
+        self.timestamps=array('d',bytes(16*size))
+        self.ids=[None]*(2*size)
+        self.head=0
+        self.count=0
+        self.value_view=memoryview(self.values).toreadonly()
+
+    def __len__(self):
+        return self.count if self.count<self.size else self.size
+
+    def append(
+            self,
+            value:float,
+            timestamp:float,
+            id=None):
+        """Place a data point into the window, overwriting the oldest element once the window is full"""
+        head=self.head
+        mirror=head+self.size
+        self.values[head]=self.values[mirror]=value
+        self.timestamps[head]=self.timestamps[mirror]=timestamp
+        self.ids[head]=self.ids[mirror]=id
+        head+=1
+        self.head=0 if head==self.size else head
+        self.count+=1
+
+    def last_values(
+            self,
+            count:int) -> memoryview:
+        """Read-only view of the last count values, oldest first"""
+        end=self.head+self.size
+        return self.value_view[end-count:end]
+
+    def snapshot(
+            self,
+            start:int,
+            end:int) -> TriggerData:
+        """Copy the points between start and end positions back from the newest element
+
+        Positions are counted from the end of the window, snapshot(9,1) contains the 9th newest element up to, but not including, the newest one.
+        """
+        last=self.head+self.size
+        return TriggerData(
+            self.values[last-start:last-end],
+            self.timestamps[last-start:last-end],
+            self.ids[last-start:last-end])
@@ -26,7 +26,7 @@ class Input(Thread):
     def run(self):
         try:
             while not self.stop_event.wait(self.data_rate):
-                self.data_queue.put(Data(random.randrange(self.min_value,self.max_value,1),None,datetime.now()))
+                self.data_queue.put(Data(random.randrange(self.min_value,self.max_value,1),None,datetime.now().timestamp()))
         except Exception as e:
             self.exception_queue.put(
                 ExceptionEvent(
@@ -1,7 +1,7 @@
 from threading import Thread
 from threading import Event
-from queue import Queue
-from pynelson.types import NelsonRuleEvent
+from queue import Queue,Empty
+from pynelson.types import NelsonRuleEvent,ExceptionEvent
 
 # A simple way to process NelsonRuleEvents and print them on screen
 class Output(Thread):
@@ -16,9 +16,19 @@ class Output(Thread):
         self.exception_queue=exception_queue
 
     def run(self):
-        while not self.stop_event.is_set():
-            nelson_rule_event:NelsonRuleEvent = self.event_queue.get(True)
-            self.process_event(nelson_rule_event)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    nelson_rule_event:NelsonRuleEvent = self.event_queue.get(True,0.1)
+                except Empty:
+                    continue
+                self.process_event(nelson_rule_event)
+        except Exception as e:
+            self.exception_queue.put(
+                ExceptionEvent(
+                    self.ident,
+                    e)
+                )
 
     def process_event(
             self,
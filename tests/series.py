@@ -0,0 +1,55 @@
+import random
+from queue import Queue
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.types import Data
+
+def generate(
+        seed:int,
+        count:int=5000) -> list:
+    """Series of count values mixing noise, shifts, trends, alternations, ties and outliers so that every rule fires"""
+    generator=random.Random(seed)
+    values=[]
+    while len(values)<count:
+        kind=generator.randrange(7)
+        if kind==0:
+            values+=[generator.gauss(0,1) for _ in range(50)]
+        elif kind==1:
+            values+=[generator.gauss(2,0.5) for _ in range(30)]
+        elif kind==2:
+            start=generator.gauss(0,1)
+            values+=[start+i*0.3 for i in range(10)]
+        elif kind==3:
+            values+=[(-1)**i*1.5 for i in range(20)]
+        elif kind==4:
+            values+=[float(generator.randrange(3)) for _ in range(20)]
+        elif kind==5:
+            values+=[generator.gauss(0,0.1) for _ in range(25)]
+        else:
+            values+=[generator.choice([-3,3])+generator.gauss(0,0.2) for _ in range(12)]
+    return values[:count]
+
+def event_key(event) -> tuple:
+    """Comparable summary of a NelsonRuleEvent"""
+    return (
+        event.rule_id,
+        event.clear_event,
+        [data.value for data in event.trigger_data],
+        [data.timestamp for data in event.trigger_data])
+
+def drain(queue:Queue) -> list:
+    events=[]
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+def handler_events(
+        values,
+        timestamps=None,
+        stream_id=None,
+        **arguments) -> list:
+    """Events a NelsonRuleHandler puts on its event queue for the series, processed point by point"""
+    event_queue=Queue()
+    handler=NelsonRuleHandler(None,None,None,event_queue,0,**arguments)
+    for index,value in enumerate(values):
+        handler.process_data(Data(value,stream_id,float(index) if timestamps is None else timestamps[index]))
+    return drain(event_queue)
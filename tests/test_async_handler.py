@@ -0,0 +1,55 @@
+import asyncio
+import numpy as np
+import pytest
+from pynelson.async_handler import AsyncNelsonRuleHandler
+from pynelson.types import Data,DataBatch
+from tests.series import generate,event_key,handler_events
+
+async def collect(handler:AsyncNelsonRuleHandler) -> list:
+    return [event async for event in handler]
+
+def test_queue_source_matches_handler():
+    values=generate(5,3000)
+    async def main():
+        queue=asyncio.Queue()
+        for start in range(0,1000,10):
+            await queue.put([Data(value,None,float(index)) for index,value in enumerate(values[start:start+10],start)])
+        await queue.put(DataBatch(values[1000:],np.arange(1000,len(values),dtype=float)))
+        await queue.put(None)
+        events=await collect(AsyncNelsonRuleHandler(queue,yield_interval=64))
+        await asyncio.wait_for(queue.join(),5)
+        return events
+    events=asyncio.run(main())
+    assert [event_key(event) for event in events]==[event_key(event) for event in handler_events(values)]
+
+def test_async_iterator_source():
+    values=generate(6,1000)
+    async def source():
+        for index,value in enumerate(values):
+            yield Data(value,None,float(index))
+    events=asyncio.run(collect(AsyncNelsonRuleHandler(source())))
+    assert [event_key(event) for event in events]==[event_key(event) for event in handler_events(values)]
+
+def test_large_batch_returns_to_event_loop():
+    values=generate(7,5000)
+    async def main():
+        queue=asyncio.Queue()
+        await queue.put(DataBatch(values,np.arange(len(values),dtype=float)))
+        await queue.put(None)
+        ticks=0
+        done=False
+        async def ticker():
+            nonlocal ticks
+            while not done:
+                ticks+=1
+                await asyncio.sleep(0)
+        task=asyncio.create_task(ticker())
+        await collect(AsyncNelsonRuleHandler(queue,yield_interval=100))
+        done=True
+        await task
+        return ticks
+    assert asyncio.run(main())>=len(values)//100-1
+
+def test_rejects_invalid_yield_interval():
+    with pytest.raises(ValueError):
+        AsyncNelsonRuleHandler(asyncio.Queue(),yield_interval=0)
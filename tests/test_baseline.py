@@ -0,0 +1,82 @@
+import pickle
+import numpy as np
+import pytest
+import pynelson
+from pynelson.baseline import Baseline,WelfordBaseline,RollingBaseline,EwmaBaseline,FrozenBaseline
+from tests.series import generate,event_key,handler_events
+
+def series() -> np.ndarray:
+    return np.random.default_rng(2).normal(5,2,size=2000)
+
+def test_baseline_is_abstract():
+    with pytest.raises(TypeError):
+        Baseline()
+
+def test_welford_matches_numpy():
+    values=series()
+    baseline=WelfordBaseline()
+    for index,value in enumerate(values):
+        baseline.add(float(value))
+        if index%97==0:
+            assert baseline.mean==pytest.approx(values[:index+1].mean())
+            assert baseline.standard_deviation==pytest.approx(values[:index+1].std(),abs=1e-12)
+    assert baseline.count==len(values)
+
+@pytest.mark.parametrize("window_size",[1,5,100])
+def test_rolling_matches_numpy_window(window_size):
+    values=series()
+    baseline=RollingBaseline(window_size)
+    for index,value in enumerate(values):
+        baseline.add(float(value))
+        window=values[max(0,index-window_size+1):index+1]
+        assert baseline.mean==pytest.approx(window.mean())
+        assert baseline.standard_deviation==pytest.approx(window.std(),abs=1e-6)
+
+def test_ewma_matches_recurrence():
+    values=series()
+    baseline=EwmaBaseline(0.1)
+    mean=float(values[0])
+    variance=0.0
+    baseline.add(mean)
+    for value in values[1:].tolist():
+        baseline.add(value)
+        delta=value-mean
+        mean+=0.1*delta
+        variance=0.9*(variance+0.1*delta*delta)
+    assert baseline.mean==pytest.approx(mean)
+    assert baseline.standard_deviation==pytest.approx(variance**0.5)
+
+def test_frozen_learns_then_freezes():
+    values=series()
+    baseline=FrozenBaseline(100)
+    for value in values.tolist():
+        baseline.add(value)
+    assert baseline.frozen
+    assert baseline.mean==pytest.approx(values[:100].mean())
+    assert baseline.standard_deviation==pytest.approx(values[:100].std())
+    fixed=FrozenBaseline(mean=1.0,standard_deviation=2.0)
+    fixed.add(100.0)
+    assert (fixed.mean,fixed.standard_deviation)==(1.0,2.0)
+    with pytest.raises(ValueError):
+        FrozenBaseline()
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        RollingBaseline(0)
+    with pytest.raises(ValueError):
+        EwmaBaseline(0)
+
+def test_handler_checks_against_frozen_baseline_like_evaluate():
+    values=generate(8,2000)
+    events=handler_events(values,baseline=FrozenBaseline(mean=0.0,standard_deviation=1.0))
+    expected=pynelson.evaluate(values,[float(index) for index in range(len(values))],0.0,1.0)
+    assert [event_key(event) for event in events]==[event_key(event) for event in expected]
+
+def test_baselines_pickle():
+    for baseline in (WelfordBaseline(),RollingBaseline(10),EwmaBaseline(0.2),FrozenBaseline(5)):
+        for value in series()[:50].tolist():
+            baseline.add(value)
+        restored=pickle.loads(pickle.dumps(baseline))
+        baseline.add(1.0)
+        restored.add(1.0)
+        assert (restored.mean,restored.standard_deviation)==(baseline.mean,baseline.standard_deviation)
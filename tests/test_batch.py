@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+import pynelson
+from tests.series import generate,event_key,handler_events
+
+@pytest.mark.parametrize("seed",range(4))
+def test_evaluate_matches_handler(seed):
+    values=generate(seed)
+    timestamps=[float(index) for index in range(len(values))]
+    expected=handler_events(values,timestamps)
+    events=pynelson.evaluate(np.array(values),np.array(timestamps))
+    assert [event_key(event) for event in events]==[event_key(event) for event in expected]
+    assert {event.rule_id for event in expected}=={1,2,3,4,5,6,7,8}
+
+def test_evaluate_sample_index_matches_handler():
+    values=generate(1)
+    expected=handler_events(values)
+    events=pynelson.evaluate(values,[float(index) for index in range(len(values))])
+    assert [event.sample_index for event in events]==[event.sample_index for event in expected]
+
+def test_evaluate_warm_up_only():
+    assert pynelson.evaluate([1.0]*pynelson.IGNORE_FIRST_ELEMENTS_COUNT)==[]
+
+def test_evaluate_rejects_mismatched_timestamps():
+    with pytest.raises(ValueError):
+        pynelson.evaluate([1.0,2.0],[0.0])
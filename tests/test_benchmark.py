@@ -0,0 +1,40 @@
+import numpy as np
+import pynelson
+from benchmark.generators import generate,sample_times
+from benchmark.runner import first_mismatch,check_detection,run_handler
+from pynelson.types import NelsonRuleEvent
+from tests.series import handler_events
+
+def test_generator_is_deterministic():
+    values,injections=generate(3,5000)
+    again,again_injections=generate(3,5000)
+    assert values==again
+    assert [(injection.rule_id,injection.start,injection.end) for injection in injections]==[
+        (injection.rule_id,injection.start,injection.end) for injection in again_injections]
+    assert len(values)==5000
+    assert {injection.rule_id for injection in injections}==set(range(1,9))
+
+def test_sample_times():
+    assert sample_times(3,4,10.0)==[10.0,10.25,10.5]
+
+def test_injected_patterns_of_every_rule_are_detected():
+    values,injections=generate(0,20000)
+    events=pynelson.evaluate(values,np.arange(len(values),dtype=np.float64))
+    # A pattern is missed when its rule is still triggered from noise right before it
+    for rule_id,(detected,injected,_) in check_detection(events,injections).items():
+        assert detected>=0.8*injected,rule_id
+
+def test_first_mismatch():
+    events=[NelsonRuleEvent(rule_id,False,[],sample_index=index) for index,rule_id in enumerate((1,2,3))]
+    assert first_mismatch(events,list(events)) is None
+    assert first_mismatch(events,events[:2])==2
+    changed=events[:1]+[NelsonRuleEvent(2,False,[],sample_index=5)]+events[2:]
+    assert first_mismatch(events,changed)==1
+
+def test_handler_run_matches_point_by_point():
+    values,_=generate(1,3000)
+    result,events=run_handler(values,sample_times(len(values),1000))
+    expected=handler_events(values)
+    assert result.samples==len(values)
+    assert [(event.rule_id,event.clear_event,event.sample_index) for event in events]==[
+        (event.rule_id,event.clear_event,event.sample_index) for event in expected]
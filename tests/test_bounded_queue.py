@@ -0,0 +1,94 @@
+import threading
+import time
+from queue import Full,Queue
+import pytest
+from pynelson.bounded_queue import BoundedDataQueue
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.types import Data,DataBatch,DataShed
+from tests.series import generate,drain as drain_events
+
+def drain(queue:BoundedDataQueue) -> tuple:
+    """Values of the waiting data points and the number of data points reported shed by markers"""
+    values=[]
+    shed=0
+    while not queue.empty():
+        item=queue.get_nowait()
+        if isinstance(item,DataShed):
+            shed+=item.count
+        elif isinstance(item,Data):
+            values.append(item.value)
+        elif isinstance(item,DataBatch):
+            values+=item.values.tolist()
+        else:
+            values+=[data.value for data in item]
+    return values,shed
+
+def test_drop_newest():
+    queue=BoundedDataQueue(10,"drop_newest")
+    queue.put(DataBatch(range(8)))
+    queue.put(DataBatch(range(8,13)))
+    queue.put(Data(99.0))
+    assert drain(queue)==([float(value) for value in range(10)],4)
+    assert queue.shed_count==4
+
+def test_drop_oldest():
+    queue=BoundedDataQueue(10,"drop_oldest")
+    queue.put(DataBatch(range(8)))
+    queue.put([Data(float(value)) for value in range(8,13)])
+    queue.put(Data(13.0))
+    assert isinstance(queue.get_nowait(),DataShed)
+    assert drain(queue)==([float(value) for value in range(4,14)],0)
+    assert queue.shed_count==4
+
+def test_drop_oldest_item_larger_than_capacity():
+    queue=BoundedDataQueue(10,"drop_oldest")
+    queue.put(DataBatch(range(25)))
+    assert drain(queue)==([float(value) for value in range(15,25)],15)
+
+def test_decimate():
+    queue=BoundedDataQueue(100,"decimate",decimation=4,high_water=10)
+    queue.put(DataBatch(range(10)))
+    queue.put(DataBatch(range(10,30)))
+    for value in (30.0,31.0,32.0):
+        queue.put(Data(value))
+    assert drain(queue)==([float(value) for value in list(range(11))+[14,18,22,26,30]],17)
+    assert queue.shed_count==17
+
+def test_block():
+    queue=BoundedDataQueue(5)
+    queue.put(DataBatch(range(5)))
+    with pytest.raises(Full):
+        queue.put(Data(1.0),timeout=0.05)
+    with pytest.raises(Full):
+        queue.put_nowait(Data(1.0))
+    timer=threading.Timer(0.1,queue.get)
+    timer.start()
+    start=time.monotonic()
+    queue.put(Data(1.0))
+    assert time.monotonic()-start>=0.05
+    timer.join()
+    assert queue.qsize()==1
+    assert queue.shed_count==0
+
+def test_block_accepts_oversized_item_when_empty():
+    queue=BoundedDataQueue(5)
+    queue.put(DataBatch(range(8)),timeout=0.05)
+    assert queue.qsize()==8
+
+def test_rejects_invalid_policy():
+    with pytest.raises(ValueError):
+        BoundedDataQueue(10,"drop_random")
+
+def test_handler_flags_events_after_shed_data():
+    values=generate(2,3000)
+    event_queue=Queue()
+    handler=NelsonRuleHandler(None,None,None,event_queue,0)
+    handler.process_item(DataBatch(values[:1500],[float(index) for index in range(1500)]))
+    before=drain_events(event_queue)
+    handler.process_item(DataShed(7))
+    handler.process_item(DataBatch(values[1500:],[float(index) for index in range(1500,3000)]))
+    after=drain_events(event_queue)
+    assert all(event.shed_count==0 and not event.degraded for event in before)
+    assert len(after)>0 and all(event.shed_count==7 for event in after)
+    window_size=handler.data_window.size
+    assert all(event.degraded==(event.sample_index<1500+window_size) for event in after)
@@ -0,0 +1,93 @@
+import os
+import time
+from queue import Queue
+from threading import Event
+import pytest
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.checkpoint import save_checkpoint,load_checkpoint,CheckpointWriter
+from pynelson.rules import NELSON_RULES
+from pynelson.baseline import RollingBaseline
+from pynelson.types import Data
+from tests.series import generate,event_key,drain,handler_events
+
+@pytest.mark.parametrize("arguments",[
+    lambda:{},
+    lambda:{"rules":NELSON_RULES},
+    lambda:{"baseline":RollingBaseline(100)}])
+def test_round_trip_continues_like_uninterrupted_handler(tmp_path,arguments):
+    values=generate(6)
+    expected=handler_events(values,stream_id="s",**arguments())
+    path=str(tmp_path/"handler.checkpoint")
+
+    event_queue=Queue()
+    handler=NelsonRuleHandler(None,None,None,event_queue,0,**arguments())
+    for index,value in enumerate(values[:2500]):
+        handler.process_data(Data(value,"s",float(index)))
+    save_checkpoint(handler,path)
+    events=drain(event_queue)
+
+    event_queue=Queue()
+    restored=NelsonRuleHandler(None,None,None,event_queue,0,**arguments())
+    load_checkpoint(restored,path)
+    assert restored.data_count==handler.data_count
+    assert restored.processed_count==handler.processed_count
+    for index,value in enumerate(values[2500:],2500):
+        restored.process_data(Data(value,"s",float(index)))
+    events+=drain(event_queue)
+
+    assert [event_key(event) for event in events]==[event_key(event) for event in expected]
+
+def run_handler(
+        values,
+        exception_queue:Queue,
+        stop_event:Event) -> NelsonRuleHandler:
+    handler=NelsonRuleHandler(exception_queue,stop_event,Queue(),Queue(),0,poll_interval=0.01)
+    handler.submit_many(values,[float(index) for index in range(len(values))])
+    return handler
+
+def wait_processed(
+        handler:NelsonRuleHandler,
+        count:int):
+    deadline=time.monotonic()+30
+    while handler.processed_count<count and time.monotonic()<deadline:
+        time.sleep(0.01)
+
+def test_writer_waits_for_handler_not_started_yet(tmp_path):
+    values=generate(7,2000)
+    path=str(tmp_path/"handler.checkpoint")
+    exception_queue=Queue()
+    handler_stop_event=Event()
+    handler=run_handler(values,exception_queue,handler_stop_event)
+    writer_stop_event=Event()
+    writer_stop_event.set()
+    writer=CheckpointWriter(exception_queue,writer_stop_event,{path:handler},shutdown_timeout=30)
+    writer.start()
+    time.sleep(0.2)
+    assert not os.path.exists(path)
+    handler.start()
+    writer.join()
+    wait_processed(handler,len(values))
+    handler_stop_event.set()
+    handler.join()
+    assert exception_queue.empty()
+    restored=NelsonRuleHandler(None,None,None,Queue(),0)
+    load_checkpoint(restored,path)
+    assert restored.processed_count<=len(values)
+
+def test_writer_reads_finished_handler_directly(tmp_path):
+    values=generate(7,2000)
+    path=str(tmp_path/"handler.checkpoint")
+    exception_queue=Queue()
+    stop_event=Event()
+    handler=run_handler(values,exception_queue,stop_event)
+    handler.start()
+    wait_processed(handler,len(values))
+    stop_event.set()
+    handler.join()
+    writer=CheckpointWriter(exception_queue,stop_event,{path:handler},shutdown_timeout=0)
+    writer.start()
+    writer.join()
+    assert exception_queue.empty()
+    restored=NelsonRuleHandler(None,None,None,Queue(),0)
+    load_checkpoint(restored,path)
+    assert restored.processed_count==len(values)
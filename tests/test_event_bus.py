@@ -0,0 +1,80 @@
+from threading import Thread
+import pytest
+from pynelson.event_bus import EventBus,Subscription
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.types import Data,NelsonRuleEvent
+from tests.series import generate,event_key,drain,handler_events
+
+def event(
+        rule_id:int,
+        clear_event:bool=False,
+        stream_id=None) -> NelsonRuleEvent:
+    return NelsonRuleEvent(rule_id,clear_event,[Data(1.0,"point",0.0)],stream_id)
+
+def test_filters():
+    bus=EventBus()
+    everything=bus.subscribe()
+    stream=bus.subscribe(stream_ids=["a"])
+    rules=bus.subscribe(rule_ids=[2])
+    cleared=bus.subscribe(clear_events=True)
+    points=bus.subscribe(stream_ids=["point"])
+    bus.put([event(1,False,"a"),event(2,True,"b"),event(3)])
+    assert bus.published_count==3
+    assert [item.rule_id for item in drain(everything)]==[1,2,3]
+    assert [item.rule_id for item in drain(stream)]==[1]
+    assert [item.rule_id for item in drain(rules)]==[2]
+    assert [item.rule_id for item in drain(cleared)]==[2]
+    # Without a stream id the id of the newest trigger point is used
+    assert [item.rule_id for item in drain(points)]==[3]
+
+def test_handler_events_reach_subscribers():
+    values=generate(11,2000)
+    bus=EventBus()
+    subscription=bus.subscribe()
+    handler=NelsonRuleHandler(None,None,None,bus,0)
+    for index,value in enumerate(values):
+        handler.process_data(Data(value,None,float(index)))
+    assert [event_key(item) for item in drain(subscription)]==[event_key(item) for item in handler_events(values)]
+
+def test_overflow_policies():
+    bus=EventBus()
+    oldest=bus.subscribe(maxsize=2)
+    newest=bus.subscribe(maxsize=2,overflow="drop_newest")
+    bus.put([event(1),event(2),event(3)])
+    assert [item.rule_id for item in drain(oldest)]==[2,3]
+    assert [item.rule_id for item in drain(newest)]==[1,2]
+    assert oldest.dropped_count==1 and newest.dropped_count==1
+    with pytest.raises(ValueError):
+        Subscription(overflow="block")
+
+def test_failing_predicate_only_affects_its_subscription():
+    bus=EventBus()
+    failing=bus.subscribe(predicate=lambda item:1/0)
+    other=bus.subscribe(predicate=lambda item:item.rule_id==1)
+    bus.put([event(1),event(2)])
+    assert failing.empty() and failing.error_count==2
+    assert isinstance(failing.last_error,ZeroDivisionError)
+    assert [item.rule_id for item in drain(other)]==[1]
+
+def test_qsize_and_empty_aggregate_subscriptions():
+    bus=EventBus()
+    assert bus.empty() and bus.qsize()==0
+    first=bus.subscribe()
+    second=bus.subscribe(rule_ids=[1])
+    bus.put([event(1),event(2)])
+    assert bus.qsize()==3 and not bus.empty()
+    drain(first)
+    assert bus.qsize()==1
+    bus.unsubscribe(second)
+    assert bus.empty()
+
+def test_counters_with_concurrent_publishers():
+    bus=EventBus()
+    subscription=bus.subscribe(maxsize=10)
+    threads=[Thread(target=lambda:[bus.put(event(1)) for _ in range(2000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert bus.published_count==8000
+    assert subscription.dropped_count+subscription.qsize()==8000
@@ -0,0 +1,103 @@
+from queue import Queue
+from threading import Event
+from types import SimpleNamespace
+import pytest
+from pynelson.event_pipeline import EventPipeline,CLOCK_DATA
+from pynelson.types import Data,NelsonRuleEvent
+from tests.series import drain
+
+def rule_event(
+        rule_id:int,
+        clear_event:bool,
+        sample_index:int,
+        timestamp:float=None,
+        stream_id=None) -> NelsonRuleEvent:
+    timestamp=float(sample_index) if timestamp is None else timestamp
+    return NelsonRuleEvent(rule_id,clear_event,[Data(1.0,stream_id,timestamp)],stream_id,sample_index=sample_index)
+
+def pipeline(**arguments) -> tuple:
+    output_queue=Queue()
+    return EventPipeline(Queue(),Event(),Queue(),output_queue,**arguments),output_queue
+
+def test_flap_within_hold_is_dropped():
+    stage,output_queue=pipeline(min_hold_time=1)
+    stage.process(rule_event(1,False,100),now=0)
+    stage.process(rule_event(1,True,101),now=0.5)
+    assert stage.flush(now=10)==[]
+    assert stage.suppressed_count==2
+    assert output_queue.empty()
+
+def test_held_event_is_delivered_once():
+    stage,output_queue=pipeline(min_hold_time=1)
+    event=rule_event(2,False,100)
+    stage.process(event,now=0)
+    assert stage.flush(now=0.5)==[]
+    assert stage.flush(now=1)==[event]
+    assert drain(output_queue)==[[event]]
+    # Repeating the delivered state is suppressed
+    stage.process(rule_event(2,False,120),now=2)
+    assert stage.flush(now=10)==[]
+
+def test_quiet_stream_is_released_by_polled_source():
+    source=SimpleNamespace(processed_count=101,current_timestamp=100.0)
+    stage,_=pipeline(min_hold_samples=5,sources={None:source})
+    event=rule_event(1,False,100)
+    stage.process(event,now=0)
+    assert stage.flush(now=0.1)==[]
+    source.processed_count=105
+    assert stage.flush(now=0.2)==[]
+    source.processed_count=106
+    assert stage.flush(now=0.3)==[event]
+
+def test_quiet_stream_falls_back_to_wall_clock():
+    stage,_=pipeline(min_hold_samples=5,max_hold_time=30)
+    event=rule_event(1,False,100)
+    stage.process(event,now=0)
+    assert stage.flush(now=29)==[]
+    assert stage.flush(now=30)==[event]
+
+def test_hold_samples_estimated_from_data_rate():
+    stage,_=pipeline(min_hold_samples=10,data_rate=0.1,max_hold_time=None)
+    event=rule_event(1,False,100)
+    stage.process(event,now=0)
+    assert stage.flush(now=0.5)==[]
+    assert stage.flush(now=1)==[event]
+
+def test_hold_per_rule():
+    stage,_=pipeline(min_hold_samples={2:3},max_hold_time=None)
+    immediate=rule_event(1,False,100,stream_id="a")
+    held=rule_event(2,False,100,stream_id="a")
+    stage.process(immediate,now=0)
+    stage.process(held,now=0)
+    assert stage.flush(now=0)==[immediate]
+    stage.process(rule_event(5,False,103,stream_id="a"),now=0)
+    assert held in stage.flush(now=0)
+
+def test_data_clock_measures_hold_on_timestamps():
+    stage,_=pipeline(min_hold_time=5,clock=CLOCK_DATA,max_hold_time=None)
+    event=rule_event(1,False,10,timestamp=100.0,stream_id="a")
+    stage.process(event,now=0)
+    stage.process(rule_event(3,False,12,timestamp=104.0,stream_id="a"),now=1000)
+    assert event not in stage.flush(now=1000)
+    stage.process(rule_event(4,False,13,timestamp=105.0,stream_id="a"),now=1000)
+    assert event in stage.flush(now=1000)
+
+def test_pending_events_are_delivered_on_stop():
+    event_queue=Queue()
+    output_queue=Queue()
+    stop_event=Event()
+    exception_queue=Queue()
+    stage=EventPipeline(exception_queue,stop_event,event_queue,output_queue,min_hold_time=1000,flush_interval=0.01)
+    event=rule_event(1,False,100)
+    event_queue.put(event)
+    stage.start()
+    while stage.received_count==0:
+        stop_event.wait(0.01)
+    stop_event.set()
+    stage.join()
+    assert exception_queue.empty()
+    assert drain(output_queue)==[[event]]
+
+def test_rejects_invalid_clock():
+    with pytest.raises(ValueError):
+        pipeline(clock="solar")
@@ -0,0 +1,50 @@
+from queue import Queue
+from threading import Event
+from pynelson.event_store import EventStore,EventStoreWriter
+from pynelson.types import NelsonRuleEvent,Data
+from tests.series import generate,handler_events
+
+def event(
+        rule_id:int,
+        clear_event:bool,
+        stream_id,
+        timestamp:float) -> NelsonRuleEvent:
+    return NelsonRuleEvent(rule_id,clear_event,[Data(1.5,stream_id,timestamp-1),Data(2.5,stream_id,timestamp)])
+
+def test_write_and_query(tmp_path):
+    with EventStore(str(tmp_path/"events.db")) as store:
+        store.write([event(1,False,"a",10),event(2,False,7,11),event(1,True,"a",12),event(1,False,None,13)])
+        events=store.query()
+        assert [(stored.rule_id,stored.clear_event,stored.stream_id) for stored in events]==[(1,False,"a"),(2,False,7),(1,True,"a"),(1,False,None)]
+        assert list(events[0].trigger_data.values)==[1.5,2.5]
+        assert list(events[0].trigger_data.timestamps)==[9,10]
+        assert [stored.stream_id for stored in store.query(stream_id=7)]==[7]
+        assert [stored.stream_id for stored in store.query(stream_id=None)]==[None]
+        assert len(store.query(rule_id=1,start=11,end=13))==1
+        assert len(store.query(clear_event=False,limit=2))==2
+
+def test_open_violations(tmp_path):
+    with EventStore(str(tmp_path/"events.db")) as store:
+        store.write([event(1,False,"a",10),event(2,False,"a",11),event(1,True,"a",12),event(1,False,"b",13)])
+        assert sorted((stored.stream_id,stored.rule_id) for stored in store.open_violations())==[("a",2),("b",1)]
+        assert [stored.rule_id for stored in store.open_violations("b")]==[1]
+
+def test_writer_stores_handler_events_on_stop(tmp_path):
+    path=str(tmp_path/"events.db")
+    events=handler_events(generate(5,3000),stream_id="s")
+    event_queue=Queue()
+    for start in range(0,len(events),7):
+        event_queue.put(events[start:start+7])
+    exception_queue=Queue()
+    stop_event=Event()
+    stop_event.set()
+    writer=EventStoreWriter(exception_queue,stop_event,event_queue,path,batch_size=5)
+    writer.start()
+    writer.join()
+    assert exception_queue.empty()
+    assert writer.written_count==len(events)
+    with EventStore(path) as store:
+        stored=store.query()
+    # Stored events are ordered by the timestamp of their newest trigger point, not by emission
+    assert sorted((event.rule_id,event.clear_event,event.stream_id,list(event.trigger_data.values)) for event in stored)==sorted(
+        (event.rule_id,event.clear_event,"s",[data.value for data in event.trigger_data]) for event in events)
@@ -0,0 +1,74 @@
+import pickle
+import socket
+import time
+from queue import Queue
+from threading import Event
+import pytest
+from pynelson.fleet import RunningStatistics,FleetBaseline,AggregationServer,AggregationClient,merge_all,push_statistics
+from tests.series import generate
+
+def test_merge_matches_statistics_of_all_values():
+    values=generate(10,3000)
+    merged=merge_all(RunningStatistics.from_values(values[start:start+700]) for start in range(0,len(values),700))
+    whole=RunningStatistics.from_values(values)
+    assert merged.count==whole.count
+    assert merged.mean==pytest.approx(whole.mean)
+    assert merged.m2==pytest.approx(whole.m2)
+    restored=RunningStatistics.from_bytes(whole.to_bytes())
+    assert (restored.count,restored.mean,restored.m2)==(whole.count,whole.mean,whole.m2)
+
+def test_fleet_baseline_switches_to_limits():
+    baseline=FleetBaseline()
+    for value in (1.0,2.0,3.0):
+        baseline.add(value)
+    assert baseline.mean==2.0
+    statistics=RunningStatistics.from_baseline(baseline)
+    assert (statistics.count,statistics.mean,statistics.m2)==(3,2.0,2.0)
+    baseline.set_limits(10.0,1.0)
+    baseline.add(4.0)
+    assert (baseline.mean,baseline.standard_deviation)==(10.0,1.0)
+    restored=pickle.loads(pickle.dumps(baseline))
+    assert restored.local_statistics().count==4
+    restored.add(5.0)
+    assert restored.count==5
+
+@pytest.fixture
+def server():
+    exception_queue=Queue()
+    stop_event=Event()
+    server=AggregationServer(exception_queue,stop_event,("127.0.0.1",0),max_age=60)
+    server.start()
+    yield server
+    stop_event.set()
+    server.join()
+    assert exception_queue.empty()
+
+def test_push_combines_sources_of_family(server):
+    address=server.server.server_address
+    push_statistics(address,"family","a",RunningStatistics.from_values([1.0,2.0]))
+    push_statistics(address,"other","c",RunningStatistics.from_values([100.0]))
+    combined=push_statistics(address,"family","b",RunningStatistics.from_values([3.0,4.0]))
+    assert combined.count==4 and combined.mean==2.5
+    combined=push_statistics(address,"family","a",RunningStatistics.from_values([5.0,6.0]))
+    assert combined.count==4 and combined.mean==4.5
+
+def test_idle_connection_does_not_hold_up_pushes(server):
+    address=server.server.server_address
+    with socket.create_connection(address):
+        time.sleep(0.1)
+        start=time.monotonic()
+        combined=push_statistics(address,"family","a",RunningStatistics.from_values([1.0]),timeout=2)
+        assert time.monotonic()-start<2
+        assert combined.count==1
+
+def test_client_applies_combined_limits(server):
+    address=server.server.server_address
+    push_statistics(address,"family","other",RunningStatistics.from_values([10.0,10.0,10.0]))
+    baseline=FleetBaseline()
+    for value in (4.0,6.0):
+        baseline.add(value)
+    client=AggregationClient(Queue(),Event(),baseline,"family","local",address,min_count=5)
+    assert client.push().count==5
+    assert baseline.limits[0]==pytest.approx(8.0)
+    baseline.add(0.0)
+    assert baseline.mean==pytest.approx(8.0)
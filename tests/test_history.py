@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from pynelson.history import HistoryBuffer,TriggerContext
+
+@pytest.mark.parametrize("memory_size,file_size",[(7,20),(10,5),(1,1),(64,1000),(5,13)])
+def test_wrap_and_read_match_appended_points(memory_size,file_size):
+    generator=np.random.default_rng(1)
+    history=HistoryBuffer(memory_size,file_size)
+    values=[]
+    timestamps=[]
+    for step in range(300):
+        if step%3==0:
+            count=int(generator.integers(0,30))
+            new_values=generator.normal(size=count)
+            new_timestamps=np.arange(len(timestamps),len(timestamps)+count,dtype=float)
+            history.append_many(new_values,new_timestamps)
+            values+=new_values.tolist()
+            timestamps+=new_timestamps.tolist()
+        else:
+            value=float(generator.normal())
+            history.append(value,float(len(timestamps)))
+            values.append(value)
+            timestamps.append(float(len(timestamps)))
+        count=history.count
+        assert count==len(values)
+        assert history.first==count-len(history)
+        start=int(generator.integers(-5,count+5))
+        end=int(generator.integers(start,count+10))
+        batch=history.read(start,end)
+        first=max(start,history.first)
+        assert np.array_equal(batch.values,values[first:min(end,count)])
+        assert np.array_equal(batch.timestamps,timestamps[first:min(end,count)])
+        timestamp=float(generator.integers(-3,count+3))
+        assert history.locate(timestamp)==min(max(history.first,int(timestamp)),count)
+        assert history.read_between(timestamp,timestamp+4).timestamps.tolist()==[
+            other for other in timestamps[history.first:] if timestamp<=other<=timestamp+4]
+        assert history.last_timestamp==(timestamps[-1] if timestamps else None)
+    history.close()
+
+def test_trigger_context(tmp_path):
+    history=HistoryBuffer(100,1000,path=str(tmp_path/"ring.bin"))
+    history.append_many(np.arange(500,dtype=float),np.arange(500,dtype=float)*0.5)
+    context=TriggerContext(history,200,100.0)
+    assert context.points(2,1).values.tolist()==[198.0,199.0,200.0,201.0]
+    assert context.around(1,1).values.tolist()==[198.0,199.0,200.0,201.0,202.0]
+    assert context.is_complete(10)
+    assert not context.is_complete(1000)
+    history.close()
+
+def test_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        HistoryBuffer(0)
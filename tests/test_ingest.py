@@ -0,0 +1,36 @@
+import time
+from queue import Queue
+from threading import Event
+from pynelson.ingest import get_batch
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from tests.series import generate,event_key,drain,handler_events
+
+def test_get_batch_drains_waiting_items_up_to_batch_size():
+    queue=Queue()
+    for index in range(10):
+        queue.put(index)
+    assert get_batch(queue,4,0.1)==[0,1,2,3]
+    assert get_batch(queue,100,0.1)==[4,5,6,7,8,9]
+
+def test_get_batch_returns_empty_list_after_poll_interval():
+    start=time.monotonic()
+    assert get_batch(Queue(),10,0.05)==[]
+    assert time.monotonic()-start>=0.04
+
+def test_submit_many_matches_point_by_point():
+    values=generate(4,3000)
+    data_queue=Queue()
+    event_queue=Queue()
+    exception_queue=Queue()
+    stop_event=Event()
+    handler=NelsonRuleHandler(exception_queue,stop_event,data_queue,event_queue,0,poll_interval=0.01)
+    for start in range(0,len(values),512):
+        handler.submit_many(values[start:start+512],[float(index) for index in range(start,min(start+512,len(values)))])
+    handler.start()
+    deadline=time.monotonic()+30
+    while handler.processed_count<len(values) and time.monotonic()<deadline:
+        time.sleep(0.01)
+    stop_event.set()
+    handler.join()
+    assert exception_queue.empty()
+    assert [event_key(event) for event in drain(event_queue)]==[event_key(event) for event in handler_events(values)]
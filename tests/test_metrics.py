@@ -0,0 +1,86 @@
+import time
+import urllib.error
+import urllib.request
+from queue import Queue
+from threading import Event
+import pytest
+from pynelson.metrics import MetricsExporter,format_prometheus
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.types import DataBatch
+from tests.series import generate
+
+def processed_handler(metrics_sample_interval:int=1) -> NelsonRuleHandler:
+    handler=NelsonRuleHandler(None,None,Queue(),Queue(),0,metrics_sample_interval=metrics_sample_interval)
+    values=generate(0,2000)
+    handler.process_item(DataBatch(values,[float(index) for index in range(len(values))]))
+    return handler
+
+def test_get_metrics():
+    handler=processed_handler()
+    metrics=handler.get_metrics()
+    assert metrics["samples_processed"]==2000
+    assert metrics["samples_shed"]==0
+    assert metrics["queue_depth"]==0
+    assert sum(metrics["events_emitted"].values())==handler.event_queue.qsize()
+    assert set(metrics["rule_evaluation_seconds"])==set(range(1,9))
+    assert all(seconds>=0 for seconds in metrics["rule_evaluation_seconds"].values())
+
+def test_get_metrics_while_handler_runs():
+    data_queue=Queue()
+    stop_event=Event()
+    exception_queue=Queue()
+    handler=NelsonRuleHandler(exception_queue,stop_event,data_queue,Queue(),0,metrics_sample_interval=1,poll_interval=0.01)
+    values=generate(1,20000)
+    for start in range(0,len(values),100):
+        data_queue.put(DataBatch(values[start:start+100],[float(index) for index in range(start,start+100)]))
+    handler.start()
+    scrapes=0
+    while handler.processed_count<len(values):
+        handler.get_metrics()
+        scrapes+=1
+    stop_event.set()
+    handler.join()
+    assert exception_queue.empty()
+    assert scrapes>0
+
+def test_format_prometheus():
+    text=format_prometheus({"line \"1\"":processed_handler()})
+    assert "# TYPE pynelson_samples_processed_total counter" in text
+    assert "pynelson_samples_processed_total{handler=\"line \\\"1\\\"\"} 2000.0" in text
+    assert "pynelson_rule_evaluation_seconds{handler=\"line \\\"1\\\"\",rule=\"8\"}" in text
+    assert text.endswith("\n")
+
+def test_exporter_serves_metrics():
+    stop_event=Event()
+    exception_queue=Queue()
+    exporter=MetricsExporter(exception_queue,stop_event,{"a":processed_handler(64)},port=0)
+    exporter.start()
+    try:
+        port=exporter.server.server_address[1]
+        with urllib.request.urlopen("http://127.0.0.1:"+str(port)+"/metrics",timeout=5) as response:
+            assert response.status==200
+            assert "pynelson_samples_processed_total{handler=\"a\"} 2000.0" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen("http://127.0.0.1:"+str(port)+"/other",timeout=5)
+    finally:
+        stop_event.set()
+        exporter.join()
+    assert exception_queue.empty()
+
+def test_profiling():
+    data_queue=Queue()
+    stop_event=Event()
+    handler=NelsonRuleHandler(Queue(),stop_event,data_queue,Queue(),0,poll_interval=0.01)
+    with pytest.raises(ValueError):
+        handler.start_profiling(0)
+    assert handler.stop_profiling() is None
+    handler.start_profiling(10)
+    handler.start()
+    values=generate(2,1000)
+    data_queue.put(DataBatch(values,[float(index) for index in range(len(values))]))
+    while handler.processed_count<len(values):
+        time.sleep(0.01)
+    stop_event.set()
+    handler.join()
+    stats=handler.stop_profiling()
+    assert any(function[2]=="process_value" for function in stats.stats)
@@ -0,0 +1,74 @@
+import time
+from queue import Queue
+from threading import Event
+import pytest
+from pynelson.multi_stream import MultiStreamEngine,MultiStreamHandler
+from pynelson.types import Data,DataBatch
+from tests.series import generate,event_key,drain,handler_events
+
+def interleaved(series:dict) -> list:
+    """Lists of Data objects taking uneven blocks of every stream in turn"""
+    data_lists=[]
+    positions={stream_id:0 for stream_id in series}
+    step=0
+    while any(positions[stream_id]<len(values) for stream_id,values in series.items()):
+        data_list=[]
+        for stream_id,values in series.items():
+            size=(step*7+len(str(stream_id)))%13+1
+            start=positions[stream_id]
+            data_list+=[Data(value,stream_id,float(index)) for index,value in enumerate(values[start:start+size],start)]
+            positions[stream_id]=start+size
+        data_lists.append(data_list)
+        step+=1
+    return data_lists
+
+def assert_matches_handlers(
+        events:list,
+        series:dict):
+    for stream_id,values in series.items():
+        expected=handler_events(values,stream_id=stream_id)
+        assert [event_key(event) for event in events if event.stream_id==stream_id]==[event_key(event) for event in expected]
+        assert [event.sample_index for event in events if event.stream_id==stream_id]==[event.sample_index for event in expected]
+
+def test_engine_matches_handler_per_stream():
+    series={stream_id:generate(seed,2000) for seed,stream_id in enumerate(("a","bb","ccc"))}
+    engine=MultiStreamEngine(capacity=1)
+    events=[]
+    for data_list in interleaved(series):
+        events+=engine.process(data_list)
+    assert len(engine)==3
+    assert_matches_handlers(events,series)
+
+def test_engine_process_batch_with_ids():
+    series={stream_id:generate(seed,1000) for seed,stream_id in enumerate((1,2))}
+    engine=MultiStreamEngine()
+    events=[]
+    for data_list in interleaved(series):
+        events+=engine.process_batch(DataBatch(
+            [data.value for data in data_list],
+            [data.timestamp for data in data_list],
+            [data.id for data in data_list]))
+    assert_matches_handlers(events,series)
+
+def test_handler_thread():
+    series={stream_id:generate(seed,1500) for seed,stream_id in enumerate(("a","b"))}
+    data_queue=Queue()
+    event_queue=Queue()
+    exception_queue=Queue()
+    stop_event=Event()
+    handler=MultiStreamHandler(exception_queue,stop_event,data_queue,event_queue,batch_size=16,poll_interval=0.01)
+    handler.start()
+    for data_list in interleaved(series):
+        data_queue.put(data_list)
+    total=sum(len(values) for values in series.values())
+    deadline=time.monotonic()+30
+    while handler.engine.data_count[:len(handler.engine)].sum()<total and time.monotonic()<deadline:
+        time.sleep(0.01)
+    stop_event.set()
+    handler.join()
+    assert exception_queue.empty()
+    assert_matches_handlers(drain(event_queue),series)
+
+def test_rejects_small_window():
+    with pytest.raises(ValueError):
+        MultiStreamEngine(window_size=14)
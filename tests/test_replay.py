@@ -0,0 +1,83 @@
+from queue import Queue
+import numpy as np
+import pytest
+from pynelson.replay import BinaryWriter,BinaryReader,HEADER,BLOCK,replay
+from pynelson.nelson_rule_handler import NelsonRuleHandler
+from pynelson.types import Data
+from tests.series import generate,handler_events,drain,event_key
+
+def write_series(
+        path:str,
+        count:int):
+    with BinaryWriter(path) as writer:
+        writer.write(np.arange(count,dtype=np.float64),np.arange(count,dtype=np.float64)*0.5)
+
+def test_round_trip(tmp_path):
+    path=str(tmp_path/"series.bin")
+    write_series(path,1000)
+    with BinaryReader(path) as reader:
+        assert len(reader)==1000
+        assert np.array_equal(reader.timestamps,np.arange(1000))
+        assert np.array_equal(reader.values,np.arange(1000)*0.5)
+        assert sum(len(values) for _,values in reader.chunks(333))==1000
+
+def test_columns_are_contiguous(tmp_path):
+    path=str(tmp_path/"series.bin")
+    with BinaryWriter(path,buffer_size=64) as writer:
+        writer.write(np.arange(100,dtype=np.float64),np.arange(100,dtype=np.float64))
+        writer.write(np.arange(100,150,dtype=np.float64),np.arange(100,150,dtype=np.float64))
+    with BinaryReader(path) as reader:
+        assert len(reader.blocks)==2
+        chunks=list(reader.chunks(40))
+        assert [len(values) for _,values in chunks]==[40,40,20,40,10]
+        for timestamps,values in chunks:
+            assert timestamps.flags["C_CONTIGUOUS"] and values.flags["C_CONTIGUOUS"]
+        assert np.array_equal(reader.values,np.arange(150))
+
+def test_reader_ignores_torn_block(tmp_path):
+    path=str(tmp_path/"series.bin")
+    write_series(path,10)
+    with open(path,"ab") as file:
+        file.write(np.array([4],dtype=BLOCK).tobytes()+b"\x01"*20)
+    with BinaryReader(path) as reader:
+        assert len(reader)==10
+        assert reader.values[-1]==4.5
+
+def test_writer_cuts_torn_block_before_appending(tmp_path):
+    path=str(tmp_path/"series.bin")
+    write_series(path,10)
+    with open(path,"ab") as file:
+        file.write(b"\x01"*(BLOCK.itemsize-3))
+    with BinaryWriter(path) as writer:
+        writer.write([10.0,11.0],[5.0,5.5])
+    with BinaryReader(path) as reader:
+        assert len(reader)==12
+        assert np.array_equal(reader.timestamps,np.arange(12))
+        assert np.array_equal(reader.values,np.arange(12)*0.5)
+
+def test_close_with_live_views(tmp_path):
+    path=str(tmp_path/"series.bin")
+    write_series(path,100)
+    reader=BinaryReader(path)
+    values=reader.values[10:20]
+    reader.close()
+    assert reader.blocks is None
+    assert np.array_equal(values,np.arange(10,20)*0.5)
+
+def test_replay_matches_handler(tmp_path):
+    path=str(tmp_path/"series.bin")
+    values=generate(4)[:3000]
+    with BinaryWriter(path,buffer_size=700) as writer:
+        for index,value in enumerate(values):
+            writer.write_data(Data(value,None,float(index)))
+    event_queue=Queue()
+    handler=NelsonRuleHandler(None,None,None,event_queue,0)
+    with BinaryReader(path) as reader:
+        assert replay(handler,reader.chunks(256))==len(values)
+    assert [event_key(event) for event in drain(event_queue)]==[event_key(event) for event in handler_events(values)]
+
+def test_rejects_foreign_file(tmp_path):
+    path=tmp_path/"foreign.bin"
+    path.write_bytes(b"\x00"*(HEADER.itemsize+BLOCK.itemsize))
+    with pytest.raises(ValueError):
+        BinaryReader(str(path))
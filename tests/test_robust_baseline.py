@@ -0,0 +1,65 @@
+import bisect
+import math
+import pickle
+import random
+import numpy as np
+import pytest
+from pynelson.baseline import RobustBaseline
+from pynelson.skiplist import IndexableSkiplist
+
+def series() -> np.ndarray:
+    generator=np.random.default_rng(0)
+    return np.concatenate([generator.normal(size=1000),[50.0]*3,generator.integers(0,5,500).astype(float)])
+
+@pytest.mark.parametrize("window_size",[1,2,7,100,501])
+def test_robust_baseline_matches_numpy_median(window_size):
+    values=series()
+    baseline=RobustBaseline(window_size)
+    for index,value in enumerate(values):
+        baseline.add(float(value))
+        window=values[max(0,index-window_size+1):index+1]
+        median=np.median(window)
+        assert baseline.mean==pytest.approx(median,abs=1e-12)
+        assert baseline.standard_deviation==pytest.approx(1.4826*np.median(np.abs(window-median)),abs=1e-9)
+
+def test_robust_baseline_skips_non_finite_values():
+    values=series()[:300]
+    expected=RobustBaseline(50)
+    baseline=RobustBaseline(50)
+    for index,value in enumerate(values):
+        expected.add(float(value))
+        baseline.add(float(value))
+        if index%10==0:
+            baseline.add(math.nan)
+            baseline.add(math.inf)
+    assert baseline.skipped_count==60
+    assert baseline.mean==expected.mean
+    assert baseline.standard_deviation==expected.standard_deviation
+
+def test_robust_baseline_pickles():
+    baseline=RobustBaseline(20)
+    for value in series()[:100]:
+        baseline.add(float(value))
+    restored=pickle.loads(pickle.dumps(baseline))
+    baseline.add(1.0)
+    restored.add(1.0)
+    assert (restored.mean,restored.standard_deviation)==(baseline.mean,baseline.standard_deviation)
+
+def test_skiplist_matches_sorted_list():
+    skiplist=IndexableSkiplist(1000)
+    expected=[]
+    generator=random.Random(3)
+    for _ in range(3000):
+        if expected and generator.random()<0.4:
+            value=generator.choice(expected)
+            skiplist.remove(value)
+            expected.remove(value)
+        else:
+            value=float(generator.randint(0,50))
+            skiplist.insert(value)
+            bisect.insort(expected,value)
+    assert list(skiplist)==expected
+    assert all(skiplist[index]==value for index,value in enumerate(expected))
+    assert all(skiplist.rank(value)==bisect.bisect_left(expected,value) for value in (-1.0,0.0,10.5,25.0,60.0))
+    with pytest.raises(KeyError):
+        skiplist.remove(1000.0)
@@ -0,0 +1,72 @@
+import pickle
+import random
+import pytest
+from pynelson.rules import (
+    BeyondLimit,WithinLimit,OutsideLimitBothSides,SameSideRun,Trend,Alternating,
+    NELSON_RULES,WESTERN_ELECTRIC_RULES,WESTGARD_RULES,compile_rules)
+from tests.series import generate,handler_events
+
+def is_active(
+        rule,
+        history:list) -> bool:
+    """Reference definition of a rule over the points seen so far, against mean 0 and standard deviation 1"""
+    window=history[-rule.length:]
+    full=len(history)>=rule.length
+    moves=list(zip(window,window[1:]))
+    if isinstance(rule,BeyondLimit):
+        return sum(x>rule.sigma for x in window)>=rule.count or sum(x<-rule.sigma for x in window)>=rule.count
+    if isinstance(rule,WithinLimit):
+        return full and all(-rule.sigma<=x<=rule.sigma for x in window)
+    if isinstance(rule,OutsideLimitBothSides):
+        return full and all(abs(x)>rule.sigma for x in window) and any(x>0 for x in window) and any(x<0 for x in window)
+    if isinstance(rule,SameSideRun):
+        return full and (all(x>0 for x in window) or all(x<0 for x in window))
+    if isinstance(rule,Trend):
+        return full and (all(a<b for a,b in moves) or all(a>b for a,b in moves))
+    if isinstance(rule,Alternating):
+        return full and all(a!=b for a,b in moves) and all((b-a)*(c-b)<0 for a,b,c in zip(window,window[1:],window[2:]))
+    raise ValueError(rule)
+
+def test_compiled_rules_match_reference_definitions():
+    rules=NELSON_RULES+WESTERN_ELECTRIC_RULES+WESTGARD_RULES+[BeyondLimit("2_of_4",2,4,1.5),Trend("trend_3",3),Alternating("alt_5",5)]
+    compiled=compile_rules(rules)
+    generator=random.Random(3)
+    levels=[-4,-2.5,-1.5,-1,0,0.5,1,1.5,2.5,4]
+    history=[]
+    active={rule.rule_id:False for rule in rules}
+    for _ in range(4000):
+        value=float(generator.choice(levels)) if generator.random()<0.7 else history[-1] if history else 0.0
+        history.append(value)
+        transitions=dict(compiled.check(value,0.0,1.0))
+        for rule in rules:
+            now=is_active(rule,history)
+            if now!=active[rule.rule_id]:
+                assert transitions.get(rule.rule_id)==(not now),(len(history),rule.rule_id)
+                active[rule.rule_id]=now
+            else:
+                assert rule.rule_id not in transitions,(len(history),rule.rule_id)
+
+def test_handler_emits_configured_rules_with_their_trigger_data():
+    events=handler_events(generate(1),rules=WESTERN_ELECTRIC_RULES)
+    lengths={rule.rule_id:rule.length for rule in WESTERN_ELECTRIC_RULES}
+    assert {event.rule_id for event in events}==set(lengths)
+    assert all(len(event.trigger_data)==lengths[event.rule_id] for event in events)
+    # Every rule alternates between triggered and cleared
+    for rule_id in lengths:
+        assert [event.clear_event for event in events if event.rule_id==rule_id][:4]==[False,True,False,True]
+
+def test_compiled_rules_pickle():
+    compiled=compile_rules(NELSON_RULES)
+    for value in generate(0,100):
+        compiled.check(value,0.0,1.0)
+    restored=pickle.loads(pickle.dumps(compiled))
+    for value in generate(1,300):
+        assert restored.check(value,0.0,1.0)==compiled.check(value,0.0,1.0)
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        compile_rules([SameSideRun(1,9),Trend(1,6)])
+    with pytest.raises(ValueError):
+        BeyondLimit(1,4,3,2)
+    with pytest.raises(ValueError):
+        SameSideRun(1,0)
@@ -0,0 +1,68 @@
+import os
+import signal
+import time
+from threading import Thread,Timer
+import pytest
+from pynelson.runtime import Supervisor,ServiceConfig
+from pynelson.types import ExceptionEvent
+
+class FailingService(Thread):
+    def __init__(
+            self,
+            exception_queue,
+            stop_event) -> None:
+        Thread.__init__(self)
+        self.exception_queue=exception_queue
+
+    def run(self):
+        self.exception_queue.put(ExceptionEvent(self.ident,RuntimeError("failed")))
+
+class WaitingService(Thread):
+    def __init__(
+            self,
+            exception_queue,
+            stop_event,
+            ignore_stop:bool=False) -> None:
+        Thread.__init__(self)
+        self.stop_event=stop_event
+        self.ignore_stop=ignore_stop
+
+    def run(self):
+        if self.ignore_stop:
+            time.sleep(2)
+        else:
+            self.stop_event.wait()
+
+def test_restarts_failing_service_up_to_max_restarts():
+    supervisor=Supervisor([
+        ServiceConfig("failing",FailingService,max_restarts=2,restart_delay=0.01),
+        ServiceConfig("waiting",WaitingService)],monitor_interval=0.01)
+    Timer(0.5,supervisor.stop).start()
+    assert supervisor.run()==[]
+    status=supervisor.status()
+    assert status["failing"].restarts==2
+    assert isinstance(status["failing"].last_exception,RuntimeError)
+    assert [name for name,_ in supervisor.exceptions]==["failing"]*3
+    assert not status["waiting"].alive
+
+def test_shutdown_reports_services_still_running():
+    supervisor=Supervisor([ServiceConfig("stuck",lambda exception_queue,stop_event:WaitingService(exception_queue,stop_event,True))],shutdown_timeout=0.1)
+    supervisor.start()
+    assert supervisor.shutdown()==["stuck"]
+
+def test_signal_sets_stop_event():
+    handlers=[signal.getsignal(signal.SIGINT),signal.getsignal(signal.SIGTERM)]
+    supervisor=Supervisor([ServiceConfig("waiting",WaitingService)],monitor_interval=0.05)
+    try:
+        supervisor.handle_signals()
+        Timer(0.2,os.kill,(os.getpid(),signal.SIGTERM)).start()
+        start=time.monotonic()
+        assert supervisor.run()==[]
+        assert time.monotonic()-start<5
+    finally:
+        signal.signal(signal.SIGINT,handlers[0])
+        signal.signal(signal.SIGTERM,handlers[1])
+
+def test_duplicate_service_name():
+    with pytest.raises(ValueError):
+        Supervisor([ServiceConfig("a",WaitingService),ServiceConfig("a",WaitingService)])
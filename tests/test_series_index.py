@@ -0,0 +1,41 @@
+import random
+import numpy as np
+import pytest
+from pynelson.series_index import SeriesIndex
+from pynelson.baseline import FrozenBaseline
+from tests.series import generate,event_key,handler_events
+
+def test_statistics_match_numpy():
+    values=np.array(generate(8,10000))+1e6
+    timestamps=np.arange(len(values),dtype=np.float64)
+    index=SeriesIndex(timestamps,values,chunk_size=100)
+    generator=random.Random(8)
+    for _ in range(200):
+        first=generator.randrange(len(values))
+        last=generator.randrange(first,len(values)+1)
+        count,mean,standard_deviation=index.statistics(first,last)
+        assert count==last-first
+        if count==0:
+            assert mean is None and standard_deviation is None
+            continue
+        assert mean==pytest.approx(values[first:last].mean(),abs=1e-6)
+        assert standard_deviation==pytest.approx(values[first:last].std(),abs=1e-4)
+
+def test_evaluate_matches_frozen_handler():
+    values=generate(9,6000)
+    timestamps=np.arange(len(values),dtype=np.float64)
+    index=SeriesIndex(timestamps,values,chunk_size=256)
+    _,mean,standard_deviation=index.statistics(0,2000)
+    events=index.evaluate(2000,6000,0,2000)
+    expected=handler_events(values[2000:],timestamps[2000:],baseline=FrozenBaseline(mean=mean,standard_deviation=standard_deviation))
+    assert [event_key(event) for event in events]==[event_key(event) for event in expected]
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        SeriesIndex([0.0,1.0],[1.0])
+    with pytest.raises(ValueError):
+        SeriesIndex([1.0,0.0],[1.0,2.0])
+    with pytest.raises(ValueError):
+        SeriesIndex([0.0],[1.0],chunk_size=0)
+    with pytest.raises(ValueError):
+        SeriesIndex([0.0,1.0],[1.0,2.0]).evaluate(baseline_start=5)
@@ -0,0 +1,72 @@
+import time
+from queue import Queue
+from threading import Event
+import numpy as np
+from pynelson.sharding import ShardedRuntime
+from pynelson.types import Data,DataBatch
+from tests.series import generate,event_key,drain,handler_events
+
+def run_runtime(
+        items:list,
+        shard_count:int) -> tuple:
+    """Route items through a ShardedRuntime that is stopped before it starts, so every item is drained on the way out"""
+    exception_queue=Queue()
+    data_queue=Queue()
+    event_queue=Queue()
+    stop_event=Event()
+    for item in items:
+        data_queue.put(item)
+    stop_event.set()
+    runtime=ShardedRuntime(exception_queue,stop_event,data_queue,event_queue,shard_count,batch_size=256,poll_interval=0.01)
+    runtime.start()
+    runtime.join(60)
+    assert not runtime.is_alive()
+    return drain(event_queue),drain(exception_queue),runtime
+
+def assert_matches_handlers(
+        events:list,
+        series:dict):
+    for stream_id,values in series.items():
+        expected=handler_events(values,stream_id=stream_id)
+        stream_events=[event for event in events if event.stream_id==stream_id]
+        assert [event_key(event) for event in stream_events]==[event_key(event) for event in expected]
+        assert all(data.id==stream_id for event in stream_events for data in event.trigger_data)
+
+def test_data_and_batches_match_handler_per_stream():
+    series={"a":generate(0,1500),"b":generate(1,1500),7:generate(2,1500)}
+    items=[]
+    for start in range(0,1500,100):
+        items.append([Data(value,"a",float(index)) for index,value in enumerate(series["a"][start:start+100],start)])
+        items.append(DataBatch(series["b"][start:start+100],np.arange(start,start+100,dtype=float),id="b"))
+        items.append(DataBatch(series[7][start:start+100],np.arange(start,start+100,dtype=float),np.full(100,7)))
+    events,exceptions,runtime=run_runtime(items,2)
+    assert exceptions==[]
+    assert_matches_handlers(events,series)
+    assert sorted(runtime.code_ids,key=str)==[7,"a","b"]
+
+def test_stop_drains_data_queue():
+    series={stream_id:generate(stream_id,500) for stream_id in range(4)}
+    stream_ids=np.tile(np.arange(4),500)
+    values=np.array([series[stream_id][index] for index,stream_id in zip(np.repeat(np.arange(500),4),stream_ids)])
+    timestamps=np.repeat(np.arange(500,dtype=float),4)
+    items=[DataBatch(values[start:start+64],timestamps[start:start+64],stream_ids[start:start+64]) for start in range(0,2000,64)]
+    events,exceptions,_=run_runtime(items,3)
+    assert exceptions==[]
+    assert_matches_handlers(events,series)
+
+def test_dead_worker_is_reported():
+    exception_queue=Queue()
+    stop_event=Event()
+    runtime=ShardedRuntime(exception_queue,stop_event,Queue(),Queue(),2,poll_interval=0.01)
+    runtime.start()
+    deadline=time.monotonic()+30
+    while len(runtime.workers)<2 and time.monotonic()<deadline:
+        time.sleep(0.01)
+    runtime.workers[0].kill()
+    runtime.workers[0].join()
+    stop_event.set()
+    runtime.join(30)
+    assert not runtime.is_alive()
+    exceptions=drain(exception_queue)
+    assert len(exceptions)==1
+    assert isinstance(exceptions[0].exception,RuntimeError)
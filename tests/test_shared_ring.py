@@ -0,0 +1,66 @@
+import multiprocessing
+from queue import Empty,Full
+import numpy as np
+import pytest
+from pynelson.shared_ring import RingProducer,RingConsumer
+from pynelson.types import DataBatch
+
+def produce(
+        name:str,
+        count:int):
+    with RingProducer(name) as producer:
+        values=np.arange(count,dtype=np.float64)
+        for start in range(0,count,100):
+            producer.put_many(values[start:start+100],values[start:start+100]*2)
+
+def test_put_many_and_get_wrap_around():
+    with RingConsumer(capacity=6,max_batch=5) as consumer:
+        assert consumer.capacity==8
+        with RingProducer(consumer.name) as producer:
+            read=[]
+            for start in range(0,30,3):
+                assert producer.put_many([start,start+1,start+2],[0.5*start]*3)==3
+                batch=consumer.get_nowait()
+                assert isinstance(batch,DataBatch)
+                read+=list(batch.values)
+            assert read==list(range(30))
+            assert consumer.empty()
+            with pytest.raises(Empty):
+                consumer.get(True,0.01)
+
+def test_overflow_policies():
+    with RingConsumer(capacity=4) as consumer:
+        with RingProducer(consumer.name,overflow="drop") as producer:
+            assert producer.put_many(range(6),range(6))==4
+            assert consumer.dropped==2
+        with RingProducer(consumer.name,overflow="error") as producer:
+            with pytest.raises(Full):
+                producer.put(1.0,1.0)
+        with RingProducer(consumer.name,timeout=0.01) as producer:
+            with pytest.raises(Full):
+                producer.put(1.0,1.0)
+        assert list(consumer.get_nowait().values)==[0,1,2,3]
+        with pytest.raises(ValueError):
+            RingProducer(consumer.name,overflow="wait")
+
+def test_attach_requires_existing_ring():
+    with pytest.raises(ValueError):
+        RingConsumer()
+    with pytest.raises(ValueError):
+        RingConsumer(capacity=0)
+
+def test_producer_in_other_process():
+    count=5000
+    with RingConsumer(capacity=256) as consumer:
+        process=multiprocessing.get_context("spawn").Process(target=produce,args=(consumer.name,count))
+        process.start()
+        values=[]
+        timestamps=[]
+        while len(values)<count:
+            batch=consumer.get(True,30)
+            values+=list(batch.values)
+            timestamps+=list(batch.timestamps)
+        process.join(30)
+        assert process.exitcode==0
+        assert values==list(range(count))
+        assert timestamps==[2*value for value in range(count)]
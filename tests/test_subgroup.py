@@ -0,0 +1,66 @@
+import time
+from queue import Queue
+from threading import Event
+import numpy as np
+import pytest
+from pynelson.subgroup import Subgrouper,SubgroupStage
+from pynelson.types import Data,DataBatch,DataShed
+from tests.series import drain
+
+def test_size_subgroups_keep_incomplete_samples():
+    subgrouper=Subgrouper(size=3)
+    subgroups=subgrouper.add([1.0,2.0,3.0,4.0],[0.0,1.0,2.0,3.0])
+    assert list(subgroups["mean"])==[2.0]
+    assert list(subgroups["range"])==[2.0]
+    assert list(subgroups["standard_deviation"])==[1.0]
+    assert list(subgroups["timestamp"])==[2.0]
+    subgroups=subgrouper.add([6.0,8.0],[4.0,5.0])
+    assert list(subgroups["mean"])==[6.0]
+    assert len(subgrouper.flush()["count"])==0
+
+def test_interval_subgroups_complete_with_later_bucket():
+    subgrouper=Subgrouper(interval=1.0)
+    assert list(subgrouper.add([1.0,3.0,5.0],[0.1,0.5,1.2])["mean"])==[2.0]
+    assert list(subgrouper.add([7.0],[3.5])["count"])==[1]
+    flushed=subgrouper.flush()
+    assert list(flushed["mean"])==[7.0] and list(flushed["standard_deviation"])==[0.0]
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        Subgrouper()
+    with pytest.raises(ValueError):
+        Subgrouper(size=0)
+    with pytest.raises(ValueError):
+        SubgroupStage(None,None,Queue(),{"median":Queue()},size=2)
+
+def test_stage_passes_shed_markers_in_order():
+    output_queue=Queue()
+    stage=SubgroupStage(Queue(),Event(),Queue(),{"mean":output_queue},size=2)
+    stage.process([
+        DataBatch(np.array([1.0,3.0,5.0]),np.array([0.0,1.0,2.0])),
+        DataShed(4),
+        [Data(10.0,None,7.0),Data(20.0,None,8.0)],
+        DataShed(1),
+        Data(30.0,None,10.0)])
+    items=drain(output_queue)
+    summary=[("shed",item.count) if isinstance(item,DataShed) else list(item.values) for item in items]
+    assert summary==[[2.0],[5.0],("shed",4),[15.0],("shed",1)]
+    assert stage.subgroup_count==3
+
+def test_stage_delivers_incomplete_subgroup_on_stop():
+    exception_queue=Queue()
+    stop_event=Event()
+    data_queue=Queue()
+    output_queues={"mean":Queue(),"range":Queue()}
+    for index in range(7):
+        data_queue.put(Data(float(index),None,float(index)))
+    stage=SubgroupStage(exception_queue,stop_event,data_queue,output_queues,size=5,poll_interval=0.01)
+    stage.start()
+    deadline=time.monotonic()+30
+    while stage.sample_count<7 and time.monotonic()<deadline:
+        time.sleep(0.01)
+    stop_event.set()
+    stage.join()
+    assert exception_queue.empty()
+    assert [list(item.values) for item in drain(output_queues["mean"])]==[[2.0],[5.5]]
+    assert [list(item.values) for item in drain(output_queues["range"])]==[[4.0],[1.0]]
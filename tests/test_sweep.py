@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from pynelson.sweep import sweep,grid,SweepConfiguration
+from tests.series import generate,handler_events
+
+def test_default_configuration_matches_handler():
+    values=generate(3,5000)
+    result=sweep(values,[SweepConfiguration()])[0]
+    events=handler_events(values)
+    for rule_id in range(1,8):
+        expected=[event.sample_index for event in events if event.rule_id==rule_id and not event.clear_event]
+        assert list(result.trigger_indices[rule_id])==expected
+        assert result.trigger_counts[rule_id]==len(expected)
+
+def test_sweep_independent_of_chunk_size():
+    values=np.round(np.array(generate(3,5000)))
+    configurations=grid(rule1_sigma=[2.5,3],rule2_length=[7,9],rule7_length=[10,15])+[SweepConfiguration(warm_up=40)]
+    whole=sweep(values,configurations,chunk_size=len(values))
+    for chunk_size in (1,7,4096):
+        for expected,result in zip(whole,sweep(values,configurations,chunk_size=chunk_size)):
+            assert result.trigger_counts==expected.trigger_counts
+            for rule_id,indices in expected.trigger_indices.items():
+                assert np.array_equal(result.trigger_indices[rule_id],indices)
+
+def test_grid_and_invalid_warm_up():
+    assert len(grid(rule1_sigma=[2,3],rule7_length=[10,12,15]))==6
+    with pytest.raises(ValueError):
+        SweepConfiguration(rule5_length=30)
@@ -0,0 +1,26 @@
+import pytest
+from pynelson.window import DataWindow
+
+def test_last_values_and_snapshot_after_wrap():
+    window=DataWindow(5)
+    for index in range(12):
+        window.append(float(index),index*0.5,"s")
+    assert len(window)==5
+    assert list(window.last_values(3))==[9.0,10.0,11.0]
+    snapshot=window.snapshot(4,1)
+    assert [data.value for data in snapshot]==[8.0,9.0,10.0]
+    assert [data.timestamp for data in snapshot]==[4.0,4.5,5.0]
+    assert {data.id for data in snapshot}=={"s"}
+
+def test_snapshot_is_a_copy():
+    window=DataWindow(3)
+    for index in range(3):
+        window.append(float(index),float(index))
+    snapshot=window.snapshot(3,0)
+    for index in range(3,6):
+        window.append(float(index),float(index))
+    assert [data.value for data in snapshot]==[0.0,1.0,2.0]
+
+def test_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        DataWindow(0)